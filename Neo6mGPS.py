@@ -1,17 +1,23 @@
 # Neo6mGPS.py
 # Clean NEO-6M GPS reader using serial + pynmea2
 
-import serial
-import pynmea2
-
 GPS_PORT = "/dev/serial0"
 GPS_BAUD = 9600
 
+# serial / pynmea2 are imported on first use to keep start-up fast
+pynmea2 = None
+
 def open_gps():
+    import serial
 
     return serial.Serial(GPS_PORT, GPS_BAUD, timeout=0.5)
 
 def get_gps_fix(ser):
+    global pynmea2
+    if pynmea2 is None:
+        import pynmea2 as _pynmea2
+        pynmea2 = _pynmea2
+
     for _ in range(30):
         try:
             line_bytes = ser.readline()
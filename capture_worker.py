@@ -0,0 +1,207 @@
+# capture_worker.py
+# Background still capture with the flashlight synchronised to exposure.
+#
+# libcamera-still is started in signal mode, so the slow part (process
+# start, camera bring-up, AE/AWB settling) happens with the light off.
+# Only when the camera is warm is the flashlight switched on and the
+# capture triggered with SIGUSR1; the light goes off again as soon as
+# the JPEG appears on disk. The whole sequence runs on a single worker
+# thread and callers get a concurrent.futures.Future back, so the main
+# loop keeps servicing serial, leak and navigation meanwhile.
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CaptureResult:
+    def __init__(self, filepath, trigger_to_exposure_s, flash_on_s, total_s):
+        self.filepath = filepath
+        self.trigger_to_exposure_s = trigger_to_exposure_s
+        self.flash_on_s = flash_on_s
+        self.total_s = total_s
+        # Set when a post-capture stage moved or dropped the file
+        self.demoted = False
+
+
+def photo_path(photo_dir):
+    now = time.time()
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+    ms = int((now % 1.0) * 1000)
+    return os.path.join(photo_dir, f"photo_{stamp}_{ms:03d}.jpg")
+
+
+def _wait_for_file(filepath, proc, timeout_s, poll_s=0.005):
+    """Wait until filepath exists and is non-empty. Returns True on success."""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if os.path.getsize(filepath) > 0:
+                return True
+        except OSError:
+            pass
+        if proc.poll() is not None:
+            return os.path.exists(filepath)
+        time.sleep(poll_s)
+    return False
+
+
+def _stop(proc, timeout_s=2.0):
+    if proc.poll() is not None:
+        return
+    try:
+        proc.send_signal(signal.SIGUSR2)
+        proc.wait(timeout=timeout_s)
+    except Exception:
+        proc.kill()
+        proc.wait()
+
+
+def capture_still(filepath, flashlight=None, width=1920, height=1080,
+                  settle_s=1.0, timeout_s=10.0):
+    """Capture one still to filepath. Returns a CaptureResult or None."""
+    cmd = [
+        "libcamera-still",
+        "-o",
+        filepath,
+        "--width",
+        str(width),
+        "--height",
+        str(height),
+        "--autofocus-on-capture",
+        "--nopreview",
+        "--signal",
+        "-t",
+        "0",
+    ]
+
+    t_start = time.monotonic()
+    try:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except Exception as e:
+        print("[CAMERA] Capture error:", e)
+        return None
+
+    flash_on_at = None
+    try:
+        # Let the camera start and settle exposure without the light on
+        time.sleep(settle_s)
+        if proc.poll() is not None:
+            print("[CAMERA] libcamera-still exited early:", proc.returncode)
+            return None
+
+        if flashlight is not None:
+            try:
+                flashlight.on()
+                flash_on_at = time.monotonic()
+            except Exception as e:
+                print("[FLASH] Error turning on flashlight:", e)
+
+        t_trigger = time.monotonic()
+        proc.send_signal(signal.SIGUSR1)
+        ok = _wait_for_file(filepath, proc, timeout_s)
+        t_exposed = time.monotonic()
+    finally:
+        if flashlight is not None and flash_on_at is not None:
+            try:
+                flashlight.off()
+            except Exception as e:
+                print("[FLASH] Error turning off flashlight:", e)
+        flash_off_at = time.monotonic()
+        _stop(proc)
+
+    if not ok:
+        print("[CAMERA] Capture timed out:", filepath)
+        return None
+
+    return CaptureResult(
+        filepath,
+        trigger_to_exposure_s=t_exposed - t_trigger,
+        flash_on_s=(flash_off_at - flash_on_at) if flash_on_at else 0.0,
+        total_s=time.monotonic() - t_start,
+    )
+
+
+class CaptureWorker:
+    """Runs capture_still on a dedicated thread, one photo at a time.
+
+    post_capture, if given, is called on the worker thread with the new
+    file's path and returns the path it ends up at (None if dropped).
+    capture, if given, replaces capture_still: capture(filepath, settle_s)
+    returns a CaptureResult or None (e.g. a call into the camera worker).
+    """
+
+    def __init__(self, photo_dir, flashlight=None, settle_s=1.0,
+                 post_capture=None, capture=None):
+        self.photo_dir = photo_dir
+        self.flashlight = flashlight
+        self.settle_s = settle_s
+        self.post_capture = post_capture
+        self.capture = capture
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="capture"
+        )
+        self._lock = threading.Lock()
+        self._future = None
+
+        self.captures = 0
+        self.failures = 0
+        self.last_result = None
+        # Exponential averages of the measured timings (seconds)
+        self.avg_trigger_to_exposure_s = None
+        self.avg_flash_on_s = None
+
+    def busy(self):
+        with self._lock:
+            return self._future is not None and not self._future.done()
+
+    def submit(self):
+        """Start a capture. Returns a Future, or None if one is running."""
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return None
+            self._future = self._executor.submit(self._run)
+            return self._future
+
+    def _run(self):
+        os.makedirs(self.photo_dir, exist_ok=True)
+        filepath = photo_path(self.photo_dir)
+        if self.capture is not None:
+            result = self.capture(filepath, self.settle_s)
+        else:
+            result = capture_still(
+                filepath, self.flashlight, settle_s=self.settle_s
+            )
+        if result is None:
+            self.failures += 1
+            return None
+
+        self.captures += 1
+        self.last_result = result
+        self.avg_trigger_to_exposure_s = _ewma(
+            self.avg_trigger_to_exposure_s, result.trigger_to_exposure_s
+        )
+        self.avg_flash_on_s = _ewma(self.avg_flash_on_s, result.flash_on_s)
+
+        if self.post_capture is not None:
+            try:
+                new_path = self.post_capture(result.filepath)
+            except Exception as e:
+                print("[CAMERA] Post-capture error:", e)
+                new_path = result.filepath
+            if new_path != result.filepath:
+                result.demoted = True
+                result.filepath = new_path
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+def _ewma(prev, value, alpha=0.2):
+    return value if prev is None else prev + alpha * (value - prev)
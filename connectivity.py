@@ -0,0 +1,110 @@
+# connectivity.py
+# Passive uplink monitoring with a circuit breaker.
+#
+# Link state is inferred from the outcome of the real backend requests
+# instead of a separate internet check before each call. After a few
+# consecutive failures the breaker opens and every call is
+# short-circuited until an exponentially growing back-off expires. The
+# first call after that is a single trial (optionally preceded by a
+# cheap probe against our own backend); success closes the breaker,
+# failure re-opens it with a longer back-off.
+
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ConnectivityMonitor:
+    def __init__(self, failure_threshold=3, base_backoff_s=2.0,
+                 max_backoff_s=120.0, probe=None):
+        self.failure_threshold = int(failure_threshold)
+        self.base_backoff_s = float(base_backoff_s)
+        self.max_backoff_s = float(max_backoff_s)
+        # Optional callable returning True if the backend answered
+        self.probe = probe
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.backoff_s = self.base_backoff_s
+        self.retry_at = 0.0
+        self._trial_in_progress = False
+
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.rtt_s = None  # exponential average of successful calls
+
+    def online(self):
+        return self.state == CLOSED
+
+    def allow(self, now=None):
+        """True if a backend call may be attempted right now."""
+        if self.state == CLOSED:
+            return True
+
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN:
+            if now < self.retry_at:
+                self.short_circuited += 1
+                return False
+            self.state = HALF_OPEN
+            self._trial_in_progress = False
+            if self.probe is not None:
+                ok = False
+                t0 = time.monotonic()
+                try:
+                    ok = bool(self.probe())
+                except Exception:
+                    ok = False
+                if ok:
+                    self.record_success(time.monotonic() - t0)
+                    return True
+                self.record_failure(now)
+                self.short_circuited += 1
+                return False
+
+        # HALF_OPEN: let exactly one trial call through
+        if self._trial_in_progress:
+            self.short_circuited += 1
+            return False
+        self._trial_in_progress = True
+        return True
+
+    def record_success(self, rtt_s=None):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            print("[NET] Backend reachable again; circuit closed")
+        self.state = CLOSED
+        self.backoff_s = self.base_backoff_s
+        self._trial_in_progress = False
+        if rtt_s is not None:
+            self.rtt_s = rtt_s if self.rtt_s is None else (
+                self.rtt_s + 0.2 * (rtt_s - self.rtt_s)
+            )
+
+    def record_failure(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._trial_in_progress = False
+
+        if self.state == HALF_OPEN:
+            self.backoff_s = min(self.backoff_s * 2.0, self.max_backoff_s)
+            self._open(now)
+        elif (
+            self.state == CLOSED
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.retry_at = now + self.backoff_s
+        print("[NET] Backend unreachable; circuit open for %.0fs" % self.backoff_s)
+
+    def error_rate(self):
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
@@ -0,0 +1,250 @@
+# coverage_grid.py
+# Raster of what the camera has actually imaged over the survey area.
+#
+# The polygon (minus holes) is rasterised into square cells in mission
+# metres. Every stored photo marks the cells under its footprint, so the
+# covered fraction is a counter lookup instead of a geometry question,
+# and holes left by failed or skipped waypoints stay visible. When the
+# planned sweep is finished, gap_waypoints() plans a short boustrophedon
+# pass over only the cells that are still uncovered.
+#
+# NumPy is used when available; otherwise the grid falls back to one
+# bytearray per row, which is slower but fine for survey-sized areas.
+
+import base64
+import math
+import zlib
+
+from coverage_planner import lane_intervals, order_cells
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class CoverageGrid:
+    def __init__(self, polygon, holes=(), cell_m=1.0):
+        if not polygon or len(polygon) < 3:
+            raise ValueError("coverage grid needs a polygon")
+        self.cell_m = float(cell_m)
+        rings = [list(polygon)] + [list(h) for h in holes or []]
+        self.rings = rings
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        self.x0 = min(xs)
+        self.y0 = min(ys)
+        self.nx = max(1, int(math.ceil((max(xs) - self.x0) / self.cell_m)))
+        self.ny = max(1, int(math.ceil((max(ys) - self.y0) / self.cell_m)))
+
+        # A cell is inside when its centre is (even-odd over all rings)
+        rows = []
+        for j in range(self.ny):
+            row = bytearray(self.nx)
+            yc = self.y0 + (j + 0.5) * self.cell_m
+            for a, b in lane_intervals(rings, yc):
+                i0 = max(0, int(math.ceil((a - self.x0) / self.cell_m - 0.5)))
+                i1 = min(self.nx - 1,
+                         int(math.floor((b - self.x0) / self.cell_m - 0.5)))
+                for i in range(i0, i1 + 1):
+                    row[i] = 1
+            rows.append(row)
+
+        if np is not None:
+            self.inside = np.frombuffer(b"".join(rows), dtype=np.uint8) \
+                .reshape(self.ny, self.nx).astype(bool)
+            self.covered = np.zeros((self.ny, self.nx), dtype=bool)
+            self.inside_count = int(np.count_nonzero(self.inside))
+        else:
+            self.inside = rows
+            self.covered = [bytearray(self.nx) for _ in range(self.ny)]
+            self.inside_count = sum(sum(r) for r in rows)
+        self.covered_count = 0
+        self.version = 0  # bumped whenever a cell becomes covered
+
+    # --- updates -------------------------------------------------------------
+
+    def _cell_range(self, lo, hi, origin, n):
+        i0 = int(math.floor((lo - origin) / self.cell_m))
+        i1 = int(math.ceil((hi - origin) / self.cell_m))
+        return max(0, i0), min(n, i1)
+
+    def mark_footprint(self, x, y, width_m, height_m=None):
+        """Mark an axis-aligned footprint centred at (x, y) as imaged.
+
+        Returns the number of cells that became covered.
+        """
+        height_m = width_m if height_m is None else height_m
+        i0, i1 = self._cell_range(x - width_m / 2.0, x + width_m / 2.0,
+                                  self.x0, self.nx)
+        j0, j1 = self._cell_range(y - height_m / 2.0, y + height_m / 2.0,
+                                  self.y0, self.ny)
+        if i0 >= i1 or j0 >= j1:
+            return 0
+
+        if np is not None:
+            new = self.inside[j0:j1, i0:i1] & ~self.covered[j0:j1, i0:i1]
+            n = int(np.count_nonzero(new))
+            self.covered[j0:j1, i0:i1] |= new
+        else:
+            n = 0
+            for j in range(j0, j1):
+                inside = self.inside[j]
+                covered = self.covered[j]
+                for i in range(i0, i1):
+                    if inside[i] and not covered[i]:
+                        covered[i] = 1
+                        n += 1
+        if n:
+            self.covered_count += n
+            self.version += 1
+        return n
+
+    def mark_photo(self, x, y, camera_area_m2):
+        """Mark the square footprint of one photo taken at (x, y)."""
+        return self.mark_footprint(x, y, math.sqrt(camera_area_m2))
+
+    # --- queries -------------------------------------------------------------
+
+    def coverage(self):
+        """Covered fraction of the survey area, 0..1."""
+        if not self.inside_count:
+            return 1.0
+        return self.covered_count / float(self.inside_count)
+
+    def _needed_in_band(self, j0, j1):
+        """Per column: 1 if any inside, uncovered cell in rows j0..j1-1."""
+        if np is not None:
+            need = self.inside[j0:j1] & ~self.covered[j0:j1]
+            return need.any(axis=0).tolist()
+        out = [0] * self.nx
+        for j in range(j0, j1):
+            inside = self.inside[j]
+            covered = self.covered[j]
+            for i in range(self.nx):
+                if inside[i] and not covered[i]:
+                    out[i] = 1
+        return out
+
+    def _inside_row(self, j):
+        if np is not None:
+            return self.inside[j].tolist()
+        return self.inside[j]
+
+    def _free_slots(self, intervals, lane_ok):
+        """lane_ok with each cell replaced by 1 + the index of the free
+        interval its centre lies in (0: in none)."""
+        out = [0] * self.nx
+        for k, (a, b) in enumerate(intervals):
+            i0 = max(0, int(math.ceil((a - self.x0) / self.cell_m - 0.5)))
+            i1 = min(self.nx - 1,
+                     int(math.floor((b - self.x0) / self.cell_m - 0.5)))
+            for i in range(i0, i1 + 1):
+                if lane_ok[i]:
+                    out[i] = k + 1
+        return out
+
+    def gap_waypoints(self, lane_spacing, min_run_m=None, start=None,
+                      holes=()):
+        """Waypoints visiting only the uncovered cells.
+
+        Lanes run along x, lane_spacing apart; a lane covers every
+        uncovered cell within half a spacing of it. A lane is split
+        wherever its own row leaves the free area (outside the polygon or
+        in a hole, including the extra keep-out rings in holes, e.g.
+        hazards found during the mission), and the pieces are ordered and
+        joined like planner cells, so no leg crosses a hole. Runs shorter
+        than min_run_m (default: one cell) are still visited as a single
+        point.
+        """
+        if self.covered_count >= self.inside_count:
+            return []
+        spacing = float(lane_spacing)
+        min_run = self.cell_m if min_run_m is None else float(min_run_m)
+        rings = self.rings + [list(h) for h in holes if h and len(h) >= 3]
+        height = self.ny * self.cell_m
+        pieces = []  # one-row planner cells [(y, x0, x1)]
+        free_rows = []
+        y = spacing / 2.0
+        while y - spacing / 2.0 < height:
+            j0, j1 = self._cell_range(y - spacing / 2.0, y + spacing / 2.0,
+                                      0.0, self.ny)
+            need = self._needed_in_band(j0, j1)
+            yw = self.y0 + min(y, height - self.cell_m / 2.0)
+            intervals = lane_intervals(rings, yw)
+            for a, b in intervals:
+                free_rows.append((yw, a, b))
+            # Only drive where the lane's own row is inside, and never
+            # join cells across a keep-out ring lying between them
+            jl = min(self.ny - 1, int((yw - self.y0) / self.cell_m))
+            lane_ok = self._inside_row(jl)
+            if len(rings) > len(self.rings):
+                lane_ok = self._free_slots(intervals, lane_ok)
+            i = 0
+            while i < self.nx:
+                if need[i] and lane_ok[i]:
+                    first = i
+                    while i < self.nx and need[i] \
+                            and lane_ok[i] == lane_ok[first]:
+                        i += 1
+                    xa = self.x0 + (first + 0.5) * self.cell_m
+                    xb = self.x0 + (i - 0.5) * self.cell_m
+                    if xb - xa < min_run:
+                        xb = xa
+                    pieces.append([(yw, xa, xb)])
+                else:
+                    i += 1
+            y += spacing
+        if not pieces:
+            return []
+
+        # A spacing this large keeps every piece to its two end points
+        path = order_cells(pieces, float("inf"), start=start,
+                           rings=rings, via=free_rows)
+        waypoints = []
+        for p in path:
+            if not waypoints or p != waypoints[-1]:
+                waypoints.append(p)
+        return waypoints
+
+    # --- persistence ---------------------------------------------------------
+
+    def to_record(self):
+        """Compact JSON-able snapshot of the covered cells."""
+        if np is not None:
+            raw = self.covered.astype(np.uint8).tobytes()
+        else:
+            raw = b"".join(bytes(r) for r in self.covered)
+        return {
+            "shape": [self.ny, self.nx],
+            "cell_m": self.cell_m,
+            "bits": base64.b64encode(zlib.compress(raw, 9)).decode("ascii"),
+        }
+
+    def restore(self, record):
+        """Load covered cells saved by to_record(); False if it doesn't fit."""
+        if not record or record.get("shape") != [self.ny, self.nx] \
+                or record.get("cell_m") != self.cell_m:
+            return False
+        try:
+            raw = zlib.decompress(base64.b64decode(record["bits"]))
+        except Exception:
+            return False
+        if len(raw) != self.ny * self.nx:
+            return False
+        if np is not None:
+            flat = np.frombuffer(raw, dtype=np.uint8).reshape(self.ny, self.nx)
+            self.covered = flat.astype(bool) & self.inside
+            self.covered_count = int(np.count_nonzero(self.covered))
+        else:
+            self.covered = []
+            self.covered_count = 0
+            for j in range(self.ny):
+                row = bytearray(raw[j * self.nx:(j + 1) * self.nx])
+                inside = self.inside[j]
+                for i in range(self.nx):
+                    row[i] = 1 if row[i] and inside[i] else 0
+                self.covered_count += sum(row)
+                self.covered.append(row)
+        self.version += 1
+        return True
@@ -0,0 +1,708 @@
+# coverage_planner.py
+# Lawnmower (boustrophedon) coverage planning over a survey polygon.
+#
+# All coordinates are local metres. A sweep angle is the direction the
+# lanes run in, in degrees counter-clockwise from the +x axis. Internally
+# the polygon is rotated by -angle so that every sweep is a horizontal
+# one, planned there, and the waypoints are rotated back.
+#
+# Planning a large area with many holes takes seconds, so the main loop
+# runs it through a PlanWorker on a separate process and picks the plan
+# up when it is done; a request for the inputs of the last plan is free.
+
+import bisect
+import heapq
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Heading change (degrees) between two consecutive legs that we count as
+# a turn when estimating path cost.
+TURN_THRESHOLD_DEG = 30.0
+
+# Extra cost (in metres of straight driving) charged for every turn when
+# ranking sweep angles. The sub slows down, overshoots and re-settles on
+# every lane change, so a turn is never free.
+DEFAULT_TURN_COST_M = 5.0
+
+
+class SweepCandidate:
+    """Estimated cost of sweeping the polygon at one angle."""
+
+    def __init__(self, angle_deg, lanes, waypoints, path_length_m, turns,
+                 cells=1):
+        self.angle_deg = angle_deg
+        self.lanes = lanes
+        self.waypoints = waypoints
+        self.path_length_m = path_length_m
+        self.turns = turns
+        self.cells = cells
+
+    def cost(self, turn_cost_m=DEFAULT_TURN_COST_M):
+        return self.path_length_m + turn_cost_m * self.turns
+
+    def as_dict(self):
+        return {
+            "angle_deg": round(self.angle_deg, 1),
+            "lanes": self.lanes,
+            "waypoints": len(self.waypoints),
+            "path_length_m": round(self.path_length_m, 1),
+            "turns": self.turns,
+            "cells": self.cells,
+        }
+
+
+class CoveragePlan:
+    """Result of plan(): chosen waypoints plus every candidate evaluated.
+
+    lower_bound_m is the free area divided by the lane spacing, i.e. the
+    path length an ideal planner with no turns or transits would need.
+    route_index is set by plan_around() when the waypoints were routed
+    round holes found after planning (see route_around()).
+    """
+
+    def __init__(self, waypoints, angle_deg, lane_spacing, candidates,
+                 lower_bound_m=0.0):
+        self.waypoints = waypoints
+        self.angle_deg = angle_deg
+        self.lane_spacing = lane_spacing
+        self.candidates = candidates
+        self.lower_bound_m = lower_bound_m
+        self.route_index = None
+
+    @property
+    def best(self):
+        for c in self.candidates:
+            if c.angle_deg == self.angle_deg:
+                return c
+        return None
+
+
+# --- geometry helpers --------------------------------------------------------
+
+def _rotate(points, angle_deg):
+    a = math.radians(angle_deg)
+    c = math.cos(a)
+    s = math.sin(a)
+    return [(x * c - y * s, x * s + y * c) for x, y in points]
+
+
+def convex_hull(points):
+    """Monotone-chain convex hull, counter-clockwise, no repeated end point."""
+    pts = sorted(set((float(x), float(y)) for x, y in points))
+    if len(pts) <= 2:
+        return pts
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper = []
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def candidate_angles(polygon):
+    """Sweep angles worth evaluating for this polygon.
+
+    The minimum-width orientation of a polygon is always parallel to one
+    of its convex hull edges, so those edge directions (mod 180) plus the
+    two axis-aligned sweeps are the candidates.
+    """
+    angles = {0.0, 90.0}
+    hull = convex_hull(polygon)
+    n = len(hull)
+    for i in range(n):
+        x1, y1 = hull[i]
+        x2, y2 = hull[(i + 1) % n]
+        if x1 == x2 and y1 == y2:
+            continue
+        a = math.degrees(math.atan2(y2 - y1, x2 - x1)) % 180.0
+        angles.add(round(a, 1) % 180.0)
+    return sorted(angles)
+
+
+def _ring_intervals(ring, y):
+    """Intervals of a horizontal line at y inside one ring (even-odd)."""
+    xs = []
+    n = len(ring)
+    j = n - 1
+    for i in range(n):
+        x1, y1 = ring[j]
+        x2, y2 = ring[i]
+        if (y1 > y) != (y2 > y):
+            xs.append(x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+        j = i
+    xs.sort()
+    return [
+        (xs[k], xs[k + 1])
+        for k in range(0, len(xs) - 1, 2)
+        if xs[k + 1] > xs[k]
+    ]
+
+
+def lane_intervals(rings, y):
+    """Inside intervals [(x0, x1), ...] of a horizontal line at y.
+
+    rings is a list of closed rings: the outer boundary first, then holes.
+    Holes are subtracted as a union, so they may overlap each other (e.g.
+    obstacle zones on top of a pier) without cancelling out.
+    """
+    inside = _ring_intervals(rings[0], y)
+    if len(rings) == 1 or not inside:
+        return inside
+
+    blocked = []
+    for ring in rings[1:]:
+        blocked.extend(_ring_intervals(ring, y))
+    if not blocked:
+        return inside
+    blocked.sort()
+    merged = [list(blocked[0])]
+    for a, b in blocked[1:]:
+        if a <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+
+    out = []
+    for a, b in inside:
+        for h0, h1 in merged:
+            if h1 <= a or h0 >= b:
+                continue
+            if h0 > a:
+                out.append((a, h0))
+            a = max(a, h1)
+            if a >= b:
+                break
+        if a < b:
+            out.append((a, b))
+    return out
+
+
+def sweep_lanes(rings, lane_spacing):
+    """Horizontal lanes [(y, intervals), ...] covering the outer ring.
+
+    Lanes sit half a spacing in from the extreme edges so that the first
+    and last lane image right up to the boundary instead of grazing a
+    vertex.
+    """
+    ys = [p[1] for p in rings[0]]
+    min_y, max_y = min(ys), max(ys)
+    height = max_y - min_y
+    count = max(1, int(math.ceil(height / lane_spacing - 1e-9)))
+    offset = (height - (count - 1) * lane_spacing) * 0.5
+    lanes = []
+    for k in range(count):
+        y = min_y + offset + k * lane_spacing
+        intervals = lane_intervals(rings, y)
+        if intervals:
+            lanes.append((y, intervals))
+    return lanes
+
+
+def lane_points(x0, x1, y, spacing):
+    """Points along one lane from x0 to x1, at most `spacing` apart."""
+    length = abs(x1 - x0)
+    steps = max(1, int(math.ceil(length / spacing - 1e-9))) if spacing > 0 else 1
+    return [(x0 + (x1 - x0) * (i / steps), y) for i in range(steps + 1)]
+
+
+def path_stats(waypoints):
+    """(length_m, turns) for driving the waypoints in order."""
+    length = 0.0
+    turns = 0
+    prev_heading = None
+    for i in range(1, len(waypoints)):
+        x0, y0 = waypoints[i - 1]
+        x1, y1 = waypoints[i]
+        dx = x1 - x0
+        dy = y1 - y0
+        d = math.hypot(dx, dy)
+        if d < 1e-9:
+            continue
+        length += d
+        heading = math.degrees(math.atan2(dy, dx))
+        if prev_heading is not None:
+            delta = abs((heading - prev_heading + 180.0) % 360.0 - 180.0)
+            if delta > TURN_THRESHOLD_DEG:
+                turns += 1
+        prev_heading = heading
+    return length, turns
+
+
+# --- planning ----------------------------------------------------------------
+
+def decompose_cells(lanes, rings=None):
+    """Split swept lanes into boustrophedon cells.
+
+    Each cell is a list of (y, x0, x1) rows, one per lane, that can be
+    covered back and forth without leaving the free space. A row joins
+    the cell of the row below it only when the two overlap one-to-one;
+    any split (an island or concavity appearing) or merge (one ending)
+    closes the cells involved and opens new ones, which makes every cell
+    monotone in the sweep direction. With rings given, a row also starts
+    a new cell when the straight leg from either end of the row below
+    would leave the free space (row extents shifting past a hole corner
+    or along a concave edge).
+    """
+    cells = []
+    prev = []  # [(x0, x1, cell_index)] for the previous lane
+    prev_y = None
+    for y, intervals in lanes:
+        up = [[] for _ in intervals]
+        down = [[] for _ in prev]
+        for i, (a0, a1) in enumerate(intervals):
+            for j, (b0, b1, _) in enumerate(prev):
+                if a0 < b1 and b0 < a1:
+                    up[i].append(j)
+                    down[j].append(i)
+
+        current = []
+        for i, (a0, a1) in enumerate(intervals):
+            if len(up[i]) == 1 and len(down[up[i][0]]) == 1 and (
+                not rings or _rows_join(rings, prev[up[i][0]], prev_y,
+                                        a0, a1, y)
+            ):
+                cell_index = prev[up[i][0]][2]
+            else:
+                cell_index = len(cells)
+                cells.append([])
+            cells[cell_index].append((y, a0, a1))
+            current.append((a0, a1, cell_index))
+        prev = current
+        prev_y = y
+    return cells
+
+
+def _rows_join(rings, below, y0, a0, a1, y1):
+    """True if both ends of the row below link straight to this row's."""
+    b0, b1, _ = below
+    return (segment_free(rings, (b0, y0), (a0, y1))
+            and segment_free(rings, (b1, y0), (a1, y1)))
+
+
+def _cell_path(cell, spacing, from_top, from_right):
+    rows = list(reversed(cell)) if from_top else cell
+    points = []
+    right = from_right
+    for y, x0, x1 in rows:
+        if right:
+            points.extend(lane_points(x1, x0, y, spacing))
+        else:
+            points.extend(lane_points(x0, x1, y, spacing))
+        right = not right
+    return points
+
+
+def _point_free(rings, x, y, eps=1e-6):
+    """True if (x, y) is in the free space; the boundary counts as free.
+
+    Probing just above and below y keeps points on horizontal edges (and
+    rounding noise around them) from counting as outside.
+    """
+    ys = (y - eps, y, y + eps)
+    if not any(
+        a - eps <= x <= b + eps
+        for yy in ys for a, b in _ring_intervals(rings[0], yy)
+    ):
+        return False
+    for ring in rings[1:]:
+        if all(
+            any(a + eps < x < b - eps for a, b in _ring_intervals(ring, yy))
+            for yy in ys
+        ):
+            return False
+    return True
+
+
+def segment_free(rings, p, q):
+    """True if the straight leg p -> q stays inside the free space.
+
+    The leg is cut wherever it meets a ring edge and the middle of every
+    piece is tested, so legs that run along a boundary or start on one
+    are fine while legs through a hole or across a concavity are not.
+    """
+    dx = q[0] - p[0]
+    dy = q[1] - p[1]
+    ts = [0.0, 1.0]
+    for ring in rings:
+        n = len(ring)
+        for i in range(n):
+            ax, ay = ring[i - 1]
+            bx, by = ring[i]
+            ex = bx - ax
+            ey = by - ay
+            den = dx * ey - dy * ex
+            if abs(den) < 1e-12:
+                continue  # parallel; collinear overlap is boundary = free
+            t = ((ax - p[0]) * ey - (ay - p[1]) * ex) / den
+            u = ((ax - p[0]) * dy - (ay - p[1]) * dx) / den
+            if 0.0 < t < 1.0 and -1e-9 <= u <= 1.0 + 1e-9:
+                ts.append(t)
+    ts.sort()
+    for t0, t1 in zip(ts, ts[1:]):
+        if t1 - t0 < 1e-9:
+            continue
+        tm = (t0 + t1) * 0.5
+        if not _point_free(rings, p[0] + dx * tm, p[1] + dy * tm):
+            return False
+    return True
+
+
+class _TransitGraph:
+    """Row endpoints of all cells plus the ring vertices, linked where the
+    straight leg is free. Routes transits that would otherwise cut
+    through a hole or across a concavity; the vertices let a route bend
+    round a corner that lies between two lanes. A node only links to
+    nodes between the lanes just below and just above it, which keeps
+    the graph sparse. via adds more (y, x0, x1) rows whose ends may be
+    used as stepping stones."""
+
+    def __init__(self, cells, rings, via=()):
+        self.rings = rings
+        lane_ys = set()
+        nodes = set()
+        for cell in list(cells) + [list(via)]:
+            for y, x0, x1 in cell:
+                lane_ys.add(y)
+                nodes.update(((x0, y), (x1, y)))
+        for ring in rings:
+            nodes.update((float(x), float(y)) for x, y in ring)
+        self.lane_ys = sorted(lane_ys)
+        self.nodes = sorted(nodes, key=lambda p: (p[1], p[0]))
+        self._node_ys = [p[1] for p in self.nodes]
+        self._edges = {}
+
+    def _band(self, y):
+        """(lo, hi): the nearest lanes strictly below and above y."""
+        k = bisect.bisect_left(self.lane_ys, y)
+        lo = self.lane_ys[k - 1] if k > 0 else -math.inf
+        k = bisect.bisect_right(self.lane_ys, y)
+        hi = self.lane_ys[k] if k < len(self.lane_ys) else math.inf
+        return lo, hi
+
+    def _neighbours(self, node):
+        edges = self._edges.get(node)
+        if edges is None:
+            lo, hi = self._band(node[1])
+            edges = []
+            for other in self.nodes[bisect.bisect_left(self._node_ys, lo):
+                                    bisect.bisect_right(self._node_ys, hi)]:
+                if other != node and segment_free(self.rings, node, other):
+                    edges.append((other, math.hypot(
+                        other[0] - node[0], other[1] - node[1])))
+            self._edges[node] = edges
+        return edges
+
+    def distances(self, source, target=None):
+        """Dijkstra from source: ({node: metres}, {node: previous node}).
+
+        With a target, stops as soon as the target's distance is final.
+        """
+        dist = {source: 0.0}
+        prev = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist.get(node, float("inf")):
+                continue
+            if node == target:
+                break
+            for other, w in self._neighbours(node):
+                nd = d + w
+                if nd < dist.get(other, float("inf")):
+                    dist[other] = nd
+                    prev[other] = node
+                    heapq.heappush(heap, (nd, other))
+        return dist, prev
+
+
+def order_cells(cells, spacing, start=None, rings=None, via=()):
+    """Visit every cell once, greedily choosing the nearest entry corner.
+
+    Each cell can be entered at any of its four corners (first or last
+    row, left or right end); the remaining rows alternate from there.
+    With rings given, a transit whose straight leg would leave the free
+    space is routed along cell row ends instead and charged its routed
+    length (via: extra free rows to route over, see _TransitGraph).
+    Returns the concatenated waypoint list.
+    """
+    waypoints = []
+    remaining = list(range(len(cells)))
+    graph = None
+    pos = start
+    if pos is None and cells:
+        y, x0, _ = cells[0][0]
+        pos = (x0, y)
+    while remaining:
+        best = None
+        routes = None
+        for ci in remaining:
+            cell = cells[ci]
+            for from_top in (False, True):
+                y, x0, x1 = cell[-1] if from_top else cell[0]
+                for from_right in (False, True):
+                    entry = (x1 if from_right else x0, y)
+                    d = math.hypot(entry[0] - pos[0], entry[1] - pos[1])
+                    if best is not None and d >= best[0]:
+                        continue  # routing never makes a leg shorter
+                    if rings is not None and len(rings) > 0 \
+                            and not segment_free(rings, pos, entry):
+                        if routes is None:
+                            if graph is None:
+                                graph = _TransitGraph(cells, rings, via)
+                            routes = graph.distances(pos)
+                        d = routes[0].get(entry, float("inf"))
+                        if best is not None and d >= best[0]:
+                            continue
+                    best = (d, ci, from_top, from_right, entry)
+        _, ci, from_top, from_right, entry = best
+        remaining.remove(ci)
+        if routes is not None and entry in routes[1]:
+            detour = []
+            node = routes[1][entry]
+            while node != pos:
+                detour.append(node)
+                node = routes[1][node]
+            waypoints.extend(reversed(detour))
+        path = _cell_path(cells[ci], spacing, from_top, from_right)
+        waypoints.extend(path)
+        if path:
+            pos = path[-1]
+    return waypoints
+
+
+def _plan_rotated(rings, lane_spacing):
+    """Boustrophedon over already-rotated rings.
+
+    Returns (waypoints, lanes, cells).
+    """
+    lanes = sweep_lanes(rings, lane_spacing)
+    cells = decompose_cells(lanes, rings)
+    waypoints = order_cells(cells, lane_spacing, rings=rings)
+    return waypoints, len(lanes), len(cells)
+
+
+def route_around(waypoints, rings, lane_spacing, angle_deg=0.0):
+    """Keep a planned path out of holes added after it was planned.
+
+    rings is the outer polygon followed by every hole, old and new;
+    lane_spacing and angle_deg are those of the plan. Waypoints that are
+    no longer in the free space are dropped and every leg that now
+    leaves it is routed along the sweep lanes and ring corners instead.
+    Returns (waypoints, index): index[i] is where the legs leading to
+    original waypoint i start in the new list (index[len(waypoints)] is
+    its length), so progress along the old list can be carried over.
+    """
+    rot = [_rotate(ring, -angle_deg) for ring in rings]
+    pts = _rotate(waypoints, -angle_deg)
+    keep = [_point_free(rot, x, y) for x, y in pts]
+    kept = [i for i in range(len(pts)) if keep[i]]
+    blocked = [
+        (a, b) for a, b in zip(kept, kept[1:])
+        if not segment_free(rot, pts[a], pts[b])
+    ]
+    graph = None
+    if blocked:
+        via = [
+            (y, x0, x1)
+            for y, intervals in sweep_lanes(rot, lane_spacing)
+            for x0, x1 in intervals
+        ]
+        for a, b in blocked:
+            via.extend(((pts[a][1], pts[a][0], pts[a][0]),
+                        (pts[b][1], pts[b][0], pts[b][0])))
+        graph = _TransitGraph([], rot, via)
+    into = {b: a for a, b in blocked}
+
+    out = []
+    index = []
+    for j, wp in enumerate(waypoints):
+        # Waypoints dropped since the last kept one start at the detour
+        index.append(len(out))
+        if not keep[j]:
+            continue
+        i = into.get(j)
+        if i is not None:
+            dist, prev = graph.distances(pts[i], target=pts[j])
+            if pts[j] in dist:
+                detour = []
+                node = prev[pts[j]]
+                while node != pts[i]:
+                    detour.append(node)
+                    node = prev[node]
+                out.extend(_rotate(list(reversed(detour)), angle_deg))
+            # else no way round: leave the straight leg
+        out.append(wp)
+    index.append(len(out))
+    return out, index
+
+
+def evaluate_angle(polygon, lane_spacing, angle_deg, holes=()):
+    """Plan at one sweep angle and return a SweepCandidate."""
+    rings = [_rotate(ring, -angle_deg) for ring in [polygon] + list(holes)]
+    rotated_wps, lanes, cells = _plan_rotated(rings, lane_spacing)
+    waypoints = _rotate(rotated_wps, angle_deg)
+    length, turns = path_stats(waypoints)
+    return SweepCandidate(angle_deg, lanes, waypoints, length, turns, cells)
+
+
+def evaluate_sweep_angles(polygon, lane_spacing, angles=None, holes=()):
+    """SweepCandidate for every angle in `angles` (default: candidate_angles)."""
+    if angles is None:
+        angles = candidate_angles(polygon)
+    return [evaluate_angle(polygon, lane_spacing, a, holes) for a in angles]
+
+
+def ring_area(ring):
+    area = 0.0
+    n = len(ring)
+    for i in range(n):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % n]
+        area += x1 * y2 - x2 * y1
+    return abs(area) * 0.5
+
+
+def plan(polygon, lane_spacing, sweep_angle_deg=None,
+         turn_cost_m=DEFAULT_TURN_COST_M, holes=None):
+    """Plan coverage of `polygon` with lanes `lane_spacing` metres apart.
+
+    holes is an optional list of rings (piers, moorings, ...) to keep out
+    of. If sweep_angle_deg is None every candidate angle is evaluated and
+    the one with the lowest path length plus turn cost wins; otherwise
+    only the given angle is planned.
+    """
+    if not polygon or len(polygon) < 3 or lane_spacing <= 0:
+        return CoveragePlan([], sweep_angle_deg or 0.0, lane_spacing, [])
+
+    polygon = [(float(p[0]), float(p[1])) for p in polygon]
+    holes = [
+        [(float(p[0]), float(p[1])) for p in ring]
+        for ring in (holes or [])
+        if ring and len(ring) >= 3
+    ]
+
+    if sweep_angle_deg is not None:
+        candidates = evaluate_sweep_angles(
+            polygon, lane_spacing, [float(sweep_angle_deg)], holes
+        )
+    else:
+        candidates = evaluate_sweep_angles(
+            polygon, lane_spacing, holes=holes
+        )
+
+    best = min(candidates, key=lambda c: c.cost(turn_cost_m))
+    free_area = ring_area(polygon) - sum(ring_area(h) for h in holes)
+    return CoveragePlan(
+        best.waypoints, best.angle_deg, lane_spacing, candidates,
+        lower_bound_m=max(0.0, free_area) / lane_spacing,
+    )
+
+
+def plan_around(polygon, lane_spacing, holes=None, detour_holes=None,
+                **kwargs):
+    """plan() around holes, then route_around() the detour_holes.
+
+    Hazards found during a mission go into detour_holes: the sweep keeps
+    the lanes it was planned with, so progress along it still counts,
+    and only the legs that now cross a hazard are bent round it.
+    """
+    result = plan(polygon, lane_spacing, holes=holes, **kwargs)
+    detour_holes = [r for r in (detour_holes or []) if r and len(r) >= 3]
+    if detour_holes and result.waypoints:
+        rings = [polygon] + list(holes or []) + detour_holes
+        rings = [[(float(p[0]), float(p[1])) for p in r] for r in rings]
+        result.waypoints, result.route_index = route_around(
+            result.waypoints, rings, lane_spacing, result.angle_deg
+        )
+    return result
+
+
+# --- background planning -----------------------------------------------------
+
+class PlanWorker:
+    """Runs plan_around() off the main loop, one plan at a time.
+
+    request(key, ...) starts planning for a new key and is a no-op for
+    the key last requested, so callers may ask on every poll. poll()
+    returns (key, CoveragePlan) once, when the latest request is done;
+    results of superseded requests are dropped. With processes=False
+    the plan is made inline in request() (e.g. for a trace replay).
+    """
+
+    def __init__(self, processes=True):
+        self._pool = None
+        if processes:
+            # Not forked: the capture and flusher threads may hold locks
+            self._pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        self._key = None
+        self._future = None
+        self._result = None
+        self._started_at = None
+        self.plans = 0
+        self.last_plan_s = None
+
+    def request(self, key, *args, **kwargs):
+        """Plan for key unless it is the key last requested.
+
+        Returns True if a new plan was started.
+        """
+        if self._key is not None and key == self._key:
+            return False
+        self._key = key
+        self._started_at = time.monotonic()
+        if self._future is not None:
+            self._future.cancel()  # only if it has not started yet
+            self._future = None
+        if self._pool is None:
+            try:
+                self._result = plan_around(*args, **kwargs)
+            except Exception as e:
+                print("[COVERAGE] Planning failed:", e)
+                self._result = None
+            self._finish()
+        else:
+            self._result = None
+            self._future = self._pool.submit(plan_around, *args, **kwargs)
+        return True
+
+    def _finish(self):
+        self.plans += 1
+        self.last_plan_s = time.monotonic() - self._started_at
+
+    def busy(self):
+        return self._future is not None
+
+    def poll(self):
+        """(key, plan) once the latest requested plan is ready, else None."""
+        if self._future is not None:
+            if not self._future.done():
+                return None
+            future, self._future = self._future, None
+            try:
+                self._result = future.result()
+            except Exception as e:
+                print("[COVERAGE] Planning failed:", e)
+                self._result = None
+            self._finish()
+        if self._result is None:
+            return None
+        result, self._result = self._result, None
+        return self._key, result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
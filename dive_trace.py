@@ -0,0 +1,461 @@
+# dive_trace.py
+# Record and replay of serial, GPS and backend traffic.
+#
+# Recording: run main.py with SUB_TRACE=/path/dive.trc and every byte
+# the NanoLink receives or sends, every NMEA line read from the GPS and
+# every backend request/response is appended to a compact binary trace.
+#
+# Replay: `python dive_trace.py replay dive.trc [--fast]` runs main.main()
+# against the recording instead of the hardware and the network; the
+# camera, flashlight, LED and leak sensor are inert stand-ins, and all
+# files go to a temporary directory removed at exit. Serial
+# RX bytes, NMEA lines and HTTP responses are released according to
+# their recorded timestamps, either in real time (1x) or as fast as
+# possible on a virtual clock. Loop latency statistics are printed at the
+# end, so changes can be benchmarked against real dive traces.
+#
+# File format: MAGIC, then records of
+#   <d timestamp> <B channel> <I length> <payload>
+# HTTP payloads are a one-line JSON header, "\n", then the response body.
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time as _time
+from collections import deque
+from urllib.parse import urlsplit
+
+from serial_link import TAP_RX, TAP_TX
+
+MAGIC = b"SUBTRACE1\n"
+_REC = struct.Struct("<dBI")
+
+SERIAL_RX = TAP_RX
+SERIAL_TX = TAP_TX
+GPS_NMEA = 3
+HTTP = 4
+
+# Virtual time per loop iteration once the serial RX bytes run out
+IDLE_STEP_S = 0.05
+
+CHANNEL_NAMES = {
+    SERIAL_RX: "serial_rx",
+    SERIAL_TX: "serial_tx",
+    GPS_NMEA: "gps",
+    HTTP: "http",
+}
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+class TraceRecorder:
+    """Appends records to a trace file; safe to call from any thread."""
+
+    def __init__(self, path):
+        self._f = open(path, "ab")
+        if self._f.tell() == 0:
+            self._f.write(MAGIC)
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def write(self, channel, payload, t=None):
+        t = _time.time() if t is None else t
+        with self._lock:
+            self._f.write(_REC.pack(t, channel, len(payload)))
+            self._f.write(payload)
+            self.records += 1
+
+    def tap(self, channel, data):
+        """NanoLink tap hook: tap(SERIAL_RX / SERIAL_TX, bytes)."""
+        self.write(channel, bytes(data))
+
+    def http(self, method, url, status=None, body=b"", rtt_s=0.0,
+             req_bytes=0, error=None):
+        header = {
+            "m": method,
+            "u": urlsplit(url).path,
+            "s": status,
+            "rtt": round(rtt_s, 4),
+            "n": req_bytes,
+        }
+        if error is not None:
+            header["e"] = str(error)
+        payload = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        self.write(HTTP, payload + b"\n" + (body or b""))
+
+    def flush(self):
+        with self._lock:
+            self._f.flush()
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+class RecordingSerial:
+    """Wraps the GPS serial port and records every line read."""
+
+    def __init__(self, ser, recorder):
+        self._ser = ser
+        self._recorder = recorder
+
+    def readline(self):
+        line = self._ser.readline()
+        if line:
+            self._recorder.write(GPS_NMEA, line)
+        return line
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+
+def read_trace(path):
+    """Yield (t, channel, payload) for every record in a trace file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not a dive trace: %s" % path)
+        while True:
+            head = f.read(_REC.size)
+            if len(head) < _REC.size:
+                return
+            t, channel, n = _REC.unpack(head)
+            payload = f.read(n)
+            if len(payload) < n:
+                return  # truncated tail from a crash
+            yield t, channel, payload
+
+
+def split_http(payload):
+    header, _, body = payload.partition(b"\n")
+    return json.loads(header.decode("utf-8")), body
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+class ReplayClock:
+    """Stands in for the time module inside main.py during a replay.
+
+    speed > 0 runs at speed x real time from the first record; speed 0
+    is a virtual clock that jumps straight to the next recorded event.
+    """
+
+    def __init__(self, t0, speed=1.0):
+        self.t0 = t0
+        self.speed = float(speed)
+        self._virtual = t0
+        self._wall0 = _time.monotonic()
+
+    @property
+    def fast(self):
+        return self.speed <= 0
+
+    def time(self):
+        if self.fast:
+            return self._virtual
+        return self.t0 + (_time.monotonic() - self._wall0) * self.speed
+
+    def monotonic(self):
+        return self.time()
+
+    def advance_to(self, t):
+        if self.fast and t > self._virtual:
+            self._virtual = t
+
+    def sleep(self, s):
+        if self.fast:
+            self._virtual += s
+        else:
+            _time.sleep(s / self.speed)
+
+    def localtime(self, t=None):
+        return _time.localtime(self.time() if t is None else t)
+
+    def strftime(self, fmt, t=None):
+        return _time.strftime(fmt, self.localtime() if t is None else t)
+
+
+class _Channels:
+    def __init__(self, records):
+        self.queues = {c: deque() for c in CHANNEL_NAMES}
+        for t, channel, payload in records:
+            if channel in self.queues:
+                self.queues[channel].append((t, payload))
+        self.t_end = records[-1][0] if records else 0.0
+
+
+class ReplayLink:
+    """NanoLink stand-in fed from recorded SERIAL_RX bytes."""
+
+    def __init__(self, channels, clock, stats):
+        from status_schema import StatusDecoder
+
+        self.channels = channels
+        self.clock = clock
+        self.stats = stats
+        self.tap = None
+        self._buf = bytearray()
+        self._decoder = StatusDecoder()
+        self.tx_lines = 0
+
+    def read_status(self):
+        self.stats.loop_tick()
+        q = self.channels.queues[SERIAL_RX]
+        now = self.clock.time()
+        if now > self.channels.t_end:
+            raise ReplayFinished()
+        if self.clock.fast and (not q or q[0][0] > now):
+            # Nothing due yet: jump the virtual clock to the next byte, or
+            # step through the tail of the trace after the last one
+            self.clock.advance_to(q[0][0] if q else now + IDLE_STEP_S)
+            now = self.clock.time()
+
+        while q and q[0][0] <= now:
+            self._buf.extend(q.popleft()[1])
+        if b"\n" not in self._buf:
+            return None
+        line, _, rest = self._buf.partition(b"\n")
+        self._buf = bytearray(rest)
+        return self._decoder.decode(line.decode("ascii", errors="ignore"))
+
+    def send_line(self, line, cls=None, key=None):
+        self.tx_lines += 1
+
+    def send_goto(self, x, y, speed, seq=None):
+        self.tx_lines += 1
+
+    def send_clear(self, seq):
+        self.tx_lines += 1
+
+    def send_state(self, **kwargs):
+        self.tx_lines += 1
+
+    def tx_stats(self):
+        return {"sent": self.tx_lines}
+
+    def link_health(self):
+        return {}
+
+    def link_degraded(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ReplayGPS:
+    """Serial port stand-in returning recorded NMEA lines."""
+
+    def __init__(self, channels, clock):
+        self.channels = channels
+        self.clock = clock
+
+    def readline(self):
+        q = self.channels.queues[GPS_NMEA]
+        if q and q[0][0] <= self.clock.time():
+            return q.popleft()[1]
+        return b""
+
+
+class ReplayOutput:
+    """Flashlight / RGB LED stand-in that drives no GPIO."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class ReplayLeakSensor:
+    """Leak sensor stand-in; the trace has no leak channel, so it never trips."""
+
+    def update(self):
+        return False
+
+    def is_latched(self):
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def replay_capture(filepath, flashlight=None, settle_s=1.0, **kwargs):
+    """capture_still() stand-in: a placeholder file, no camera or flash."""
+    from capture_worker import CaptureResult
+
+    with open(filepath, "wb") as f:
+        f.write(b"replay\n")
+    return CaptureResult(filepath, 0.0, 0.0, 0.0)
+
+
+class _ReplayResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = body
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+
+class ReplayHTTP:
+    """Replaces the requests module: answers from recorded responses.
+
+    Responses are matched per (method, path) in recorded order; a request
+    with nothing left to answer raises like a dead network would.
+    """
+
+    def __init__(self, channels, clock):
+        self.clock = clock
+        self._by_key = {}
+        for t, payload in channels.queues[HTTP]:
+            header, body = split_http(payload)
+            key = (header["m"].upper(), header["u"])
+            self._by_key.setdefault(key, deque()).append((header, body))
+        channels.queues[HTTP].clear()
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        q = self._by_key.get((method.upper(), urlsplit(url).path))
+        if not q:
+            raise ConnectionError("no recorded response for %s %s" % (method, url))
+        header, body = q.popleft()
+        self.clock.sleep(header.get("rtt", 0.0))
+        if header.get("e"):
+            raise ConnectionError(header["e"])
+        return _ReplayResponse(header.get("s") or 0, body)
+
+    def head(self, url, **kwargs):
+        return _ReplayResponse(200, b"")
+
+
+class LoopStats:
+    def __init__(self):
+        self.iterations = 0
+        self._last = None
+        self.intervals = []
+
+    def loop_tick(self):
+        now = _time.perf_counter()
+        if self._last is not None:
+            self.intervals.append(now - self._last)
+        self._last = now
+        self.iterations += 1
+
+    def report(self, wall_s):
+        print("[REPLAY] Loop iterations:", self.iterations)
+        print("[REPLAY] Wall time: %.2fs" % wall_s)
+        if not self.intervals:
+            return
+        xs = sorted(self.intervals)
+
+        def pct(p):
+            return xs[min(len(xs) - 1, int(p * len(xs)))] * 1000.0
+
+        print(
+            "[REPLAY] Loop latency ms: p50=%.3f p90=%.3f p99=%.3f max=%.3f"
+            % (pct(0.50), pct(0.90), pct(0.99), xs[-1] * 1000.0)
+        )
+
+
+def replay(path, speed=1.0):
+    """Run main.main() against a recorded trace."""
+    import capture_worker
+    import main as app
+
+    records = list(read_trace(path))
+    if not records:
+        print("[REPLAY] Empty trace")
+        return
+    channels = _Channels(records)
+    clock = ReplayClock(records[0][0], speed)
+    stats = LoopStats()
+
+    workdir = tempfile.mkdtemp(prefix="replay_")
+    # Registered before main() registers the stager's close, so it runs
+    # after the last flush into workdir
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    app.time = clock
+    app.requests = ReplayHTTP(channels, clock)
+    app._link = ReplayLink(channels, clock, stats)
+    app.open_gps = lambda: ReplayGPS(channels, clock)
+    app.Flashlight = ReplayOutput
+    app.RGB = ReplayOutput
+    app._open_leakage_sensor = ReplayLeakSensor
+    app.capture_still = replay_capture
+    capture_worker.capture_still = replay_capture
+    app.PHOTO_DIR = os.path.join(workdir, "photos")
+    app.LOW_PRIORITY_DIR = os.path.join(app.PHOTO_DIR, "duplicates")
+    app.PHOTO_STAGE_DIR = os.path.join(workdir, "stage")
+    app.CHECKPOINT_PATH = os.path.join(workdir, "checkpoint.json")
+    app.LOG_PATH = os.path.join(workdir, "sub.jsonl")
+    os.makedirs(app.LOW_PRIORITY_DIR, exist_ok=True)
+    app.TRACE_PATH = None
+    # Drivers must run in-process to see the patched clock and channels
+    app.DRIVER_PROCESSES = False
+
+    print("[REPLAY] %d records, %.1fs of dive, speed=%s"
+          % (len(records), records[-1][0] - records[0][0],
+             "fast" if clock.fast else "%gx" % speed))
+    t0 = _time.perf_counter()
+    try:
+        app.main()
+    except ReplayFinished:
+        pass
+    stats.report(_time.perf_counter() - t0)
+    print("[REPLAY] TX lines:", app._link.tx_lines,
+          "HTTP requests:", app.requests.requests)
+
+
+def info(path):
+    counts = {}
+    size = {}
+    first = last = None
+    for t, channel, payload in read_trace(path):
+        name = CHANNEL_NAMES.get(channel, str(channel))
+        counts[name] = counts.get(name, 0) + 1
+        size[name] = size.get(name, 0) + len(payload)
+        first = t if first is None else first
+        last = t
+    if first is None:
+        print("empty trace")
+        return
+    print("duration: %.1fs" % (last - first))
+    for name in sorted(counts):
+        print("%-10s %7d records %9d bytes" % (name, counts[name], size[name]))
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Dive trace tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_replay = sub.add_parser("replay", help="run main.py against a trace")
+    p_replay.add_argument("trace")
+    p_replay.add_argument("--fast", action="store_true",
+                          help="as fast as possible on a virtual clock")
+    p_replay.add_argument("--speed", type=float, default=1.0)
+    p_info = sub.add_parser("info", help="summarise a trace")
+    p_info.add_argument("trace")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "info":
+        info(args.trace)
+    else:
+        replay(args.trace, 0.0 if args.fast else args.speed)
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,384 @@
+# driver_workers.py
+# Peripheral drivers in supervised child processes.
+#
+# A stuck serial readline, a wedged DHT read, a hung libcamera-still or
+# a slow HTTP call must never stall the control loop (leak handling,
+# STATUS, GOTOs). Each such driver runs in its own process and talks to
+# the loop over a Pipe:
+#
+#   sampler  the child calls sample(device) every period_s and pushes the
+#            value; the loop reads .latest (GPS fix, DHT reading)
+#   rpc      the loop submit()s calls and collects them with poll(), or
+#            call()s them from a worker thread (camera, uplink)
+#
+# The child also sends a heartbeat every HEARTBEAT_S from a side thread.
+# The watchdog (run from poll()/call()) restarts a worker whose process
+# died, stopped heartbeating, produced no sample for stall_s, did not
+# finish setup within setup_timeout_s, or missed a call deadline. Each
+# call has a timeout (call_timeout_s unless given per call): it may run
+# that long once the child starts it, and must be done within its own
+# timeout plus those of the calls queued ahead of it (and what is left
+# of setup), counted from submission, so a child that never gets to it
+# is caught too. Restarts
+# back off exponentially. Outstanding calls of a killed worker fail with
+# WorkerTimeout. Every worker keeps latency percentiles and restart counts.
+#
+# Workers are started with the "forkserver" method: the loop already
+# runs threads (bring-up, capture, flusher) when they start or restart,
+# and a plain fork could copy a lock one of them holds. setup/sample/
+# handler functions must therefore be module-level so they pickle.
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+HEARTBEAT_S = 1.0
+
+_mp = multiprocessing.get_context("forkserver")
+
+
+class WorkerTimeout(Exception):
+    pass
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _child_main(conn, setup, sample, period_s, handlers):
+    lock = threading.Lock()
+
+    def send(msg):
+        with lock:
+            conn.send(msg)
+
+    def heartbeat():
+        while True:
+            time.sleep(HEARTBEAT_S)
+            try:
+                send(("hb", time.time()))
+            except (OSError, EOFError):
+                return
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    try:
+        device = setup() if setup is not None else None
+    except Exception as e:
+        send(("fatal", repr(e)))
+        return
+    send(("ready", time.time()))
+
+    if sample is not None:
+        while True:
+            t0 = time.monotonic()
+            try:
+                send(("v", sample(device), time.monotonic() - t0))
+            except Exception as e:
+                send(("err", repr(e), time.monotonic() - t0))
+            time.sleep(max(0.0, period_s - (time.monotonic() - t0)))
+
+    while True:
+        try:
+            rid, method, args, kwargs = conn.recv()
+        except EOFError:
+            return
+        t0 = time.monotonic()
+        send(("s", rid))
+        try:
+            result = handlers[method](device, *args, **kwargs)
+            send(("r", rid, True, result, time.monotonic() - t0))
+        except Exception as e:
+            send(("r", rid, False, repr(e), time.monotonic() - t0))
+
+
+class DriverWorker:
+    """One supervised driver process; see the module comment."""
+
+    def __init__(self, name, setup=None, sample=None, period_s=1.0,
+                 handlers=None, stall_s=10.0, call_timeout_s=15.0,
+                 heartbeat_timeout_s=5.0, setup_timeout_s=30.0,
+                 base_backoff_s=1.0, max_backoff_s=60.0):
+        self.name = name
+        self.setup = setup
+        self.sample = sample
+        self.period_s = float(period_s)
+        self.handlers = dict(handlers or {})
+        self.stall_s = float(stall_s)
+        self.call_timeout_s = float(call_timeout_s)
+        self.heartbeat_timeout_s = float(heartbeat_timeout_s)
+        self.setup_timeout_s = float(setup_timeout_s)
+        self.base_backoff_s = float(base_backoff_s)
+        self.max_backoff_s = float(max_backoff_s)
+
+        self._proc = None
+        self._conn = None
+        self._backoff_s = self.base_backoff_s
+        self._restart_at = 0.0
+        self._started_at = 0.0
+        self._last_msg = 0.0
+        self._last_value = 0.0
+        self._next_rid = 1
+        # rid -> [method, started_at or None, timeout_s, deadline]
+        self._outstanding = {}
+        self._done = {}         # rid -> (ok, result) for call()
+
+        self.ready = False
+        self.latest = None      # sampler: last value
+        self.latest_at = None   # sampler: monotonic time of last value
+        self.last_error = None
+        self.restarts = 0
+        self.latencies = deque(maxlen=200)
+
+    # --- process management ---------------------------------------------------
+
+    def start(self):
+        parent, child = _mp.Pipe()
+        self._proc = _mp.Process(
+            target=_child_main,
+            args=(child, self.setup, self.sample, self.period_s, self.handlers),
+            name="driver-" + self.name,
+            daemon=True,
+        )
+        self._proc.start()
+        child.close()
+        self._conn = parent
+        now = time.monotonic()
+        self._started_at = self._last_msg = self._last_value = now
+        self.ready = False
+        return self
+
+    def _kill(self, reason):
+        print("[WORKER] %s: %s; restarting in %.1fs"
+              % (self.name, reason, self._backoff_s))
+        self.last_error = reason
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join(timeout=1.0)
+        if self._conn is not None:
+            self._conn.close()
+        self._proc = self._conn = None
+        self.ready = False
+        for rid in list(self._outstanding):
+            self._done[rid] = (False, WorkerTimeout(reason))
+        self._outstanding.clear()
+        self._restart_at = time.monotonic() + self._backoff_s
+        self._backoff_s = min(self._backoff_s * 2.0, self.max_backoff_s)
+
+    def alive(self):
+        return self._proc is not None
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join(timeout=1.0)
+            self._proc = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- loop side -------------------------------------------------------------
+
+    def poll(self):
+        """Drain messages and run the watchdog. Returns finished rpc calls
+        as [(rid, ok, result)]; result is the exception when not ok."""
+        now = time.monotonic()
+        if self._proc is None:
+            if now >= self._restart_at:
+                self.restarts += 1
+                self.start()
+            return self._take_done()
+
+        try:
+            while self._conn.poll(0):
+                self._handle(self._conn.recv(), now)
+        except (EOFError, OSError):
+            self._kill("pipe closed")
+            return self._take_done()
+
+        if not self._proc.is_alive():
+            self._kill("process exited (%s)" % self._proc.exitcode)
+        elif now - self._last_msg > self.heartbeat_timeout_s:
+            self._kill("no heartbeat for %.1fs" % (now - self._last_msg))
+        elif self.sample is not None and now - self._last_value > self.stall_s:
+            self._kill("no sample for %.1fs" % (now - self._last_value))
+        elif not self.ready and now - self._started_at > self.setup_timeout_s:
+            self._kill("setup hung for %.1fs" % (now - self._started_at))
+        else:
+            for method, started_at, timeout_s, deadline in \
+                    self._outstanding.values():
+                if started_at is not None and now - started_at > timeout_s:
+                    self._kill("%s hung for %.1fs" % (method, now - started_at))
+                    break
+                if now > deadline:
+                    self._kill("%s not done by its deadline" % method)
+                    break
+        return self._take_done()
+
+    def _handle(self, msg, now):
+        self._last_msg = now
+        kind = msg[0]
+        if kind == "ready":
+            self.ready = True
+            self._backoff_s = self.base_backoff_s
+        elif kind == "fatal":
+            self.last_error = msg[1]
+            print("[WORKER] %s: setup failed: %s" % (self.name, msg[1]))
+        elif kind == "v":
+            self.latest, self.latest_at = msg[1], now
+            self._last_value = now
+            self.latencies.append(msg[2])
+        elif kind == "err":
+            self.last_error = msg[1]
+            self._last_value = now
+            self.latencies.append(msg[2])
+        elif kind == "s":
+            call = self._outstanding.get(msg[1])
+            if call is not None:
+                call[1] = now
+        elif kind == "r":
+            _, rid, ok, result, elapsed = msg
+            if self._outstanding.pop(rid, None) is not None:
+                self.latencies.append(elapsed)
+                self._done[rid] = (ok, result if ok else WorkerError(result))
+
+    def _take_done(self):
+        if not self._done:
+            return []
+        out = [(rid, ok, res) for rid, (ok, res) in self._done.items()]
+        self._done.clear()
+        return out
+
+    def age(self):
+        """Seconds since the last sample (None if there never was one)."""
+        if self.latest_at is None:
+            return None
+        return time.monotonic() - self.latest_at
+
+    def fresh(self, max_age_s):
+        age = self.age()
+        return self.latest if age is not None and age <= max_age_s else None
+
+    def busy(self):
+        return len(self._outstanding)
+
+    def submit(self, method, *args, timeout_s=None, **kwargs):
+        """Queue an rpc call. Returns its id, or None while restarting.
+
+        timeout_s overrides call_timeout_s for this call (e.g. sized to
+        the payload of an upload).
+        """
+        if self._proc is None:
+            return None
+        timeout_s = self.call_timeout_s if timeout_s is None \
+            else float(timeout_s)
+        now = time.monotonic()
+        ahead = sum(v[2] for v in self._outstanding.values())
+        if not self.ready:
+            ahead += max(0.0, self.setup_timeout_s - (now - self._started_at))
+        rid = self._next_rid
+        self._next_rid += 1
+        try:
+            self._conn.send((rid, method, args, kwargs))
+        except (OSError, EOFError):
+            self._kill("pipe closed")
+            return None
+        self._outstanding[rid] = [
+            method, None, timeout_s, now + ahead + timeout_s
+        ]
+        return rid
+
+    def call(self, method, *args, **kwargs):
+        """Blocking rpc for use from a single helper thread (e.g. the
+        capture thread). Raises WorkerTimeout/WorkerError on failure."""
+        self.poll()
+        rid = self.submit(method, *args, **kwargs)
+        if rid is None:
+            raise WorkerTimeout("%s worker restarting" % self.name)
+        while True:
+            if self._conn is not None:
+                try:
+                    self._conn.poll(0.05)
+                except (OSError, EOFError):
+                    pass
+            else:
+                time.sleep(0.05)
+            for done_rid, ok, result in self.poll():
+                if done_rid == rid:
+                    if ok:
+                        return result
+                    raise result
+
+    def stats(self):
+        xs = sorted(self.latencies)
+        out = {
+            "alive": self.alive(),
+            "ready": self.ready,
+            "restarts": self.restarts,
+            "calls": len(xs),
+        }
+        if xs:
+            out["p50_ms"] = round(xs[len(xs) // 2] * 1000.0, 1)
+            out["p99_ms"] = round(xs[min(len(xs) - 1, int(0.99 * len(xs)))] * 1000.0, 1)
+            out["max_ms"] = round(xs[-1] * 1000.0, 1)
+        if self.last_error:
+            out["last_error"] = self.last_error
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Driver functions run inside the workers
+# ---------------------------------------------------------------------------
+
+def gps_setup():
+    from Neo6mGPS import open_gps
+    return open_gps()
+
+
+def gps_sample(ser):
+    from Neo6mGPS import get_gps_fix
+    return get_gps_fix(ser)
+
+
+def dht_setup():
+    from tempreture_sensor import TemperatureSensor
+    return TemperatureSensor()
+
+
+def dht_sample(sensor):
+    reading = sensor.update()
+    return reading if reading else sensor.last_ok
+
+
+def camera_setup():
+    try:
+        from flashlight import Flashlight
+        return Flashlight()
+    except Exception as e:
+        print("[FLASH] Flashlight unavailable in camera worker:", e)
+        return None
+
+
+def camera_capture(flashlight, filepath, settle_s=1.0):
+    from capture_worker import capture_still
+    return capture_still(filepath, flashlight, settle_s=settle_s)
+
+
+def uplink_setup():
+    import requests
+    return requests.Session()
+
+
+def uplink_request(session, method, url, kwargs):
+    """Returns (status_code, content) of one HTTP request."""
+    r = session.request(method, url, **kwargs)
+    return r.status_code, r.content
+
+
+def uplink_upload(session, url, filepath, timeout):
+    """POSTs one photo as multipart 'file'. Returns (status_code, bytes)."""
+    with open(filepath, "rb") as f:
+        r = session.post(url, files={"file": f}, timeout=timeout)
+    return r.status_code, os.path.getsize(filepath)
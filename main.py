@@ -1,27 +1,107 @@
 # main.py
+import startup
+
 import time
 import os
-import subprocess
-import requests
+import atexit
+import bisect
 import math
+import json
 import shutil
 
+import coverage_planner
+import driver_workers
+import mission_estimate
+import projection
+import structured_log
+
 from flashlight import Flashlight
 from leakage_sensor import LeakageConfig, LeakageSensor
 from RGB import RGB
 from tempreture_sensor import TemperatureSensor
 from Neo6mGPS import open_gps, get_gps_fix
 from serial_link import NanoLink, SerialLinkConfig
-
-INFO_URL = "https://emils-pp.onrender.com/info/"
-UPDATE_URL = "https://emils-pp.onrender.com/update/"
-UPLOAD_IMAGE_URL = "https://emils-pp.onrender.com/upload_image/"
-OLD_URL = "https://emils-pp.onrender.com/old/"
-
+from waypoint_dispatch import WaypointDispatcher
+from photo_trigger import PhotoTrigger
+from capture_worker import CaptureWorker, capture_still, photo_path
+from photo_dedup import PhotoDeduplicator
+from photo_encoder import PhotoEncoder, UplinkMeter
+from photo_staging import PhotoStager
+from connectivity import ConnectivityMonitor, HALF_OPEN
+from startup import InitTask, bring_up, since_boot_s
+from mission_checkpoint import MissionCheckpoint, plan_hash
+from telemetry import TelemetryEncoder
+from dive_trace import TraceRecorder, RecordingSerial
+from rate_control import RateController, POLL, UPDATE, STATUS, UPLOAD
+from coverage_grid import CoverageGrid
+from obstacle_map import ObstacleMap, FAILED, ULTRASONIC
+
+# Point SUB_BACKEND_URL at mock_backend.py for offline/load testing
+BACKEND_URL = os.environ.get(
+    "SUB_BACKEND_URL", "https://emils-pp.onrender.com"
+).rstrip("/")
+INFO_URL = BACKEND_URL + "/info/"
+UPDATE_URL = BACKEND_URL + "/update/"
+UPLOAD_IMAGE_URL = BACKEND_URL + "/upload_image/"
+OLD_URL = BACKEND_URL + "/old/"
+
+# Base intervals during a survey; RateController scales them by mission
+# phase and link quality within RATE_BOUNDS (seconds, min/max)
 BACKEND_REFRESH = 5      # seconds – how often we poll the backend
 GPS_INTERVAL = 5         # seconds – how often we send GPS + state
+STATUS_INTERVAL = 1      # seconds – how often STATUS is forwarded to /old/
+UPLOAD_INTERVAL = 10     # seconds – how often we try to upload photos
+UPLOAD_TIMEOUT = 10      # seconds – requests timeout of one photo upload
+# Slowest uplink (bytes/s) still treated as healthy: the uplink worker
+# gives a call its request timeout twice plus the payload at this rate
+UPLINK_MIN_BPS = 8000
+RATE_BOUNDS = {
+    POLL: (2.0, 30.0),
+    UPDATE: (1.0, 30.0),
+    STATUS: (0.2, 10.0),
+    UPLOAD: (5.0, 120.0),
+}
+RATE_REPORT_INTERVAL = 60  # seconds – how often effective rates are printed
+WAYPOINT_WINDOW = 3      # GOTOs kept queued on the Seeeduino
 PHOTO_DIR = "/home/pi/photos"
+# Near-duplicate frames are parked here and not uploaded automatically
+LOW_PRIORITY_DIR = os.path.join(PHOTO_DIR, "duplicates")
+DEDUP_DELETE = False     # delete near-duplicates instead of parking them
+# Photos are captured into RAM and flushed to PHOTO_DIR in batches (see
+# photo_staging.py); None captures straight onto the SD card
+PHOTO_STAGE_DIR = "/dev/shm/sub_photos"
+STAGE_MAX_BYTES = 64 * 1024 * 1024  # RAM held by staged photos at most
+STAGE_MAX_FILES = 48
+STAGE_BATCH_FILES = 8    # photos per sequential write + fsync round
+STAGE_MAX_DELAY_S = 5.0  # longest a committed photo waits for its batch
+ENCODE_FORMAT = "JPEG"   # or "WEBP"
+ENCODE_TARGET_UPLOAD_S = 4.0  # aim for each photo to upload in this long
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
 CAMERA_AREA_M2 = 4.0     # footprint area in m^2 for each photo (example)
+PHOTO_OVERLAP = 0.2      # forward overlap between consecutive photos
+POLYGON_LATLON = True    # backend polygon/holes are [lat, lon] pairs
+COVERAGE_TARGET = 0.98   # covered fraction below which gaps are revisited
+MAX_GAP_PASSES = 2       # gap-filling passes after the planned sweep
+# Time/energy model for mission estimates (see mission_estimate.py)
+VEHICLE = mission_estimate.VehicleModel()
+# Traverse speeds (x recommended_speed) tried when looking for a better plan
+ESTIMATE_SPEED_FACTORS = (0.5, 0.75, 1.0, 1.25, 1.5)
+OBSTACLE_CELL_M = 2.0    # bin size of the obstacle/failure map
+OBSTACLE_CLEARANCE_M = 2.0  # keep-out margin around each hazard cell
+CHECKPOINT_PATH = "/home/pi/mission_checkpoint.json"
+# GPS, DHT, camera and uplink run in supervised child processes so a hung
+# driver can't stall the control loop (see driver_workers.py)
+DRIVER_PROCESSES = True
+LINK_RETRY_S = 5.0       # between attempts to open the Seeeduino link
+GPS_FIX_MAX_AGE_S = 10   # older worker fixes count as "no fix"
+WORKER_REPORT_INTERVAL = 60  # seconds – how often worker stats are printed
+LOG_PATH = "/home/pi/logs/sub.jsonl"  # JSON lines, rotated at LOG_MAX_BYTES
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+LOG_CONSOLE_LEVEL = "WARNING"  # hot-path records only go to LOG_PATH
+CHECKPOINT_INTERVAL = 10  # seconds – minimum time between checkpoint writes
+# Record serial/GPS/backend traffic for dive_trace.py replay when set
+TRACE_PATH = os.environ.get("SUB_TRACE")
 
 _SERIAL_CONFIG = SerialLinkConfig(
     port="/dev/serial0",
@@ -29,15 +109,77 @@ _SERIAL_CONFIG = SerialLinkConfig(
     rx_gpio=20,
     tx_gpio=21,
 )
-_link = NanoLink(_SERIAL_CONFIG)
+_link = None
+_link_task = None        # startup.InitTask still opening _link, if any
+_link_retry_at = 0.0
+_uplink = UplinkMeter()
+_trace = None
+_uplink_worker = None    # driver_workers.DriverWorker for HTTP, if running
+_backend_pending = {}    # rid -> (tag, ctx, method, url, t0, request bytes)
+_backend_done = []       # finished (tag, ctx, response or None, error)
+_log_old = structured_log.get_logger("old")
+
+# Imported on first use; pulling in requests/urllib3 costs a noticeable
+# part of a Pi Zero's cold start.
+requests = None
+
+
+def _http():
+    global requests
+    if requests is None:
+        import requests as _requests
+        requests = _requests
+    return requests
+
+
+def _open_link():
+    return NanoLink(_SERIAL_CONFIG)
+
+
+def _get_link():
+    """The NanoLink to the Seeeduino, or None while it is not open.
+
+    Opening runs on an init thread, never in the loop: a link still
+    being opened (e.g. by a bring-up that timed out) is adopted once it
+    is ready, and a failed open is retried every LINK_RETRY_S.
+    """
+    global _link, _link_task, _link_retry_at
+    task = _link_task
+    if _link is None and task is not None and task.done.is_set():
+        _link_task = None
+        if task.error is None:
+            _link = task.value
+            if _trace is not None:
+                _link.tap = _trace.tap
+            print("[SERIAL] Link to Seeeduino open")
+        else:
+            print("[SERIAL] Opening link failed:", task.error)
+            _link_retry_at = time.monotonic() + LINK_RETRY_S
+    if (
+        _link is None
+        and _link_task is None
+        and time.monotonic() >= _link_retry_at
+    ):
+        _link_task = InitTask("serial", _open_link).start()
+    return _link
 
 
 def read_seeeduino_status():
-    return _link.read_status()
+    link = _get_link()
+    return link.read_status() if link is not None else None
 
 
-def send_goto_to_seeeduino(x_m, y_m, speed_ms):
-    return _link.send_goto(x_m, y_m, speed_ms)
+def send_goto_to_seeeduino(x_m, y_m, speed_ms, seq=None):
+    # The dispatcher holds while there is no link; this is just a guard
+    link = _get_link()
+    if link is not None:
+        link.send_goto(x_m, y_m, speed_ms, seq)
+
+
+def send_clear_to_seeeduino(seq):
+    link = _get_link()
+    if link is not None:
+        link.send_clear(seq)
 
 
 def send_state_to_seeeduino(
@@ -50,8 +192,14 @@ def send_state_to_seeeduino(
     hum_pct,
     leakage,
     heading_deg=None,
+    x_m=None,
+    y_m=None,
+    emergency=False,
 ):
-    return _link.send_state(
+    link = _get_link()
+    if link is None:
+        return None
+    return link.send_state(
         above_seabed_m=above_seabed_m,
         autonomous=autonomous,
         lat=lat,
@@ -61,16 +209,203 @@ def send_state_to_seeeduino(
         hum_pct=hum_pct,
         leakage=leakage,
         heading_deg=heading_deg,
+        x_m=x_m,
+        y_m=y_m,
+        emergency=emergency,
     )
 
 
+def _probe_backend():
+    r = _http().head(INFO_URL, timeout=2)
+    return r.status_code < 500
+
+
+_net = ConnectivityMonitor(probe=_probe_backend)
+
+
+def backend_request(method, url, **kwargs):
+    """requests.request() guarded by the connectivity circuit breaker.
+
+    Returns None without touching the network while the breaker is open.
+    Transport errors and 5xx answers count as link failures; errors are
+    re-raised so callers keep their own reporting.
+    """
+    if not _net.allow():
+        return None
+    t0 = time.monotonic()
+    try:
+        r = _http().request(method, url, **kwargs)
+    except Exception as e:
+        _account_backend(method, url, None, time.monotonic() - t0, 0, e)
+        raise
+    data = kwargs.get("data")
+    _account_backend(method, url, r, time.monotonic() - t0,
+                     len(data) if data else 0)
+    return r
+
+
+def _account_backend(method, url, r, rtt, req_bytes, error=None):
+    """Feed one finished backend call to the breaker and the trace."""
+    if r is None or r.status_code >= 500:
+        _net.record_failure()
+    else:
+        _net.record_success(rtt)
+    if _trace is not None:
+        if r is None:
+            _trace.http(method, url, rtt_s=rtt, error=error)
+        else:
+            _trace.http(method, url, r.status_code, r.content, rtt, req_bytes)
+
+
+class _WorkerResponse:
+    """The parts of requests.Response the loop uses, from the uplink worker."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+
+def _uplink_allow():
+    """_net.allow() for calls that go to the uplink worker.
+
+    The half-open trial is a HEAD probe submitted to the worker (tag
+    "probe") instead of the breaker's inline probe, so the loop never
+    waits on it; the call that hit the trial is short-circuited.
+    """
+    if not _net.allow():
+        return False
+    if _net.state != HALF_OPEN:
+        return True
+    rid = _uplink_worker.submit("request", "HEAD", INFO_URL, {"timeout": 2},
+                                timeout_s=uplink_call_timeout(2))
+    if rid is None:
+        _net.record_failure()
+    else:
+        _backend_pending[rid] = (
+            "probe", None, "HEAD", INFO_URL, time.monotonic(), 0
+        )
+    return False
+
+
+def backend_submit(tag, ctx, method, url, **kwargs):
+    """Start a backend call without waiting for it.
+
+    The outcome comes back from backend_results() as
+    (tag, ctx, response or None, error); response is None while the
+    breaker is open. Without an uplink worker the call runs right here.
+    """
+    if _uplink_worker is None:
+        try:
+            r = backend_request(method, url, **kwargs)
+            _backend_done.append((tag, ctx, r, None))
+        except Exception as e:
+            _backend_done.append((tag, ctx, None, e))
+        return
+    if not _uplink_allow():
+        _backend_done.append((tag, ctx, None, None))
+        return
+    data = kwargs.get("data")
+    rid = _uplink_worker.submit(
+        "request", method, url, kwargs,
+        timeout_s=uplink_call_timeout(
+            kwargs.get("timeout", 10), len(data) if data else 0
+        ),
+    )
+    if rid is None:
+        _backend_done.append(
+            (tag, ctx, None, driver_workers.WorkerTimeout("uplink restarting"))
+        )
+        return
+    _backend_pending[rid] = (
+        tag, ctx, method, url, time.monotonic(), len(data) if data else 0
+    )
+
+
+def uplink_call_timeout(request_timeout_s, payload_bytes=0):
+    """Seconds the uplink worker may spend on one request: the requests
+    timeout bounds connect and each read, not a slow but steady body."""
+    return 2.0 * request_timeout_s + payload_bytes / float(UPLINK_MIN_BPS)
+
+
+def upload_submit(filepath):
+    """Queue one photo on the uplink worker; result tag is "upload"."""
+    if not _uplink_allow():
+        return False
+    try:
+        size = os.path.getsize(filepath)
+    except OSError:
+        size = 0
+    rid = _uplink_worker.submit(
+        "upload", UPLOAD_IMAGE_URL, filepath, UPLOAD_TIMEOUT,
+        timeout_s=uplink_call_timeout(UPLOAD_TIMEOUT, size),
+    )
+    if rid is None:
+        return False
+    _backend_pending[rid] = (
+        "upload", filepath, "POST", UPLOAD_IMAGE_URL, time.monotonic(), 0
+    )
+    return True
+
+
+def backend_busy(tag):
+    return any(p[0] == tag for p in _backend_pending.values())
+
+
+def backend_results():
+    """Collect finished backend_submit()/upload_submit() calls."""
+    if _uplink_worker is not None:
+        for rid, ok, result in _uplink_worker.poll():
+            pending = _backend_pending.pop(rid, None)
+            if pending is None:
+                continue
+            tag, ctx, method, url, t0, req_bytes = pending
+            rtt = time.monotonic() - t0
+            if not ok:
+                _account_backend(method, url, None, rtt, req_bytes, result)
+                if tag != "probe":
+                    _backend_done.append((tag, ctx, None, result))
+                continue
+            status, payload = result
+            if tag == "probe":
+                _account_backend(method, url, _WorkerResponse(status, b""),
+                                 rtt, req_bytes)
+                continue
+            if tag == "upload":
+                # payload is the file size; nothing to read back
+                r = _WorkerResponse(status, b"")
+                if status == 200:
+                    _uplink.record(payload, rtt)
+            else:
+                r = _WorkerResponse(status, payload)
+            _account_backend(method, url, r, rtt, req_bytes)
+            _backend_done.append((tag, ctx, r, None))
+    done = list(_backend_done)
+    del _backend_done[:]
+    return done
+
+
 def get_backend_state():
     try:
-        r = requests.get(INFO_URL, timeout=6)
+        r = backend_request("GET", INFO_URL, timeout=6)
+    except Exception as e:
+        return parse_backend_state(None, e)
+    return parse_backend_state(r)
+
+
+def parse_backend_state(r, error=None):
+    """The /info/ state from a response, or None (and say why)."""
+    if error is not None:
+        print("[BACKEND] /info/ error:", error)
+        return None
+    if r is None:
+        return None
+    try:
         if r.status_code == 200:
             return r.json()
-        else:
-            print("[BACKEND] /info/ status", r.status_code)
+        print("[BACKEND] /info/ status", r.status_code)
     except Exception as e:
         print("[BACKEND] /info/ error:", e)
     return None
@@ -104,10 +439,13 @@ def polygon_area_m2(polygon):
     return abs(area) * 0.5
 
 
-def compute_photos_needed(polygon, camera_area_m2):
+def compute_photos_needed(polygon, camera_area_m2, holes=None, latlon=False):
     if camera_area_m2 <= 0:
         return 0
-    area = polygon_area_m2(polygon)
+    area_fn = projection.geodesic_area_m2 if latlon else polygon_area_m2
+    area = area_fn(polygon)
+    for hole in holes or []:
+        area -= area_fn(hole)
     if area <= 0:
         return 0
     return math.ceil(area / camera_area_m2)
@@ -155,79 +493,186 @@ def point_in_polygon(x, y, polygon):
     return inside
 
 
-def generate_coverage_waypoints(polygon, camera_area_m2, photo_interval_s):
+def project_mission(polygon, holes=None):
+    """Bring the backend polygon and holes into local metres.
+
+    Returns (frame, polygon_m, holes_m). frame is the cached
+    projection.LocalFrame of the mission, or None when the backend
+    already sends metres (POLYGON_LATLON = False) or there is no polygon.
+    """
+    holes = holes or []
+    if not POLYGON_LATLON or not polygon or len(polygon) < 3:
+        return None, polygon or [], holes
+    frame = projection.frame_for_polygon(polygon)
+    return (
+        frame,
+        frame.forward_many(polygon),
+        [frame.forward_many(h) for h in holes],
+    )
+
+
+def coverage_lane_spacing(camera_area_m2):
+    return math.sqrt(camera_area_m2) * 0.8
+
+
+def plan_coverage(polygon, camera_area_m2, photo_interval_s,
+                  sweep_angle_deg=None, holes=None):
+    """Plan the lawnmower pattern, choosing the sweep angle if not given.
+
+    The polygon (minus any holes) is split into boustrophedon cells which
+    are covered one at a time. Returns a coverage_planner.CoveragePlan
+    whose candidates carry the estimated path length and turn count for
+    every angle considered.
+    """
+    return coverage_planner.plan(
+        polygon,
+        coverage_lane_spacing(camera_area_m2),
+        sweep_angle_deg=sweep_angle_deg,
+        holes=holes,
+    )
+
+
+def request_plan(planner, polygon, holes, obstacle_holes, photo_interval_s,
+                 detour_holes=()):
+    """Ask the PlanWorker for plan_coverage() of the mission.
+
+    The sweep is planned around holes + obstacle_holes; its legs are then
+    routed round detour_holes (hazards found during the sweep). The
+    inputs are the cache key, so asking again with the same mission
+    costs nothing; the plan comes back from planner.poll().
+    """
+    key = [polygon, holes, obstacle_holes, list(detour_holes),
+           photo_interval_s]
+    return planner.request(
+        key, polygon, coverage_lane_spacing(CAMERA_AREA_M2),
+        holes=holes + obstacle_holes, detour_holes=list(detour_holes),
+    )
+
+
+def rerouted_index(old_route, new_route, completed):
+    """Resume index in a re-routed plan, given the old plan's progress.
+
+    Both routes are CoveragePlan.route_index lists (None: not routed),
+    mapping the same sweep's waypoints into each list. Legs towards the
+    first unfinished sweep waypoint are driven again in the new route.
+    """
+    done = completed if old_route is None \
+        else bisect.bisect_right(old_route, completed) - 1
+    return done if new_route is None else new_route[done]
+
+
+def generate_coverage_waypoints(polygon, camera_area_m2, photo_interval_s,
+                                sweep_angle_deg=None, holes=None):
     if not polygon:
         return []
+    plan = plan_coverage(
+        polygon, camera_area_m2, photo_interval_s, sweep_angle_deg, holes
+    )
+    return plan.waypoints
 
-    xs = [p[0] for p in polygon]
-    ys = [p[1] for p in polygon]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
 
-    lane_spacing = math.sqrt(camera_area_m2) * 0.8
-    waypoints = []
+def frame_key(frame):
+    """JSON-able identity of a mission frame, to match saved metres."""
+    if frame is None:
+        return None
+    return [round(frame.lat0, 7), round(frame.lon0, 7)]
 
-    y = min_y
-    direction = 1
-    while y <= max_y:
-        if direction > 0:
-            x_range = (min_x, max_x)
-        else:
-            x_range = (max_x, min_x)
 
-        steps = int(abs(x_range[1] - x_range[0]) / lane_spacing) + 1
-        for i in range(steps + 1):
-            x = x_range[0] + (x_range[1] - x_range[0]) * (i / max(1, steps))
-            if point_in_polygon(x, y, polygon):
-                waypoints.append((x, y))
+def build_coverage_grid(polygon, camera_area_m2, holes=None):
+    """CoverageGrid over the mission polygon (metres), or None."""
+    if not polygon or len(polygon) < 3 or camera_area_m2 <= 0:
+        return None
+    try:
+        # Half a footprint per cell: fine enough to see a missed photo
+        return CoverageGrid(
+            polygon, holes or [], cell_m=math.sqrt(camera_area_m2) / 2.0
+        )
+    except Exception as e:
+        print("[COVERAGE] Coverage grid disabled:", e)
+        return None
 
-        direction *= -1
-        y += lane_spacing
 
-    return waypoints
+def print_coverage_plan(plan):
+    for c in plan.candidates:
+        marker = "*" if c.angle_deg == plan.angle_deg else " "
+        print(
+            "[COVERAGE] %s angle=%5.1f lanes=%3d cells=%2d length=%8.1f m turns=%3d"
+            % (marker, c.angle_deg, c.lanes, c.cells, c.path_length_m, c.turns)
+        )
+    print("[COVERAGE] Sweep angle:", plan.angle_deg)
+    print("[COVERAGE] Lower bound length: %.1f m" % plan.lower_bound_m)
 
 
-def internet_available():
+def estimate_mission(plan, traverse_speed):
+    """Time/energy estimate of the chosen plan (None without one).
+
+    Also sweeps the other sweep angles and a few speeds and mentions the
+    fastest feasible alternative if it beats the plan.
+    """
+    best = plan.best
+    if best is None or not traverse_speed:
+        return None
     try:
-        requests.get("https://www.google.com", timeout=3)
-        return True
-    except Exception:
-        return False
+        free_bytes = get_free_sd_mb(PHOTO_DIR) * 1024 * 1024
+    except OSError:
+        free_bytes = None
+    kw = dict(
+        overlap=PHOTO_OVERLAP,
+        vehicle=VEHICLE,
+        uplink_bps=_uplink.bps,
+        free_bytes=free_bytes,
+        lane_spacing_m=plan.lane_spacing,
+    )
+    est = mission_estimate.estimate_path(
+        best.path_length_m, best.turns, traverse_speed, CAMERA_AREA_M2,
+        angle_deg=plan.angle_deg, **kw
+    )
+    print(
+        "[ESTIMATE] %.0f min (%.0f lanes + %.0f turns), %d photos, "
+        "%.1f Wh (margin %.1f Wh), %.0f MB to upload%s"
+        % (est.total_s / 60, est.straight_s / 60, est.turn_s / 60,
+           est.photos, est.energy_wh, est.margin_wh,
+           est.upload_bytes / 1e6, "" if est.feasible else " – NOT FEASIBLE")
+    )
+    options = mission_estimate.sweep(
+        plan.candidates,
+        [traverse_speed * f for f in ESTIMATE_SPEED_FACTORS],
+        CAMERA_AREA_M2,
+        **kw
+    )
+    alt = options[0] if options else None
+    if alt is not None and alt.feasible and (
+        not est.feasible or alt.total_s < est.total_s * 0.9
+    ):
+        print(
+            "[ESTIMATE] Alternative: angle=%.1f speed=%.2f m/s -> %.0f min, "
+            "%.1f Wh" % (alt.angle_deg, alt.speed_mps, alt.total_s / 60,
+                         alt.energy_wh)
+        )
+    return est
 
 
-def capture_and_store_photo():
+def capture_and_store_photo(flashlight=None):
+    """Blocking single capture; the main loop uses CaptureWorker instead."""
     os.makedirs(PHOTO_DIR, exist_ok=True)
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(PHOTO_DIR, f"photo_{timestamp}.jpg")
-
-    try:
-        cmd = [
-            "libcamera-still",
-            "-o",
-            filepath,
-            "--width",
-            "1920",
-            "--height",
-            "1080",
-            "--autofocus-on-capture",
-        ]
-        subprocess.run(cmd, check=True)
-        return filepath
-    except Exception as e:
-        print("[CAMERA] Capture error:", e)
+    result = capture_still(photo_path(PHOTO_DIR), flashlight)
+    if result is None:
         return None
+    return result.filepath
 
 
 def upload_image(filepath):
-    if not internet_available():
-        print("[UPLOAD] No internet, skipping upload for now")
-        return False
-
     try:
+        t0 = time.monotonic()
         with open(filepath, "rb") as f:
             files = {"file": f}
-            r = requests.post(UPLOAD_IMAGE_URL, files=files, timeout=10)
+            r = backend_request("POST", UPLOAD_IMAGE_URL, files=files,
+                                timeout=UPLOAD_TIMEOUT)
+        if r is None:
+            print("[UPLOAD] Backend offline, skipping upload for now")
+            return False
         if r.status_code == 200:
+            _uplink.record(os.path.getsize(filepath), time.monotonic() - t0)
             print("[UPLOAD] Success:", filepath)
             return True
         print("[UPLOAD] Failed with status:", r.status_code)
@@ -236,15 +681,63 @@ def upload_image(filepath):
     return False
 
 
-def upload_all_images():
+def _upload_candidates(skip=None):
     if not os.path.isdir(PHOTO_DIR):
         return
-
     for name in sorted(os.listdir(PHOTO_DIR)):
-        if not name.lower().endswith((".jpg", ".jpeg", ".png")):
+        if not name.lower().endswith(PHOTO_EXTENSIONS):
             continue
-
         filepath = os.path.join(PHOTO_DIR, name)
+        if skip is not None and skip(filepath):
+            continue
+        yield filepath
+
+
+def upload_next(skip=None):
+    """Start uploading the next photo on the uplink worker.
+
+    Returns True if an upload is in flight afterwards.
+    """
+    if backend_busy("upload"):
+        return True
+    for filepath in _upload_candidates(skip):
+        print("[UPLOAD] Trying:", filepath)
+        return upload_submit(filepath)
+    return False
+
+
+def finish_upload(filepath, r, error):
+    """Handle an "upload" result. Returns True on success."""
+    if r is not None and r.status_code == 200:
+        print("[UPLOAD] Success:", filepath)
+        try:
+            os.remove(filepath)
+            print("[UPLOAD] Uploaded + deleted:", filepath)
+        except OSError as e:
+            print("[UPLOAD] Failed to delete", filepath, ":", e)
+        return True
+    if error is not None:
+        print("[UPLOAD] Error:", error)
+    elif r is None:
+        print("[UPLOAD] Backend offline, skipping upload for now")
+    else:
+        print("[UPLOAD] Failed with status:", r.status_code)
+    print("[UPLOAD] Failed – will retry later:", filepath)
+    return False
+
+
+def upload_all_images(skip=None):
+    """Upload and delete every photo in PHOTO_DIR.
+
+    skip, if given, is a predicate for files that are not ready yet
+    (e.g. still being re-encoded). With the uplink worker running this
+    only starts the upload queue; finish_upload() continues it.
+    """
+    if _uplink_worker is not None:
+        upload_next(skip)
+        return
+
+    for filepath in _upload_candidates(skip):
         print("[UPLOAD] Trying:", filepath)
 
         success = upload_image(filepath)
@@ -260,63 +753,203 @@ def upload_all_images():
             break
 
 
-def navigation_step(
-    status,
-    backend_state,
-    traverse_speed,
-    coverage_waypoints,
-    coverage_index,
-    command_in_flight,
-    failed_waypoints,
-):
-    nav_state = None
-    if status is not None and isinstance(status, dict):
-        nav_state = status.get("nav_state")
-
-    if command_in_flight:
-        if nav_state == "busy":
-            return coverage_index, command_in_flight, failed_waypoints
-        if nav_state == "failed":
-            failed_waypoints += 1
-            command_in_flight = False
-        elif nav_state == "arrived":
-            command_in_flight = False
+def resume_mission(checkpoint, waypoints, dispatcher, photo_trigger,
+                   coverage_grid=None, speed_ms=None):
+    """Load waypoints into the dispatcher, resuming from the checkpoint.
 
-    if (
-        not command_in_flight
-        and backend_state.get("explore", False)
-        and traverse_speed is not None
-    ):
-        if coverage_index < len(coverage_waypoints):
-            x, y = coverage_waypoints[coverage_index]
-            print(
-                "[COVERAGE] Sending waypoint",
-                coverage_index,
-                "->",
-                (x, y),
-                "speed",
-                traverse_speed,
-            )
-            send_goto_to_seeeduino(x, y, traverse_speed)
-            command_in_flight = True
-            coverage_index += 1
-        else:
-            print("[COVERAGE] All waypoints visited; stopping exploration.")
-            backend_state["explore"] = False
+    Progress (and the coverage grid and photo timing) is only restored if
+    the checkpoint was written for exactly the same waypoint list; any
+    other plan starts from waypoint 0. speed_ms is the traverse speed,
+    used to place the next photo after the last one before the restart.
+    """
+    if not waypoints:
+        # No plan yet (e.g. backend unreachable at boot): keep the old
+        # checkpoint so the mission can still be resumed once it arrives.
+        dispatcher.load([])
+        return
 
-    return coverage_index, command_in_flight, failed_waypoints
+    record = checkpoint.record
+    h = plan_hash(waypoints)
+    if record.get("plan_hash") == h:
+        dispatcher.load(waypoints, start_index=record.get("waypoint_index", 0))
+        dispatcher.failed = int(record.get("failed_waypoints", 0))
+        photo_trigger.photos_taken = int(record.get("photos_taken", 0))
+        photo_trigger.restore(
+            record.get("last_photo_time"), time.time(), speed_ms
+        )
+        if coverage_grid is not None:
+            coverage_grid.restore(record.get("coverage"))
+        print(
+            "[CHECKPOINT] Resuming at waypoint %d/%d"
+            % (dispatcher.completed, len(waypoints))
+        )
+    else:
+        dispatcher.load(waypoints)
+        dispatcher.failed = 0
+        record.pop("coverage", None)
+        record.pop("last_photo_time", None)
+
+    checkpoint.update(
+        plan_hash=h,
+        waypoint_index=dispatcher.completed,
+        failed_waypoints=dispatcher.failed,
+        photos_taken=photo_trigger.photos_taken,
+    )
+    checkpoint.flush(force=True)
+
+
+def status_position(status):
+    """The Seeeduino's own x/y estimate (mission metres) from STATUS, if any."""
+    if not status:
+        return None
+    x = status.get("x")
+    y = status.get("y")
+    if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+        return (float(x), float(y))
+    return None
+
+
+def navigation_step(status, backend_state, traverse_speed, dispatcher, now,
+                    gap_pass_due=False):
+    """gap_pass_due keeps exploration on once the plan is finished, so the
+    coverage gap pass can be loaded on the next iteration."""
+    dispatcher.on_status(status)
+
+    if backend_state.get("explore", False) and traverse_speed is not None:
+        if dispatcher.finished():
+            if not gap_pass_due:
+                print("[COVERAGE] All waypoints visited; stopping exploration.")
+                backend_state["explore"] = False
+        else:
+            dispatcher.pump(traverse_speed, now)
 
 
 # --------------- MAIN LOOP -----------------
 
-def main():
+def _open_leakage_sensor():
+    leak_cfg = LeakageConfig(
+        pin=12,             # BCM 12 (see leakage_test.py)
+        sample_period_s=0.1,
+        debounce_count=10,
+        active_low=True
+    )
+    return LeakageSensor(leak_cfg)
+
+
+def start_driver_workers(gps=True):
+    """Start the supervised driver processes. Returns {name: DriverWorker}."""
+    dw = driver_workers
+    workers = [
+        dw.DriverWorker("temp", dw.dht_setup, dw.dht_sample,
+                        period_s=3.0, stall_s=30.0),
+        dw.DriverWorker("camera", dw.camera_setup,
+                        handlers={"capture": dw.camera_capture},
+                        call_timeout_s=20.0),
+        dw.DriverWorker("uplink", dw.uplink_setup,
+                        handlers={"request": dw.uplink_request,
+                                  "upload": dw.uplink_upload},
+                        # per call: see uplink_call_timeout()
+                        call_timeout_s=uplink_call_timeout(10)),
+    ]
+    if gps:
+        # get_gps_fix can legitimately take 15 s without sentences
+        workers.append(dw.DriverWorker("gps", dw.gps_setup, dw.gps_sample,
+                                       period_s=1.0, stall_s=30.0))
+    return {w.name: w.start() for w in workers}
+
+
+def start_photo_stager():
+    """RAM staging for new photos, or None to capture onto the SD card."""
+    if not PHOTO_STAGE_DIR:
+        return None
+    if not os.path.isdir(os.path.dirname(PHOTO_STAGE_DIR)):
+        print("[STAGE] No", os.path.dirname(PHOTO_STAGE_DIR),
+              "- capturing straight to", PHOTO_DIR)
+        return None
     try:
-        gps = open_gps()
+        stager = PhotoStager(
+            PHOTO_STAGE_DIR,
+            PHOTO_DIR,
+            max_bytes=STAGE_MAX_BYTES,
+            max_files=STAGE_MAX_FILES,
+            batch_files=STAGE_BATCH_FILES,
+            max_delay_s=STAGE_MAX_DELAY_S,
+            extensions=PHOTO_EXTENSIONS,
+        )
+        stager.recover()
     except Exception as e:
-        print("[GPS] Error opening GPS:", e)
-        gps = None
+        print("[STAGE] Staging disabled:", e)
+        return None
+    atexit.register(stager.close)
+    print("[STAGE] Staging photos in", PHOTO_STAGE_DIR)
+    return stager.start()
 
-    backend = get_backend_state() or {
+
+def main():
+    global _trace, _uplink_worker, _link, _link_task, _link_retry_at
+    # kill -USR1 <pid> toggles debug logging (raw serial lines, no limits)
+    structured_log.setup(
+        LOG_PATH,
+        max_bytes=LOG_MAX_BYTES,
+        backups=LOG_BACKUPS,
+        console_level=LOG_CONSOLE_LEVEL,
+        debug=bool(os.environ.get("SUB_DEBUG")),
+    )
+    if TRACE_PATH:
+        _trace = TraceRecorder(TRACE_PATH)
+        print("[TRACE] Recording to", TRACE_PATH)
+
+    # A recorded GPS needs the port in this process (RecordingSerial)
+    workers = {}
+    if DRIVER_PROCESSES:
+        workers = start_driver_workers(gps=_trace is None)
+    gps_worker = workers.get("gps")
+    temp_worker = workers.get("temp")
+    camera_worker = workers.get("camera")
+
+    # Bring every device up at once; a slow or dead one only costs its
+    # own timeout instead of delaying the rest.
+    tasks = [
+        InitTask("backend", get_backend_state, timeout_s=7.0),
+        InitTask("leak", _open_leakage_sensor, timeout_s=2.0),
+        InitTask("rgb", RGB, timeout_s=2.0),
+    ]
+    serial_task = None
+    if _link is None:
+        serial_task = InitTask("serial", _open_link, timeout_s=3.0)
+        tasks.insert(0, serial_task)
+    if gps_worker is None:
+        tasks.append(InitTask("gps", open_gps, timeout_s=3.0))
+    if temp_worker is None:
+        tasks.append(InitTask("temp", TemperatureSensor, timeout_s=3.0))
+    if camera_worker is None:
+        tasks.append(InitTask("flashlight", Flashlight, timeout_s=2.0))
+    devices = bring_up(tasks)
+    # Only now: the initial /info/ above runs inline
+    _uplink_worker = workers.get("uplink")
+    if _uplink_worker is not None:
+        # Half-open probes go through the worker (see _uplink_allow)
+        _net.probe = None
+
+    if serial_task is not None:
+        _link = devices["serial"]
+        if _link is None and not serial_task.done.is_set():
+            # Still opening: adopted by _get_link() once it is ready
+            _link_task = serial_task
+        elif _link is None:
+            _link_retry_at = time.monotonic() + LINK_RETRY_S
+    if _trace is not None and _link is not None:
+        _link.tap = _trace.tap
+
+    gps = devices.get("gps")
+    if _trace is not None:
+        if gps is not None:
+            gps = RecordingSerial(gps, _trace)
+    temp_sensor = devices.get("temp")
+    leakage_sensor = devices["leak"]
+    flashlight = devices.get("flashlight")
+
+    backend = devices["backend"] or {
         "explore": False,
         "autonomous": True,
         "meters": 0,
@@ -332,73 +965,151 @@ def main():
 
     if "polygon" not in backend or backend["polygon"] is None:
         backend["polygon"] = []
+    backend["holes"] = backend.get("holes") or []
 
-    # --- Local sensors on the Raspberry Pi ---
-    temp_sensor = None
-    leakage_sensor = None
-    flashlight = None
-
-    try:
-        temp_sensor = TemperatureSensor()
-        print("[TEMP] TemperatureSensor initialised")
-    except Exception as e:
-        print("[TEMP] Error initialising TemperatureSensor:", e)
-
-    try:
-        leak_cfg = LeakageConfig(
-            pin=12,             # BCM 12 (see leakage_test.py)
-            sample_period_s=0.1,
-            debounce_count=10,
-            active_low=True
-        )
-        leakage_sensor = LeakageSensor(leak_cfg)
-        print("[LEAK] LeakageSensor initialised on GPIO", leak_cfg.pin)
-    except Exception as e:
-        print("[LEAK] Error initialising LeakageSensor:", e)
-
-    try:
-        flashlight = Flashlight()
-        print("[FLASH] Flashlight initialised")
-    except Exception as e:
-        print("[FLASH] Error initialising Flashlight:", e)
+    checkpoint = MissionCheckpoint(
+        CHECKPOINT_PATH, min_interval_s=CHECKPOINT_INTERVAL
+    )
+    checkpoint.load()
 
     # Keep last known position so backend still updates even with no GPS fix
     last_lat = backend.get("lat", 54.9130)
     last_lon = backend.get("lon", 9.7785)
     last_alt = backend.get("alt", 0.0)
+    if checkpoint.record.get("last_fix"):
+        last_lat, last_lon, last_alt = checkpoint.record["last_fix"]
     
     prev_lat = None
     prev_lon = None
     gps_heading_deg = None
+    pos_xy = None  # last fix in the mission frame (metres)
+    fix_at = None  # when pos_xy came from a GPS fix (None: backend lat/lon)
 
     # Status LED on the Raspberry Pi
-    rgb = RGB()
+    rgb = devices["rgb"]
     led_state = None
+    reported_navigating = False
 
     photo_interval = get_time_seconds(backend.get("time", "0:05"))
     traverse_speed = recommended_speed(CAMERA_AREA_M2, photo_interval)
-    photos_needed = compute_photos_needed(backend["polygon"], CAMERA_AREA_M2)
-    coverage_waypoints = generate_coverage_waypoints(
-        backend["polygon"], CAMERA_AREA_M2, photo_interval
+    photos_needed = compute_photos_needed(
+        backend["polygon"], CAMERA_AREA_M2, backend["holes"], POLYGON_LATLON
+    )
+    mission_frame, polygon_m, holes_m = project_mission(
+        backend["polygon"], backend["holes"]
     )
 
-    coverage_index = 0
-    command_in_flight = False
-    total_waypoints_planned = len(coverage_waypoints)
-    failed_waypoints = 0
+    # Failed waypoints and ultrasonic alarms from earlier runs of this
+    # mission. The plan itself is rebuilt around (and routed round) the
+    # same keep-out rings it was made with, so that the checkpoint still
+    # matches it.
+    obstacles = ObstacleMap(OBSTACLE_CELL_M, OBSTACLE_CLEARANCE_M)
+    obstacles_frame = frame_key(mission_frame)
+    plan_obstacles = []
+    detour_obstacles = []  # hazards found during the sweep
+    saved = checkpoint.record.get("obstacles")
+    if saved and saved.get("frame") == obstacles_frame \
+            and obstacles.restore(saved):
+        plan_obstacles = checkpoint.record.get("obstacle_holes") or []
+        detour_obstacles = checkpoint.record.get("detour_holes") or []
+    obstacles_saved = obstacles.version
+    obstacles_routed = obstacles.version
+    ultra_latched = []
+
+    # Plans are made off the loop; each one is picked up (and the
+    # mission resumed or restarted) on the iteration it arrives
+    planner = coverage_planner.PlanWorker(processes=DRIVER_PROCESSES)
+    atexit.register(planner.close)
+    request_plan(planner, polygon_m, holes_m, plan_obstacles, photo_interval,
+                 detour_obstacles)
+    mission_area = [polygon_m, holes_m]
+    mission_key = None    # request_plan key of the loaded plan
+    mission_route = None  # its route_index
+    if mission_frame is not None:
+        pos_xy = mission_frame.forward(last_lat, last_lon)
+    coverage_plan = None
+    plan_estimate = None
+    estimate_speed = None  # traverse speed plan_estimate was made for
+    coverage_grid = None
+    coverage_saved = None  # grid version last put in the checkpoint
+    gap_passes = 0
+
+    photo_trigger = PhotoTrigger(CAMERA_AREA_M2, overlap=PHOTO_OVERLAP)
+    photo_trigger.reset(photos_needed)
+
+    dispatcher = WaypointDispatcher(
+        send_goto_to_seeeduino,
+        window=WAYPOINT_WINDOW,
+        on_fail=lambda x, y: obstacles.add(x, y, FAILED),
+        skip=obstacles.blocked,
+        ready=lambda: _get_link() is not None,
+        send_clear=send_clear_to_seeeduino,
+    )
+    mission_waypoints = []  # the loaded plan; gap passes don't replace it
+    nav_xy = None  # Seeeduino's position estimate, preferred over GPS
+    nav_at = None
+
+    stager = start_photo_stager()
+    if stager is not None:
+        # Dedup and re-encoding work on the staged copy; duplicates get
+        # their own staging subdirectory and are flushed to LOW_PRIORITY_DIR
+        capture_dir = stager.stage_dir
+        dedup_dir = os.path.join(stager.stage_dir, "duplicates")
+    else:
+        capture_dir = PHOTO_DIR
+        dedup_dir = LOW_PRIORITY_DIR
+    dedup = PhotoDeduplicator(dedup_dir, delete=DEDUP_DELETE)
+    capture = None
+    if camera_worker is not None:
+        def capture(filepath, settle_s):
+            try:
+                return camera_worker.call("capture", filepath, settle_s=settle_s)
+            except Exception as e:
+                print("[CAMERA] Camera worker:", e)
+                return None
+    capture_worker = CaptureWorker(
+        capture_dir, flashlight, post_capture=dedup.process, capture=capture
+    )
+    capture_future = None
+    capture_xy = None  # where the in-flight photo was triggered
 
-    last_send = 0.0
-    last_backend = 0.0
-    last_photo_time = 0.0
-    last_upload_attempt = 0.0
+    encoder = None
+    try:
+        encoder = PhotoEncoder(
+            _uplink, target_upload_s=ENCODE_TARGET_UPLOAD_S, fmt=ENCODE_FORMAT
+        )
+        print("[ENCODE] Re-encoding on", encoder.workers, "processes")
+    except Exception as e:
+        print("[ENCODE] Re-encoding disabled:", e)
+    upload_skip = encoder.pending if encoder is not None else None
+    if stager is not None:
+        stager.busy = upload_skip
+
+    telemetry = TelemetryEncoder()
+
+    rates = RateController(
+        {
+            POLL: BACKEND_REFRESH,
+            UPDATE: GPS_INTERVAL,
+            STATUS: STATUS_INTERVAL,
+            UPLOAD: UPLOAD_INTERVAL,
+        },
+        RATE_BOUNDS,
+        net=_net,
+    )
+    rates.mark(POLL, time.time())  # bring_up already fetched /info/
+    last_rate_report = time.time()
+    nano_emergency = False
+    prev_emergency = False
+    link_issues = []
     prev_explore = backend.get("explore", False)
 
     print("Running main loop...")
-    print("  Update interval  =", GPS_INTERVAL, "seconds")
-    print("  Backend poll     =", BACKEND_REFRESH, "seconds")
+    print("  Update interval  =", GPS_INTERVAL, "seconds (adaptive)")
+    print("  Backend poll     =", BACKEND_REFRESH, "seconds (adaptive)")
     print("  Photo interval   =", photo_interval, "seconds")
+    print("  Photo spacing    = %.2f m" % photo_trigger.spacing_m)
     print("  Photo dir        =", PHOTO_DIR)
-    print("  Coverage wps     =", len(coverage_waypoints))
 
     while True:
         now = time.time()
@@ -416,77 +1127,270 @@ def main():
         if leak_latched:
             has_warning = True
 
+        # Samplers: drain their pipes and let the watchdog check them
+        # (the uplink is polled by backend_results, the camera by its
+        # capture thread)
+        for w in (gps_worker, temp_worker):
+            if w is not None:
+                w.poll()
+
         status = read_seeeduino_status()
         if status is not None:
-            warning0 = int(
-                round((failed_waypoints / total_waypoints_planned) * 100)
-            ) if total_waypoints_planned > 0 else 0
-            if not isinstance(status, dict):
-                status = {}
-            status.setdefault("warning_types", [])
-            if len(status["warning_types"]) == 0:
-                status["warning_types"].append(warning0)
-            else:
-                status["warning_types"][0] = warning0
-
-            if bool(status.get("emergency_active")) or status.get("emergency_reason_mask", 0):
+            # failed runs over the plan and its gap passes
+            total_waypoints_planned = len(mission_waypoints)
+            warning0 = min(100, int(
+                round((dispatcher.failed / total_waypoints_planned) * 100)
+            )) if total_waypoints_planned > 0 else 0
+            status.warning_types = [warning0] + (status.warning_types or [])[1:]
+
+            nano_emergency = bool(
+                status.get("emergency_active")
+                or status.get("emergency_reason_mask", 0)
+            )
+            if nano_emergency:
                 has_warning = True
             ultra_err = status.get("ultrasonic_error_latched")
             if isinstance(ultra_err, (list, tuple)) and any(ultra_err):
                 has_warning = True
+                # Map the spot where a sensor newly latched
+                here = status_position(status) or nav_xy or pos_xy
+                rising = any(
+                    v and (k >= len(ultra_latched) or not ultra_latched[k])
+                    for k, v in enumerate(ultra_err)
+                )
+                if rising and here is not None:
+                    obstacles.add(here[0], here[1], ULTRASONIC)
+            if isinstance(ultra_err, (list, tuple)):
+                ultra_latched = list(ultra_err)
+
+        # Stale STATUS, garbage, slow GOTO acks: warn before navigation
+        # starts failing because of it
+        issues = _link.link_degraded() if _link is not None else []
+        if issues != link_issues:
+            if issues:
+                print("[SERIAL] Link degraded:", ", ".join(issues))
+            else:
+                print("[SERIAL] Link healthy again")
+            link_issues = issues
+        if link_issues or dispatcher.stalled():
+            has_warning = True
 
-            try:
-                r_old = requests.post(OLD_URL, json=status, timeout=6)
-                print("[OLD] Status:", r_old.status_code)
-            except Exception as e:
-                print("[OLD] POST error:", e)
-
-        coverage_index, command_in_flight, failed_waypoints = navigation_step(
-            status,
-            backend,
-            traverse_speed,
-            coverage_waypoints,
-            coverage_index,
-            command_in_flight,
-            failed_waypoints,
+        emergency = leak_latched or nano_emergency
+        if emergency and stager is not None:
+            # Get staged photos onto the card before a possible power cut
+            stager.flush_now()
+        rates.update(
+            backend.get("explore", False),
+            backend.get("autonomous", True),
+            emergency,
         )
 
-        if now - last_backend >= BACKEND_REFRESH:
-            new_state = get_backend_state()
-            if new_state:
-                backend = new_state
-                backend["polygon"] = backend.get("polygon") or []
+        # Forward STATUS at the adaptive rate; in between, newer lines
+        # simply replace older ones. An emergency change goes out at once.
+        # One /old/ at a time; a pending emergency change is retried
+        # once the previous one has finished.
+        if status is not None and not backend_busy("old") and (
+            emergency != prev_emergency or rates.due(STATUS, now)
+        ):
+            prev_emergency = emergency
+            rates.mark(STATUS, now)
+            backend_submit(
+                "old", None, "POST", OLD_URL,
+                data=status.to_json(),
+                headers={"Content-Type": "application/json"},
+                timeout=6,
+            )
 
-                photo_interval = get_time_seconds(backend.get("time", "0:05"))
-                traverse_speed = recommended_speed(CAMERA_AREA_M2, photo_interval)
-                photos_needed = compute_photos_needed(
-                    backend["polygon"], CAMERA_AREA_M2
+        if status_position(status) is not None:
+            nav_xy = status_position(status)
+            nav_at = now
+
+        planned = planner.poll()
+        if planned is not None:
+            plan_key, coverage_plan = planned
+            coverage_waypoints = coverage_plan.waypoints
+            print(
+                "[COVERAGE] New plan in %.2fs: %d waypoints"
+                % (planner.last_plan_s, len(coverage_waypoints))
+            )
+            print_coverage_plan(coverage_plan)
+            # Only restart the dispatcher when the plan actually changed,
+            # otherwise the Seeeduino's queue would be flushed for nothing
+            if coverage_waypoints != mission_waypoints and mission_waypoints \
+                    and mission_key is not None \
+                    and plan_key[:3] == mission_key[:3]:
+                # Same sweep routed round new hazards: carry on from the
+                # same place (a gap pass already running is left alone)
+                start = len(coverage_waypoints) if gap_passes else \
+                    rerouted_index(mission_route, coverage_plan.route_index,
+                                   dispatcher.completed)
+                if not gap_passes:
+                    dispatcher.load(coverage_waypoints, start_index=start)
+                print(
+                    "[COVERAGE] Routed round %d hazards; at waypoint %d/%d"
+                    % (len(plan_key[3]), start, len(coverage_waypoints))
                 )
-                coverage_waypoints = generate_coverage_waypoints(
-                    backend["polygon"], CAMERA_AREA_M2, photo_interval
+                checkpoint.update(
+                    plan_hash=plan_hash(coverage_waypoints),
+                    waypoint_index=start,
+                    detour_holes=plan_key[3],
                 )
-                coverage_index = 0
-                command_in_flight = False
-                total_waypoints_planned = len(coverage_waypoints)
-                failed_waypoints = 0
-
-                print("[BACKEND] Updated photo interval:", photo_interval)
-                print("[COVERAGE] photos_needed:", photos_needed)
-                print("[COVERAGE] traverse_speed:", traverse_speed)
-                print("[COVERAGE] waypoints:", len(coverage_waypoints))
+                checkpoint.flush(force=True)
+            elif coverage_waypoints != mission_waypoints:
+                photo_trigger.reset(photos_needed)
+                coverage_grid = build_coverage_grid(
+                    polygon_m, CAMERA_AREA_M2, holes_m
+                )
+                coverage_saved = None
+                gap_passes = 0
+                resume_mission(
+                    checkpoint, coverage_waypoints, dispatcher,
+                    photo_trigger, coverage_grid, speed_ms=traverse_speed,
+                )
+                if coverage_waypoints:
+                    checkpoint.update(
+                        obstacle_holes=plan_key[2], detour_holes=plan_key[3]
+                    )
+            mission_waypoints = coverage_waypoints
+            mission_key = plan_key
+            mission_route = coverage_plan.route_index
+
+        # A hazard found during the sweep only has the dispatcher skip
+        # waypoints on it; route the rest of the sweep round it instead
+        # (the next new mission is planned around it from the start)
+        if obstacles.version != obstacles_routed:
+            obstacles_routed = obstacles.version
+            if mission_waypoints and not gap_passes:
+                detour_obstacles = sorted(
+                    r for r in obstacles.hole_rings()
+                    if r not in plan_obstacles
+                )
+                request_plan(
+                    planner, polygon_m, holes_m, plan_obstacles,
+                    photo_interval, detour_obstacles,
+                )
+        # The estimate sweeps every angle and speed: redo (and print) it
+        # only for a new plan or speed, not on every poll
+        if coverage_plan is not None and (
+            planned is not None or traverse_speed != estimate_speed
+        ):
+            plan_estimate = estimate_mission(coverage_plan, traverse_speed)
+            estimate_speed = traverse_speed
+
+        # Planned sweep done but photos missed spots: revisit only the gaps
+        gap_pass_due = (
+            coverage_grid is not None
+            and mission_waypoints
+            and gap_passes < MAX_GAP_PASSES
+            and coverage_grid.coverage() < COVERAGE_TARGET
+        )
+        if (
+            gap_pass_due
+            and backend.get("explore", False)
+            and dispatcher.finished()
+            and capture_future is None
+        ):
+            gaps = coverage_grid.gap_waypoints(
+                coverage_lane_spacing(CAMERA_AREA_M2),
+                start=nav_xy or pos_xy,
+                holes=obstacles.hole_rings(),
+            )
+            gap_passes += 1
+            if gaps:
+                print(
+                    "[COVERAGE] %.1f%% covered; gap pass %d with %d waypoints"
+                    % (coverage_grid.coverage() * 100, gap_passes, len(gaps))
+                )
+                dispatcher.load(gaps)
+
+        navigation_step(status, backend, traverse_speed, dispatcher, now,
+                        gap_pass_due=bool(gap_pass_due))
+        if not reported_navigating and dispatcher.in_flight:
+            print("[STARTUP] Navigating %.2fs after boot" % since_boot_s())
+            reported_navigating = True
+
+        if rates.due(POLL, now) and not backend_busy("info"):
+            backend_submit("info", None, "GET", INFO_URL, timeout=6)
+            rates.mark(POLL, now)
+
+        # --- finished backend calls (inline, or from the uplink worker) ---
+        new_state = None
+        for tag, ctx, r, err in backend_results():
+            if tag == "info":
+                new_state = parse_backend_state(r, err)
+            elif tag == "old":
+                if err is not None:
+                    print("[OLD] POST error:", err)
+                elif r is not None:
+                    _log_old.info("status %d", r.status_code)
+            elif tag == "update":
+                tv, kind, nbytes = ctx
+                if err is not None:
+                    print("[UPDATE] POST error:", err)
+                elif r is not None:
+                    telemetry.on_response(tv, r)
+                    print(
+                        "[UPDATE] Status:", r.status_code,
+                        "%s %d bytes (saved %.0f%%)"
+                        % (kind, nbytes, telemetry.savings() * 100),
+                    )
+            elif tag == "upload":
+                # Keep draining the folder until something fails
+                if finish_upload(ctx, r, err):
+                    upload_next(upload_skip)
+
+        if new_state:
+            backend = new_state
+            backend["polygon"] = backend.get("polygon") or []
+            backend["holes"] = backend.get("holes") or []
+
+            photo_interval = get_time_seconds(backend.get("time", "0:05"))
+            traverse_speed = recommended_speed(CAMERA_AREA_M2, photo_interval)
+            photos_needed = compute_photos_needed(
+                backend["polygon"], CAMERA_AREA_M2, backend["holes"],
+                POLYGON_LATLON,
+            )
+            mission_frame, polygon_m, holes_m = project_mission(
+                backend["polygon"], backend["holes"]
+            )
+            if frame_key(mission_frame) != obstacles_frame:
+                # Different area: saved hazards are in other metres
+                obstacles.clear()
+                obstacles_frame = frame_key(mission_frame)
+                plan_obstacles = []
+                detour_obstacles = []
+            if [polygon_m, holes_m] != mission_area:
+                # New mission: plan around every hazard known by now. Until
+                # a first mission is known, keep the rings the checkpoint's
+                # plan was made with so that it can still be resumed.
+                if mission_area[0]:
+                    plan_obstacles = obstacles.hole_rings()
+                    detour_obstacles = []
+                mission_area = [polygon_m, holes_m]
+            # Free unless the mission (or photo interval) changed
+            request_plan(
+                planner, polygon_m, holes_m, plan_obstacles, photo_interval,
+                detour_obstacles,
+            )
+            if mission_frame is not None:
+                pos_xy = mission_frame.forward(last_lat, last_lon)
 
-                # Existing trigger kept
-                if prev_explore and not backend.get("explore", False):
-                    print("[TRIGGER] Explore disabled -> uploading all images")
-                    upload_all_images()
+            print("[BACKEND] Updated photo interval:", photo_interval)
+            print("[COVERAGE] photos_needed:", photos_needed)
+            print("[COVERAGE] traverse_speed:", traverse_speed)
 
-                prev_explore = backend.get("explore", False)
+            # Existing trigger kept
+            if prev_explore and not backend.get("explore", False):
+                print("[TRIGGER] Explore disabled -> uploading all images")
+                upload_all_images(upload_skip)
 
-            last_backend = now
+            prev_explore = backend.get("explore", False)
 
-        if now - last_send >= GPS_INTERVAL:
+        if rates.due(UPDATE, now):
             fix = None
-            if gps is not None:
+            if gps_worker is not None:
+                fix = gps_worker.fresh(GPS_FIX_MAX_AGE_S)
+            elif gps is not None:
                 try:
                     fix = get_gps_fix(gps)
                 except Exception as e:
@@ -495,7 +1399,14 @@ def main():
             if fix:
                 prev_lat, prev_lon = last_lat, last_lon
                 last_lat, last_lon, last_alt = fix["lat"], fix["lon"], fix["alt"]
-                gps_h = bearing_deg(prev_lat, prev_lon, last_lat, last_lon)
+                fix_at = now
+                if mission_frame is not None:
+                    pos_xy = mission_frame.forward(last_lat, last_lon)
+                    gps_h = mission_frame.bearing_deg(
+                        prev_lat, prev_lon, last_lat, last_lon
+                    )
+                else:
+                    gps_h = bearing_deg(prev_lat, prev_lon, last_lat, last_lon)
                 if gps_h is not None:
                     gps_heading_deg = gps_h
                     print("[GPS] Fix:", fix, "heading_deg=", gps_heading_deg)
@@ -506,7 +1417,12 @@ def main():
 
             temp_c = 0.0
             hum_pct = 0.0
-            if temp_sensor is not None:
+            if temp_worker is not None:
+                reading = temp_worker.latest
+                if reading:
+                    temp_c = float(reading.get("temp_c", temp_c))
+                    hum_pct = float(reading.get("humidity", hum_pct))
+            elif temp_sensor is not None:
                 try:
                     reading = temp_sensor.update()
                     if reading:
@@ -530,16 +1446,22 @@ def main():
                 "lon": last_lon,
                 "alt": last_alt,
                 "polygon": backend.get("polygon", []),
+                "estimate": (
+                    plan_estimate.as_dict()
+                    if plan_estimate is not None else None
+                ),
                 "temperature": temp_c,
                 "humidity": hum_pct,
                 "leakage": int(bool(leak_latched)),
+                "link": _link.link_health() if _link is not None else None,
             }
 
-            try:
-                r = requests.post(UPDATE_URL, json=payload, timeout=6)
-                print("[UPDATE] Status:", r.status_code)
-            except Exception as e:
-                print("[UPDATE] POST error:", e)
+            if not backend_busy("update"):
+                body, headers, tv = telemetry.encode(payload)
+                backend_submit(
+                    "update", (tv, headers["X-Telemetry"], len(body)),
+                    "POST", UPDATE_URL, data=body, headers=headers, timeout=6,
+                )
 
             above_seabed_m = backend.get("meters", 0)
             autonomous = backend.get("autonomous", True)
@@ -555,15 +1477,19 @@ def main():
                     hum_pct=hum_pct,
                     leakage=bool(leak_latched),
                     heading_deg=gps_heading_deg,
+                    x_m=pos_xy[0] if pos_xy is not None else None,
+                    y_m=pos_xy[1] if pos_xy is not None else None,
+                    emergency=emergency,
                 )
             except Exception as e:
                 print("[SERIAL] Error sending state to Seeeduino:", e)
 
-            last_send = now
+            rates.mark(UPDATE, now)
 
         # --- LED status (Pi RGB) ---
         try:
-            if gps is not None and gps_heading_deg is None:
+            if (gps is not None or gps_worker is not None) \
+                    and gps_heading_deg is None:
                 desired_led = "calibrating"
             elif has_warning:
                 desired_led = "warning"
@@ -573,40 +1499,124 @@ def main():
             else:
                 desired_led = "awaiting"
 
-            if desired_led != led_state:
+            if rgb is not None and desired_led != led_state:
                 rgb.set_state(desired_led)
                 led_state = desired_led
         except Exception as e:
             print("[LED] Error updating RGB LED:", e)
 
-        if photo_interval > 0 and (now - last_photo_time) >= photo_interval:
-            print("[CAMERA] Time to take photo")
-            # Turn on flashlight for the shot
-            if flashlight is not None:
-                try:
-                    flashlight.on()
-                    print("[FLASH] On for photo")
-                except Exception as e:
-                    print("[FLASH] Error turning on flashlight:", e)
-
-            filepath = capture_and_store_photo()
-
-            # Turn off flashlight after the shot
-            if flashlight is not None:
-                try:
-                    flashlight.off()
-                    print("[FLASH] Off after photo")
-                except Exception as e:
-                    print("[FLASH] Error turning off flashlight:", e)
-
-            if filepath:
-                print("[CAMERA] Stored photo at:", filepath)
-            last_photo_time = now
+        # --- photo capture runs on the worker; just collect results here ---
+        if capture_future is not None and capture_future.done():
+            result = capture_future.result()
+            if result is not None and result.demoted:
+                print(
+                    "[CAMERA] Near-duplicate photo (%d/%d so far)"
+                    % (dedup.duplicates, dedup.checked)
+                )
+                if stager is not None:
+                    stager.commit(result.filepath, LOW_PRIORITY_DIR)
+            elif result is not None:
+                print(
+                    "[CAMERA] Stored photo at:",
+                    result.filepath,
+                    "trigger->exposure %.3fs flash %.3fs"
+                    % (result.trigger_to_exposure_s, result.flash_on_s),
+                )
+                # A staged photo is flushed once re-encoding is done
+                if (encoder is None or not encoder.submit(result.filepath)) \
+                        and stager is not None:
+                    stager.commit(result.filepath)
+            # Near-duplicates still imaged the ground, so both count
+            if result is not None and coverage_grid is not None \
+                    and capture_xy is not None:
+                coverage_grid.mark_photo(
+                    capture_xy[0], capture_xy[1], CAMERA_AREA_M2
+                )
+                print(
+                    "[COVERAGE] %.1f%% of area imaged"
+                    % (coverage_grid.coverage() * 100)
+                )
+            capture_future = None
+
+        if encoder is not None:
+            for dest, b_in, b_out in encoder.poll():
+                if b_out is None:
+                    # Not re-encoded: flush the original as it is now
+                    # rather than leaving it to the orphan sweep
+                    if stager is not None:
+                        stager.commit(dest)
+                    continue
+                print(
+                    "[ENCODE] %s %d -> %d bytes (target %d)"
+                    % (dest, b_in, b_out, encoder.target_bytes())
+                )
+                if stager is not None:
+                    stager.commit(dest)
+
+        moving = backend.get("explore", False) and dispatcher.in_flight > 0
+        # Only a fresh position may drive the odometer; otherwise (e.g.
+        # submerged, no GPS and no x/y in STATUS) the trigger dead-reckons
+        # at traverse_speed
+        position_xy = None
+        if nav_xy is not None and now - nav_at <= GPS_FIX_MAX_AGE_S:
+            position_xy = nav_xy
+        elif pos_xy is not None and fix_at is not None \
+                and now - fix_at <= GPS_FIX_MAX_AGE_S:
+            position_xy = pos_xy
+        if (
+            photo_trigger.update(position_xy, now, moving, traverse_speed)
+            and not capture_worker.busy()
+            and (encoder is None or not encoder.full())
+            and (stager is None or not stager.full())
+        ):
+            print("[CAMERA] Time to take photo", photo_trigger.progress())
+            capture_future = capture_worker.submit()
+            # Coverage still wants a best guess when nothing is fresh
+            capture_xy = position_xy or nav_xy or pos_xy
+            photo_trigger.record(now)
 
         # --- attempt upload periodically when internet is available ---
-        if now - last_upload_attempt >= 10.0:
-            upload_all_images()
-            last_upload_attempt = now
+        if rates.due(UPLOAD, now):
+            upload_all_images(upload_skip)
+            rates.mark(UPLOAD, now)
+            if _trace is not None:
+                _trace.flush()
+
+        if now - last_rate_report >= RATE_REPORT_INTERVAL:
+            print("[RATE] Effective rates:", rates.report(now))
+            for name, w in sorted(workers.items()):
+                print("[WORKER]", name, w.stats())
+            if stager is not None:
+                print("[STAGE]", stager.stats())
+            if _link is not None:
+                print("[SERIAL] TX", _link.tx_stats())
+            last_rate_report = now
+
+        # --- mission checkpoint (batched, at most every CHECKPOINT_INTERVAL) ---
+        # During a gap pass the planned sweep stays complete; the grid
+        # (saved only when it changed) says what is still missing. With
+        # no plan loaded yet (backend offline at boot) the old progress
+        # is left alone so the mission can still resume from it.
+        if mission_waypoints:
+            checkpoint.update(
+                waypoint_index=(
+                    len(mission_waypoints) if gap_passes
+                    else dispatcher.completed
+                ),
+                failed_waypoints=dispatcher.failed,
+                photos_taken=photo_trigger.photos_taken,
+                last_photo_time=photo_trigger.last_shot_time,
+                last_fix=[last_lat, last_lon, last_alt],
+            )
+        if obstacles.version != obstacles_saved:
+            checkpoint.update(
+                obstacles=dict(obstacles.to_record(), frame=obstacles_frame)
+            )
+            obstacles_saved = obstacles.version
+        if coverage_grid is not None and coverage_grid.version != coverage_saved:
+            checkpoint.update(coverage=coverage_grid.to_record())
+            coverage_saved = coverage_grid.version
+        checkpoint.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+# mission_checkpoint.py
+# Crash-safe record of mission progress.
+#
+# A small JSON file holds the hash of the active waypoint plan, how far
+# through it we are and the photo counters, so a restart after a power
+# glitch resumes at the right waypoint instead of re-surveying from 0.
+# Writes go to a temp file which is fsynced and renamed over the old
+# record (then the directory is fsynced), so the file on disk is always
+# either the previous or the new complete version. Updates are batched:
+# at most one write every min_interval_s unless forced.
+
+import hashlib
+import json
+import os
+import time
+
+VERSION = 1
+
+
+def plan_hash(waypoints):
+    """Stable short hash of a waypoint list (centimetre resolution)."""
+    h = hashlib.sha1()
+    for x, y in waypoints:
+        h.update(b"%.2f,%.2f;" % (x, y))
+    return h.hexdigest()[:16]
+
+
+class MissionCheckpoint:
+    def __init__(self, path, min_interval_s=10.0):
+        self.path = path
+        self.min_interval_s = float(min_interval_s)
+        self.record = {}
+        self._dirty = False
+        self._last_write = 0.0
+        self.writes = 0
+
+    def load(self):
+        """Read the checkpoint from disk. Returns the record or None."""
+        try:
+            with open(self.path, "r") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print("[CHECKPOINT] Unreadable checkpoint ignored:", e)
+            return None
+        if not isinstance(record, dict) or record.get("version") != VERSION:
+            return None
+        self.record = record
+        return record
+
+    def update(self, **fields):
+        """Merge fields into the record; written on the next flush()."""
+        for k, v in fields.items():
+            if self.record.get(k) != v:
+                self.record[k] = v
+                self._dirty = True
+
+    def flush(self, now=None, force=False):
+        now = time.monotonic() if now is None else now
+        if not self._dirty:
+            return False
+        if not force and now - self._last_write < self.min_interval_s:
+            return False
+        try:
+            self._write()
+        except OSError as e:
+            print("[CHECKPOINT] Write failed:", e)
+            return False
+        self._dirty = False
+        self._last_write = now
+        self.writes += 1
+        return True
+
+    def _write(self):
+        self.record["version"] = VERSION
+        self.record["saved_at"] = time.time()
+        data = json.dumps(self.record, separators=(",", ":")).encode("utf-8")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.path)
+
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
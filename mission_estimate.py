@@ -0,0 +1,185 @@
+# mission_estimate.py
+# How long a planned coverage mission will take and whether it fits the
+# battery, the SD card and the uplink.
+#
+# The estimate only needs the path length and turn count of a plan (see
+# coverage_planner.path_stats), so it is O(1) once those are known:
+#
+#   straight   path length / traverse speed
+#   turns      a fixed time per turn (slow down, overshoot, re-settle)
+#   photos     one per photo spacing (footprint minus overlap), but never
+#              faster than a capture cycle; if the cycle is slower than
+#              the spacing at this speed the plan leaves gaps
+#   energy     hotel load for the whole mission, propulsion scaling with
+#              speed^3 while driving lanes, turn power and flash energy
+#   data       photos x bytes per photo, against free storage and the
+#              time the uplink needs to drain it
+#
+# A plan is feasible when it fits the battery (minus reserve) and the
+# card, the camera keeps up, and lanes are no wider than a footprint.
+# Because the estimate is arithmetic, sweep() ranks every sweep angle
+# the planner already evaluated against many speeds in microseconds per
+# set; sweep_plans() also varies the lane spacing, re-planning per value.
+# The VehicleModel numbers are rough defaults; calibrate them against
+# logged dives before trusting the battery margin.
+
+import math
+
+from coverage_planner import evaluate_sweep_angles, path_stats
+
+
+class VehicleModel:
+    def __init__(
+        self,
+        turn_time_s=12.0,
+        hotel_w=3.0,
+        propulsion_w_ref=15.0,
+        ref_speed_mps=0.5,
+        turn_w=8.0,
+        battery_wh=60.0,
+        reserve=0.25,
+        capture_s=2.5,
+        flash_w=10.0,
+        flash_s=0.3,
+        photo_bytes=400_000,
+    ):
+        self.turn_time_s = turn_time_s
+        self.hotel_w = hotel_w                  # Pi, sensors, Seeeduino
+        self.propulsion_w_ref = propulsion_w_ref  # thrusters at ref_speed_mps
+        self.ref_speed_mps = ref_speed_mps
+        self.turn_w = turn_w
+        self.battery_wh = battery_wh
+        self.reserve = reserve                  # fraction kept back
+        self.capture_s = capture_s              # one full capture cycle
+        self.flash_w = flash_w
+        self.flash_s = flash_s
+        self.photo_bytes = photo_bytes          # after re-encoding
+
+    def propulsion_w(self, speed_mps):
+        return self.propulsion_w_ref * (speed_mps / self.ref_speed_mps) ** 3
+
+    def usable_wh(self):
+        return self.battery_wh * (1.0 - self.reserve)
+
+
+class MissionEstimate:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    @property
+    def feasible(self):
+        return (self.battery_ok and self.storage_ok
+                and not self.cadence_limited and not self.lane_gaps)
+
+    def as_dict(self):
+        return {
+            "angle_deg": round(self.angle_deg, 1)
+            if self.angle_deg is not None else None,
+            "speed_mps": round(self.speed_mps, 3),
+            "lane_spacing_m": round(self.lane_spacing_m, 2)
+            if self.lane_spacing_m is not None else None,
+            "path_length_m": round(self.path_length_m, 1),
+            "turns": self.turns,
+            "total_s": round(self.total_s),
+            "straight_s": round(self.straight_s),
+            "turn_s": round(self.turn_s),
+            "photos": self.photos,
+            "cadence_limited": self.cadence_limited,
+            "energy_wh": round(self.energy_wh, 1),
+            "battery_margin_wh": round(self.margin_wh, 1),
+            "upload_mb": round(self.upload_bytes / 1e6, 1),
+            "upload_s": round(self.upload_s)
+            if self.upload_s is not None else None,
+            "storage_ok": self.storage_ok,
+            "feasible": self.feasible,
+        }
+
+
+def estimate_path(path_length_m, turns, speed_mps, camera_area_m2,
+                  overlap=0.2, vehicle=None, uplink_bps=None,
+                  free_bytes=None, angle_deg=None, lane_spacing_m=None):
+    """Estimate one plan from its path length and turn count."""
+    v = vehicle or VehicleModel()
+    speed = max(float(speed_mps or 0.0), 1e-3)
+
+    straight_s = path_length_m / speed
+    turn_s = turns * v.turn_time_s
+    total_s = straight_s + turn_s
+
+    footprint_m = math.sqrt(camera_area_m2) if camera_area_m2 > 0 else 0.0
+    spacing_m = footprint_m * (1.0 - overlap)
+    cycle_m = speed * v.capture_s
+    if spacing_m > 0:
+        photos = int(math.ceil(path_length_m / max(spacing_m, cycle_m))) + 1
+    else:
+        photos = 0
+
+    energy_j = (
+        v.hotel_w * total_s
+        + v.propulsion_w(speed) * straight_s
+        + v.turn_w * turn_s
+        + photos * v.flash_w * v.flash_s
+    )
+    energy_wh = energy_j / 3600.0
+    upload_bytes = photos * v.photo_bytes
+
+    return MissionEstimate(
+        angle_deg=angle_deg,
+        lane_spacing_m=lane_spacing_m,
+        lane_gaps=lane_spacing_m is not None and lane_spacing_m > footprint_m,
+        speed_mps=speed,
+        path_length_m=path_length_m,
+        turns=turns,
+        straight_s=straight_s,
+        turn_s=turn_s,
+        total_s=total_s,
+        photos=photos,
+        photo_spacing_m=spacing_m,
+        cadence_limited=spacing_m > 0 and cycle_m > spacing_m,
+        energy_wh=energy_wh,
+        margin_wh=v.usable_wh() - energy_wh,
+        battery_ok=energy_wh <= v.usable_wh(),
+        upload_bytes=upload_bytes,
+        upload_s=upload_bytes / uplink_bps if uplink_bps else None,
+        storage_ok=free_bytes is None or upload_bytes <= free_bytes,
+    )
+
+
+def estimate(waypoints, speed_mps, camera_area_m2, **kw):
+    """Estimate driving `waypoints` in order (e.g. a plan's waypoints)."""
+    length, turns = path_stats(waypoints)
+    return estimate_path(length, turns, speed_mps, camera_area_m2, **kw)
+
+
+def sweep(candidates, speeds, camera_area_m2, **kw):
+    """Estimate every (candidate, speed) pair.
+
+    candidates are coverage_planner.SweepCandidates (e.g. plan.candidates)
+    or anything with path_length_m, turns and angle_deg. Returns the
+    estimates with feasible ones first, each group fastest first.
+    """
+    out = []
+    for c in candidates:
+        for speed in speeds:
+            out.append(estimate_path(
+                c.path_length_m, c.turns, speed, camera_area_m2,
+                angle_deg=c.angle_deg, **kw
+            ))
+    out.sort(key=lambda e: (not e.feasible, e.total_s))
+    return out
+
+
+def sweep_plans(polygon, lane_spacings, speeds, camera_area_m2, holes=(),
+                angles=None, **kw):
+    """Like sweep(), but also re-plans the polygon for each lane spacing.
+
+    Planning dominates here; every speed reuses the geometry of its
+    (spacing, angle) pair.
+    """
+    out = []
+    for spacing in lane_spacings:
+        candidates = evaluate_sweep_angles(polygon, spacing, angles, holes)
+        out.extend(sweep(candidates, speeds, camera_area_m2,
+                         lane_spacing_m=spacing, **kw))
+    out.sort(key=lambda e: (not e.feasible, e.total_s))
+    return out
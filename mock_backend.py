@@ -0,0 +1,312 @@
+# mock_backend.py
+# Local stand-in for the hosted backend, for offline and load testing.
+#
+# Implements the four endpoints main.py talks to (/info/, /update/,
+# /upload_image/, /old/) and can make the link look like a bad harbour
+# connection: added latency with jitter, dropped requests, a bandwidth
+# cap in both directions and injected 5xx answers. Every request is
+# appended to a JSON-lines record and summarised on exit.
+#
+#   python mock_backend.py --port 8000 --latency-ms 300 --jitter-ms 150 \
+#       --loss 0.05 --bandwidth-kbps 64 --error-rate 0.02 --record rx.jsonl
+#   SUB_BACKEND_URL=http://127.0.0.1:8000 python main.py
+#
+# /update/ acks every telemetry version and understands the delta/gzip
+# format from telemetry.py, so the delta path can be exercised too.
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_STATE = {
+    "explore": False,
+    "autonomous": True,
+    "meters": 1,
+    "time": "0:05",
+    "sVoltage": 0,
+    "sDry": 0,
+    "sMemory": 0,
+    "lat": 54.9130,
+    "lon": 9.7785,
+    "alt": 0.0,
+    "polygon": [],
+}
+
+_FILENAME_RE = re.compile(rb'filename="([^"]*)"')
+
+
+class LinkProfile:
+    """Impairments applied to every request."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0,
+                 bandwidth_kbps=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.loss = float(loss)
+        self.bandwidth_kbps = float(bandwidth_kbps)
+        self.error_rate = float(error_rate)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay_s(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def drop(self):
+        with self._lock:
+            return self._rng.random() < self.loss
+
+    def fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def transfer_s(self, nbytes):
+        if self.bandwidth_kbps <= 0:
+            return 0.0
+        return nbytes * 8.0 / (self.bandwidth_kbps * 1000.0)
+
+
+class MockBackend:
+    """State and bookkeeping shared by all request handler threads."""
+
+    def __init__(self, profile, state=None, record_path=None, save_dir=None):
+        self.profile = profile
+        self.state = dict(DEFAULT_STATE if state is None else state)
+        self.save_dir = save_dir
+        self._record = open(record_path, "a") if record_path else None
+        self._lock = threading.Lock()
+
+        self.telemetry = {}        # last /update/ payload, deltas applied
+        self._snapshots = {}       # tv -> payload, bases for later deltas
+        self.latencies = {}        # path -> [seconds]
+        self.counts = {}           # (path, status) -> n
+        self.bytes_in = {}         # path -> bytes
+        self.dropped = 0
+
+    # --- endpoint logic --------------------------------------------------
+
+    def info(self):
+        with self._lock:
+            return 200, dict(self.state)
+
+    def update(self, body, headers):
+        if headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        msg = json.loads(body.decode("utf-8"))
+        tv = msg.get("tv")
+        with self._lock:
+            if "d" in msg:
+                base = self._snapshots.get(msg.get("base"))
+                if base is None:
+                    return 200, {"resync": True}
+                merged = dict(base)
+                merged.update(msg["d"])
+                for key in msg.get("rm", []):
+                    merged.pop(key, None)
+            else:
+                merged = {k: v for k, v in msg.items() if k != "tv"}
+            self.telemetry = merged
+            if tv is None:
+                return 200, {"ok": True}
+            self._snapshots[tv] = merged
+            while len(self._snapshots) > 16:
+                self._snapshots.pop(next(iter(self._snapshots)))
+        return 200, {"ack": tv}
+
+    def upload_image(self, body, headers):
+        name = None
+        m = _FILENAME_RE.search(body[:4096])
+        if m:
+            name = os.path.basename(m.group(1).decode("utf-8", "replace"))
+        if self.save_dir and name:
+            start = body.find(b"\r\n\r\n")
+            end = body.rfind(b"\r\n--")
+            if start >= 0 and end > start:
+                os.makedirs(self.save_dir, exist_ok=True)
+                with open(os.path.join(self.save_dir, name), "wb") as f:
+                    f.write(body[start + 4:end])
+        return 200, {"ok": True, "file": name, "bytes": len(body)}
+
+    def old(self, body):
+        try:
+            json.loads(body.decode("utf-8") or "{}")
+        except ValueError:
+            return 400, {"error": "bad json"}
+        return 200, {"ok": True}
+
+    # --- bookkeeping -----------------------------------------------------
+
+    def log(self, method, path, status, n_in, n_out, elapsed_s, extra=None):
+        with self._lock:
+            key = (path, status)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.bytes_in[path] = self.bytes_in.get(path, 0) + n_in
+            if status is not None:
+                self.latencies.setdefault(path, []).append(elapsed_s)
+            else:
+                self.dropped += 1
+            if self._record is not None:
+                rec = {
+                    "t": round(time.time(), 3),
+                    "m": method,
+                    "path": path,
+                    "status": status,
+                    "in": n_in,
+                    "out": n_out,
+                    "ms": round(elapsed_s * 1000.0, 1),
+                }
+                if extra:
+                    rec.update(extra)
+                self._record.write(json.dumps(rec, separators=(",", ":")) + "\n")
+                self._record.flush()
+
+    def summary(self):
+        print("[MOCK] %d dropped" % self.dropped)
+        for path in sorted(self.latencies):
+            xs = sorted(self.latencies[path])
+            codes = {s: n for (p, s), n in self.counts.items()
+                     if p == path and s is not None}
+            print(
+                "[MOCK] %-15s n=%-5d in=%-9d p50=%.0fms p99=%.0fms %s"
+                % (path, len(xs), self.bytes_in.get(path, 0),
+                   xs[len(xs) // 2] * 1000.0,
+                   xs[min(len(xs) - 1, int(0.99 * len(xs)))] * 1000.0,
+                   codes)
+            )
+
+    def close(self):
+        if self._record is not None:
+            self._record.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend = None  # set by serve()
+
+    def log_message(self, fmt, *args):
+        pass  # every request is already recorded by MockBackend.log
+
+    def _read_body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        body = b""
+        profile = self.backend.profile
+        while len(body) < n:
+            chunk = self.rfile.read(min(16384, n - len(body)))
+            if not chunk:
+                break
+            body += chunk
+            time.sleep(profile.transfer_s(len(chunk)))
+        return body
+
+    def _reply(self, status, obj, head_only=False):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head_only:
+            time.sleep(self.backend.profile.transfer_s(len(data)))
+            self.wfile.write(data)
+        return len(data)
+
+    def _handle(self, method):
+        t0 = time.monotonic()
+        backend = self.backend
+        profile = backend.profile
+        path = self.path.split("?", 1)[0]
+        body = self._read_body() if method == "POST" else b""
+
+        time.sleep(profile.delay_s())
+        if profile.drop():
+            # Lost request: hang up without an answer
+            self.close_connection = True
+            backend.log(method, path, None, len(body), 0,
+                        time.monotonic() - t0)
+            return
+
+        extra = None
+        try:
+            if profile.fail():
+                status, obj = 503, {"error": "injected"}
+            elif path == "/info/" and method in ("GET", "HEAD"):
+                status, obj = backend.info()
+            elif path == "/update/" and method == "POST":
+                status, obj = backend.update(body, self.headers)
+                extra = {"telemetry": self.headers.get("X-Telemetry")}
+            elif path == "/upload_image/" and method == "POST":
+                status, obj = backend.upload_image(body, self.headers)
+                extra = {"file": obj.get("file")}
+            elif path == "/old/" and method == "POST":
+                status, obj = backend.old(body)
+            else:
+                status, obj = 404, {"error": "not found"}
+        except Exception as e:
+            status, obj = 500, {"error": str(e)}
+
+        n_out = self._reply(status, obj, head_only=(method == "HEAD"))
+        backend.log(method, path, status, len(body), n_out,
+                    time.monotonic() - t0, extra)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def serve(backend, host="127.0.0.1", port=8000):
+    """Build the HTTP server; call serve_forever() on the result."""
+    handler = type("MockHandler", (_Handler,), {"backend": backend})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Local backend stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0,
+                        help="fraction of requests dropped without an answer")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0.0,
+                        help="cap in each direction, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 503")
+    parser.add_argument("--state", help="JSON file served from /info/")
+    parser.add_argument("--record", help="append received requests here")
+    parser.add_argument("--save-dir", help="store uploaded images here")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    state = None
+    if args.state:
+        with open(args.state) as f:
+            state = json.load(f)
+
+    profile = LinkProfile(args.latency_ms, args.jitter_ms, args.loss,
+                          args.bandwidth_kbps, args.error_rate, args.seed)
+    backend = MockBackend(profile, state, args.record, args.save_dir)
+    httpd = serve(backend, args.host, args.port)
+    print("[MOCK] Serving on http://%s:%d" % (args.host, args.port))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        backend.summary()
+        backend.close()
+
+
+if __name__ == "__main__":
+    _main()
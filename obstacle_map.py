@@ -0,0 +1,107 @@
+# obstacle_map.py
+# Places the vehicle should stay away from, in mission metres.
+#
+# Hazards come from two sources: waypoints the Seeeduino reported as
+# failed (fail=N / nav_state=failed) and ultrasonic sensors latching an
+# error, recorded at the position the vehicle was at. They are binned
+# into a sparse grid (a dict keyed by cell), so adding a hazard and
+# asking "is this point near one?" are both O(1).
+#
+# The planner gets the hazards as extra hole rings (a square of
+# `clearance_m` around each hazard cell), and the waypoint dispatcher
+# uses blocked() to skip targets inside a hazard zone of the current
+# plan without restarting it.
+
+import math
+
+FAILED = "failed"
+ULTRASONIC = "ultrasonic"
+
+
+class ObstacleMap:
+    def __init__(self, cell_m=2.0, clearance_m=2.0, min_hits=1, max_holes=64):
+        self.cell_m = float(cell_m)
+        self.clearance_m = float(clearance_m)
+        self.min_hits = int(min_hits)
+        self.max_holes = int(max_holes)
+        self.cells = {}  # (i, j) -> {kind: hits}
+        self.version = 0
+
+    def _key(self, x, y):
+        return (int(math.floor(x / self.cell_m)),
+                int(math.floor(y / self.cell_m)))
+
+    def _centre(self, key):
+        return ((key[0] + 0.5) * self.cell_m, (key[1] + 0.5) * self.cell_m)
+
+    def _hits(self, key):
+        return sum(self.cells[key].values())
+
+    def add(self, x, y, kind):
+        key = self._key(x, y)
+        kinds = self.cells.setdefault(key, {})
+        kinds[kind] = kinds.get(kind, 0) + 1
+        self.version += 1
+        print("[OBSTACLE] %s at (%.1f, %.1f), %d hazard cells"
+              % (kind, x, y, len(self.cells)))
+
+    def clear(self):
+        if self.cells:
+            self.cells = {}
+            self.version += 1
+
+    def _active(self):
+        return [k for k in self.cells if self._hits(k) >= self.min_hits]
+
+    def blocked(self, x, y):
+        """True if (x, y) lies inside the clearance zone of a hazard."""
+        if not self.cells:
+            return False
+        half = self.cell_m / 2.0 + self.clearance_m
+        r = int(math.ceil(half / self.cell_m))
+        i, j = self._key(x, y)
+        for di in range(-r, r + 1):
+            for dj in range(-r, r + 1):
+                key = (i + di, j + dj)
+                if key not in self.cells or self._hits(key) < self.min_hits:
+                    continue
+                cx, cy = self._centre(key)
+                # Strict, so plans that already go around the keep-out
+                # ring (ending lanes on its edge) are left alone
+                if abs(x - cx) < half - 1e-6 and abs(y - cy) < half - 1e-6:
+                    return True
+        return False
+
+    def hole_rings(self):
+        """Square keep-out rings for the planner, most-hit cells first."""
+        keys = sorted(self._active(), key=self._hits, reverse=True)
+        half = self.cell_m / 2.0 + self.clearance_m
+        rings = []
+        for key in keys[:self.max_holes]:
+            cx, cy = self._centre(key)
+            # Lists rather than tuples so rings compare equal after a
+            # round trip through the JSON checkpoint
+            rings.append([
+                [cx - half, cy - half],
+                [cx + half, cy - half],
+                [cx + half, cy + half],
+                [cx - half, cy + half],
+            ])
+        return rings
+
+    # --- persistence ---------------------------------------------------------
+
+    def to_record(self):
+        return {
+            "cell_m": self.cell_m,
+            "cells": [[k[0], k[1], kinds] for k, kinds in self.cells.items()],
+        }
+
+    def restore(self, record):
+        if not record or record.get("cell_m") != self.cell_m:
+            return False
+        self.cells = {}
+        for i, j, kinds in record.get("cells", []):
+            self.cells[(int(i), int(j))] = dict(kinds)
+        self.version += 1
+        return True
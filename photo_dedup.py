@@ -0,0 +1,102 @@
+# photo_dedup.py
+# Near-duplicate photo suppression using a difference hash (dHash).
+#
+# Each new JPEG is decoded at reduced size (JPEG draft mode, so only a
+# fraction of the DCT work is done), converted to 9x8 grayscale, and
+# turned into a 64-bit hash of horizontal brightness gradients. Frames
+# whose hash is within a few bits of one of the recent frames are moved
+# to a low-priority directory that upload_all_images does not send.
+
+import os
+from collections import deque
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+HASH_W = 9
+HASH_H = 8
+
+
+def dhash(filepath):
+    """64-bit dHash of an image file, or None if it cannot be read."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(filepath) as img:
+            # Let the JPEG decoder downscale by up to 8x while decoding
+            img.draft("L", (HASH_W * 8, HASH_H * 8))
+            small = img.convert("L").resize((HASH_W, HASH_H), Image.BILINEAR)
+            px = list(small.getdata())
+    except Exception as e:
+        print("[DEDUP] Hash error:", filepath, e)
+        return None
+
+    h = 0
+    for row in range(HASH_H):
+        base = row * HASH_W
+        for col in range(HASH_W - 1):
+            h = (h << 1) | (px[base + col] > px[base + col + 1])
+    return h
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PhotoDeduplicator:
+    """Compares each photo against the last `history` kept frames.
+
+    Only frames that are kept enter the history, so a slow drift cannot
+    chain a long run of near-identical frames through each other.
+    """
+
+    def __init__(self, low_priority_dir, history=32, threshold_bits=6,
+                 delete=False):
+        self.low_priority_dir = low_priority_dir
+        self.threshold_bits = int(threshold_bits)
+        self.delete = bool(delete)
+        self._recent = deque(maxlen=int(history))
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def reset(self):
+        self._recent.clear()
+
+    def is_duplicate(self, h):
+        for prev in self._recent:
+            if hamming(h, prev) <= self.threshold_bits:
+                return True
+        return False
+
+    def process(self, filepath):
+        """Hash filepath and demote it if redundant.
+
+        Returns the photo's new path (None if deleted). Unreadable files
+        and a missing PIL leave the photo where it is.
+        """
+        h = dhash(filepath)
+        if h is None:
+            return filepath
+        self.checked += 1
+
+        if not self.is_duplicate(h):
+            self._recent.append(h)
+            return filepath
+
+        self.duplicates += 1
+        try:
+            if self.delete:
+                os.remove(filepath)
+                print("[DEDUP] Deleted near-duplicate:", filepath)
+                return None
+            os.makedirs(self.low_priority_dir, exist_ok=True)
+            dest = os.path.join(self.low_priority_dir, os.path.basename(filepath))
+            os.replace(filepath, dest)
+            print("[DEDUP] Near-duplicate moved to:", dest)
+            return dest
+        except OSError as e:
+            print("[DEDUP] Could not demote", filepath, ":", e)
+            return filepath
@@ -0,0 +1,161 @@
+# photo_encoder.py
+# Multi-core re-encoding of captured photos, sized to the uplink.
+#
+# Full-quality 1920x1080 JPEGs are far larger than a harbour 4G/Wi-Fi
+# link can drain during a mission. Each photo is re-encoded on a process
+# pool (one worker per core) down a quality/size ladder until it fits the
+# byte budget implied by the measured upload throughput. The pool only
+# accepts a bounded number of jobs; when it is full, submit() refuses
+# and the capture side is expected to hold off.
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# (JPEG/WebP quality, max width) from best to smallest
+QUALITY_LADDER = [
+    (90, 1920),
+    (80, 1920),
+    (70, 1600),
+    (60, 1280),
+    (50, 1024),
+    (40, 800),
+]
+
+FORMAT_EXT = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+class UplinkMeter:
+    """Exponential average of observed upload throughput (bytes/s)."""
+
+    def __init__(self, initial_bps=50_000.0, alpha=0.3):
+        self.bps = float(initial_bps)
+        self.alpha = float(alpha)
+        self.samples = 0
+
+    def record(self, nbytes, elapsed_s):
+        if nbytes <= 0 or elapsed_s <= 0:
+            return
+        rate = nbytes / elapsed_s
+        self.bps += self.alpha * (rate - self.bps)
+        self.samples += 1
+
+
+def reencode(src, dest, target_bytes, start_rung, fmt):
+    """Re-encode src into dest (atomically), stepping down QUALITY_LADDER.
+
+    Runs in a worker process. Returns (dest, bytes_in, bytes_out, rung).
+    """
+    bytes_in = os.path.getsize(src)
+    tmp = dest + ".part"
+    rung = start_rung
+    with Image.open(src) as img:
+        img.load()
+        # Keep the capture time and GPS tags of the original
+        exif = img.info.get("exif")
+        save_kw = {"exif": exif} if exif else {}
+        while True:
+            quality, max_w = QUALITY_LADDER[rung]
+            frame = img
+            if img.width > max_w:
+                h = int(img.height * max_w / img.width)
+                frame = img.resize((max_w, h), Image.BILINEAR)
+            frame.save(tmp, format=fmt, quality=quality, **save_kw)
+            bytes_out = os.path.getsize(tmp)
+            if bytes_out <= target_bytes or rung == len(QUALITY_LADDER) - 1:
+                break
+            rung += 1
+
+    if bytes_out >= bytes_in and dest == src:
+        # Already smaller than anything we would produce
+        os.remove(tmp)
+        return src, bytes_in, bytes_in, rung
+
+    os.replace(tmp, dest)
+    if dest != src:
+        os.remove(src)
+    return dest, bytes_in, bytes_out, rung
+
+
+class PhotoEncoder:
+    def __init__(self, uplink, target_upload_s=4.0, workers=None,
+                 max_pending=None, fmt="JPEG"):
+        if Image is None:
+            raise RuntimeError("PIL not available")
+
+        self.uplink = uplink
+        self.target_upload_s = float(target_upload_s)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.fmt = fmt.upper()
+        # Not forked: the capture and flusher threads may hold locks
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        self._jobs = {}  # src path -> Future
+
+        # Start new jobs from the rung that last fit, not from the top
+        self.rung = 0
+        self.encoded = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def target_bytes(self):
+        return int(self.uplink.bps * self.target_upload_s)
+
+    def full(self):
+        return len(self._jobs) >= self.max_pending
+
+    def pending(self, path):
+        return path in self._jobs
+
+    def submit(self, src):
+        """Queue src for re-encoding. Returns False if the pool is full."""
+        if self.full():
+            return False
+        root, _ = os.path.splitext(src)
+        dest = root + FORMAT_EXT.get(self.fmt, ".jpg")
+        self._jobs[src] = self._pool.submit(
+            reencode, src, dest, self.target_bytes(), self.rung, self.fmt
+        )
+        return True
+
+    def poll(self):
+        """Collect finished jobs. Returns a list of (dest, bytes_in, bytes_out);
+        a failed job comes back as (src, None, None), src left untouched."""
+        done = []
+        for src, fut in list(self._jobs.items()):
+            if not fut.done():
+                continue
+            del self._jobs[src]
+            try:
+                dest, b_in, b_out, rung = fut.result()
+            except Exception as e:
+                print("[ENCODE] Failed for", src, ":", e)
+                done.append((src, None, None))
+                continue
+            # Drift one rung back up when there is headroom again
+            if b_out < self.target_bytes() // 2 and rung > 0:
+                rung -= 1
+            self.rung = rung
+            self.encoded += 1
+            self.bytes_in += b_in
+            self.bytes_out += b_out
+            done.append((dest, b_in, b_out))
+        return done
+
+    def drain(self, timeout_s=30.0):
+        deadline = time.monotonic() + timeout_s
+        while self._jobs and time.monotonic() < deadline:
+            self.poll()
+            time.sleep(0.05)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,324 @@
+# photo_staging.py
+# RAM-backed staging of photos with write-behind flushing to the SD card.
+#
+# Photos are captured (and de-duplicated and re-encoded) in a tmpfs
+# directory, so a slow SD write never adds to capture latency. Once the
+# loop is done with a photo it commit()s it, and a background flusher
+# copies it to its SD directory:
+#
+#   - batches of up to batch_files photos (or whatever is queued after
+#     max_delay_s) are written back to back in large sequential chunks
+#     to "<name>.part", then all fsynced, renamed into place and the
+#     directory fsynced once per batch
+#   - only then are the staged copies removed, so a photo always exists
+#     completely in at least one of the two places
+#
+# Capacity is bounded (bytes and files). full() tells the capture side
+# to hold off until the flusher catches up, the same back-pressure the
+# re-encoder uses. If the SD card rejects writes, the batch stays staged
+# and is retried with backoff.
+#
+# Crash recovery: tmpfs survives a crash or restart of this process (not
+# a power cut), so recover() at start-up flushes every complete photo
+# left in staging and removes half-written .part files on the card. A
+# photo the loop never committed (e.g. re-encoding failed) is committed
+# by the flusher itself once it is older than orphan_s.
+
+import os
+import threading
+import time
+
+CHUNK = 1024 * 1024
+
+
+class PhotoStager:
+    def __init__(self, stage_dir, dest_dir, max_bytes=64 * 1024 * 1024,
+                 max_files=48, batch_files=8, max_delay_s=5.0, orphan_s=120.0,
+                 extensions=(".jpg", ".jpeg", ".png", ".webp"), busy=None):
+        """busy, if given, is a predicate for staged paths that are still
+        being worked on and must not be swept up as orphans."""
+        self.stage_dir = stage_dir
+        self.dest_dir = dest_dir
+        self.max_bytes = int(max_bytes)
+        self.max_files = int(max_files)
+        self.batch_files = int(batch_files)
+        self.max_delay_s = float(max_delay_s)
+        self.orphan_s = float(orphan_s)
+        self.extensions = tuple(extensions)
+        self.busy = busy
+
+        self._cond = threading.Condition()
+        self._queue = []        # [(staged path, dest dir)]
+        self._queued_at = None  # when the oldest queued photo was committed
+        self._urgent = False
+        self._stop = False
+        self._retry_at = 0.0
+        self._backoff_s = 1.0
+        self._thread = None
+
+        self.flushed = 0
+        self.flushed_bytes = 0
+        self.batches = 0
+        self.errors = 0
+        self.recovered = 0
+        self.last_batch_s = 0.0
+
+        os.makedirs(self.stage_dir, exist_ok=True)
+
+    # --- capture side --------------------------------------------------------
+
+    def staged(self):
+        """(files, bytes) currently held in staging."""
+        files = 0
+        total = 0
+        for path in self._staged_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                continue
+            files += 1
+        return files, total
+
+    def full(self):
+        files, total = self.staged()
+        return files >= self.max_files or total >= self.max_bytes
+
+    def commit(self, path, dest_dir=None):
+        """Queue a finished staged photo for flushing to dest_dir."""
+        if path is None:
+            return
+        with self._cond:
+            if any(p == path for p, _ in self._queue):
+                return
+            if not self._queue:
+                self._queued_at = time.monotonic()
+            self._queue.append((path, dest_dir or self.dest_dir))
+            if len(self._queue) >= self.batch_files:
+                self._cond.notify()
+
+    def flush_now(self):
+        """Ask the flusher to write out everything queued immediately."""
+        with self._cond:
+            self._urgent = True
+            self._retry_at = 0.0
+            self._cond.notify()
+
+    def pending(self, path):
+        with self._cond:
+            return any(p == path for p, _ in self._queue)
+
+    # --- flusher ---------------------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="photo-flush", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self, timeout_s=30.0):
+        """Flush what is queued and stop the flusher."""
+        with self._cond:
+            self._stop = True
+            self._urgent = True
+            self._retry_at = 0.0
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout_s)
+
+    def _run(self):
+        last_sweep = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._stop and not self._batch_due():
+                    self._cond.wait(timeout=0.5)
+                batch = []
+                if self._batch_due():
+                    batch = self._queue[:self.batch_files]
+                stop = self._stop
+
+            if batch:
+                self._flush_batch(batch)
+            now = time.monotonic()
+            if now - last_sweep >= self.orphan_s / 4.0:
+                self._sweep_orphans(now)
+                last_sweep = now
+            if stop:
+                with self._cond:
+                    if not self._queue or self._retry_at > time.monotonic():
+                        return
+
+    def _batch_due(self):
+        if not self._queue or time.monotonic() < self._retry_at:
+            return False
+        if self._urgent or len(self._queue) >= self.batch_files:
+            return True
+        return time.monotonic() - self._queued_at >= self.max_delay_s
+
+    def _flush_batch(self, batch):
+        t0 = time.monotonic()
+        written = []  # (staged path, final path, part path, fd)
+        nbytes = 0
+        try:
+            for src, dest_dir in batch:
+                if not os.path.exists(src):
+                    written.append((src, None, None, None))
+                    continue
+                os.makedirs(dest_dir, exist_ok=True)
+                final = os.path.join(dest_dir, os.path.basename(src))
+                part = final + ".part"
+                fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                written.append((src, final, part, fd))
+                with open(src, "rb") as f:
+                    while True:
+                        chunk = f.read(CHUNK)
+                        if not chunk:
+                            break
+                        view = memoryview(chunk)
+                        while view:
+                            view = view[os.write(fd, view):]
+                        nbytes += len(chunk)
+
+            # One round of fsyncs and renames, one directory fsync per dir
+            dirs = set()
+            for i, (src, final, part, fd) in enumerate(written):
+                if fd is None:
+                    continue
+                os.fsync(fd)
+                written[i] = (src, final, part, None)
+                os.close(fd)
+                os.replace(part, final)
+                dirs.add(os.path.dirname(final))
+            for d in dirs:
+                _fsync_dir(d)
+        except OSError as e:
+            for src, final, part, fd in written:
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                if part is not None:
+                    try:
+                        os.remove(part)
+                    except OSError:
+                        pass
+            self.errors += 1
+            print("[STAGE] Flush to SD failed, retrying in %.0fs: %s"
+                  % (self._backoff_s, e))
+            with self._cond:
+                self._retry_at = time.monotonic() + self._backoff_s
+                self._backoff_s = min(self._backoff_s * 2.0, 60.0)
+            return
+
+        for src, final, part, fd in written:
+            if final is None:
+                continue
+            try:
+                os.remove(src)
+            except OSError:
+                pass
+        done = set(src for src, _ in batch)
+        with self._cond:
+            self._queue = [q for q in self._queue if q[0] not in done]
+            self._queued_at = time.monotonic() if self._queue else None
+            if not self._queue:
+                self._urgent = False
+            self._backoff_s = 1.0
+        self.batches += 1
+        self.flushed += sum(1 for w in written if w[1] is not None)
+        self.flushed_bytes += nbytes
+        self.last_batch_s = time.monotonic() - t0
+
+    # --- recovery --------------------------------------------------------------
+
+    def _staged_files(self, root=None):
+        """Complete photos in the staging tree (not .part files)."""
+        root = self.stage_dir if root is None else root
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return []
+        out = []
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                out.extend(self._staged_files(path))
+            elif name.lower().endswith(self.extensions):
+                out.append(path)
+        return out
+
+    def _dest_for(self, path):
+        """SD directory mirroring the staged file's subdirectory."""
+        rel = os.path.relpath(os.path.dirname(path), self.stage_dir)
+        if rel == os.curdir:
+            return self.dest_dir
+        return os.path.join(self.dest_dir, rel)
+
+    def _sweep_orphans(self, now_monotonic):
+        now = time.time()
+        for path in self._staged_files():
+            if self.pending(path):
+                continue
+            if self.busy is not None and self.busy(path):
+                continue
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            if age >= self.orphan_s:
+                print("[STAGE] Flushing uncommitted photo:", path)
+                self.commit(path, self._dest_for(path))
+
+    def recover(self):
+        """Queue photos left in staging by a previous run and remove
+        half-written copies on the card. Call before start()."""
+        for root, _, names in os.walk(self.dest_dir):
+            for name in names:
+                if name.endswith(".part"):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        for path in self._staged_files():
+            self.commit(path, self._dest_for(path))
+            self.recovered += 1
+        for root, _, names in os.walk(self.stage_dir):
+            for name in names:
+                if name.endswith(".part"):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        if self.recovered:
+            print("[STAGE] Recovered %d staged photos" % self.recovered)
+            self.flush_now()
+        return self.recovered
+
+    def stats(self):
+        files, total = self.staged()
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            "staged_files": files,
+            "staged_mb": round(total / 1e6, 1),
+            "queued": queued,
+            "flushed": self.flushed,
+            "flushed_mb": round(self.flushed_bytes / 1e6, 1),
+            "batches": self.batches,
+            "last_batch_s": round(self.last_batch_s, 2),
+            "errors": self.errors,
+        }
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
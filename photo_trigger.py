@@ -0,0 +1,87 @@
+# photo_trigger.py
+# Distance-based photo trigger for coverage surveys.
+#
+# Instead of a fixed timer, a photo is due once the vehicle has moved one
+# footprint length (minus the wanted forward overlap) since the last
+# shot. Distance comes from the position estimate when there is one and
+# from dead reckoning at the commanded speed otherwise; nothing accrues
+# while the vehicle is not under way, so holding station or stalling at
+# a turn no longer produces duplicate frames.
+
+import math
+
+
+class PhotoTrigger:
+    def __init__(self, camera_area_m2, overlap=0.2, min_interval_s=1.0,
+                 max_step_m=25.0):
+        self.footprint_m = math.sqrt(camera_area_m2) if camera_area_m2 > 0 else 0.0
+        self.overlap = float(overlap)
+        self.spacing_m = self.footprint_m * (1.0 - self.overlap)
+        # Never fire faster than the camera can actually take pictures
+        self.min_interval_s = float(min_interval_s)
+        # A position jump larger than this is a fix glitch, not travel
+        self.max_step_m = float(max_step_m)
+
+        self.photos_needed = 0
+        self.photos_taken = 0
+        self.odometer_m = 0.0
+        self._last_shot_odo = None
+        self.last_shot_time = 0.0
+        self._last_pos = None
+        self._last_update = None
+
+    def reset(self, photos_needed):
+        """Start counting for a new plan."""
+        self.photos_needed = int(photos_needed or 0)
+        self.photos_taken = 0
+        self._last_shot_odo = None
+
+    def update(self, pos_xy, now, moving, speed_ms=None):
+        """Advance the odometer and return True if a photo is due."""
+        dt = 0.0 if self._last_update is None else max(0.0, now - self._last_update)
+        self._last_update = now
+
+        if pos_xy is not None:
+            if self._last_pos is not None and moving:
+                step = math.hypot(
+                    pos_xy[0] - self._last_pos[0], pos_xy[1] - self._last_pos[1]
+                )
+                if step <= self.max_step_m:
+                    self.odometer_m += step
+            self._last_pos = pos_xy
+        else:
+            # Distance dead-reckoned meanwhile is already counted, so the
+            # next fix starts a new track instead of adding the jump
+            self._last_pos = None
+            if moving and speed_ms:
+                self.odometer_m += speed_ms * dt
+
+        if not moving or self.spacing_m <= 0:
+            return False
+        if now - self.last_shot_time < self.min_interval_s:
+            return False
+        if self._last_shot_odo is None:
+            return True
+        return self.odometer_m - self._last_shot_odo >= self.spacing_m
+
+    def restore(self, last_shot_time, now, speed_ms=None):
+        """Continue after a restart whose last photo was at last_shot_time.
+
+        The distance driven since then is estimated at speed_ms, so the
+        next photo comes one spacing after the last one instead of at
+        once; without a speed it comes one spacing from here.
+        """
+        if not last_shot_time:
+            return
+        self.last_shot_time = float(last_shot_time)
+        since = max(0.0, now - self.last_shot_time) * (speed_ms or 0.0)
+        self._last_shot_odo = self.odometer_m - since
+
+    def record(self, now):
+        """Call once a photo has been taken."""
+        self.photos_taken += 1
+        self._last_shot_odo = self.odometer_m
+        self.last_shot_time = now
+
+    def progress(self):
+        return "%d/%d" % (self.photos_taken, self.photos_needed)
@@ -0,0 +1,174 @@
+# projection.py
+# Local ENU (east/north, metres) projection around a cached mission origin.
+#
+# The backend and the GPS speak WGS84 lat/lon, while the planner and the
+# Seeeduino GOTO command work in metres. A LocalFrame precomputes the
+# metres-per-degree scale at its origin once, so converting whole
+# polygons or waypoint lists is just a multiply-add per point with no
+# trigonometry. Over harbour-sized areas (a few km) the tangent-plane
+# error is well below GPS noise.
+#
+# The bulk conversions and the geodesic area run as NumPy array
+# operations when NumPy is available, with a plain-Python fallback
+# (same results) otherwise.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_E = math.sqrt(WGS84_E2)
+
+_FRAME_CACHE_SIZE = 8
+_frames = {}
+
+
+class LocalFrame:
+    """East/north tangent frame (metres) anchored at lat0/lon0.
+
+    Points are (lat, lon) in degrees on the geodetic side and (x, y) =
+    (east, north) in metres on the local side.
+    """
+
+    def __init__(self, lat0, lon0, alt0=0.0):
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self.alt0 = float(alt0)
+
+        phi = math.radians(self.lat0)
+        s = math.sin(phi)
+        w = math.sqrt(1.0 - WGS84_E2 * s * s)
+        # Meridional (M) and prime vertical (N) radii of curvature.
+        m = WGS84_A * (1.0 - WGS84_E2) / (w * w * w)
+        n = WGS84_A / w
+        rad = math.pi / 180.0
+        self.m_per_deg_lat = (m + self.alt0) * rad
+        self.m_per_deg_lon = (n + self.alt0) * math.cos(phi) * rad
+
+    def forward(self, lat, lon):
+        return (
+            (lon - self.lon0) * self.m_per_deg_lon,
+            (lat - self.lat0) * self.m_per_deg_lat,
+        )
+
+    def inverse(self, x, y):
+        return (
+            self.lat0 + y / self.m_per_deg_lat,
+            self.lon0 + x / self.m_per_deg_lon,
+        )
+
+    def forward_many(self, latlons):
+        """[(lat, lon), ...] -> [(x, y), ...]"""
+        lat0 = self.lat0
+        lon0 = self.lon0
+        kx = self.m_per_deg_lon
+        ky = self.m_per_deg_lat
+        if np is not None and len(latlons):
+            a = np.asarray(latlons, dtype=float)
+            xs = (a[:, 1] - lon0) * kx
+            ys = (a[:, 0] - lat0) * ky
+            return list(zip(xs.tolist(), ys.tolist()))
+        return [((p[1] - lon0) * kx, (p[0] - lat0) * ky) for p in latlons]
+
+    def inverse_many(self, points):
+        """[(x, y), ...] -> [(lat, lon), ...]"""
+        lat0 = self.lat0
+        lon0 = self.lon0
+        ix = 1.0 / self.m_per_deg_lon
+        iy = 1.0 / self.m_per_deg_lat
+        if np is not None and len(points):
+            a = np.asarray(points, dtype=float)
+            lats = lat0 + a[:, 1] * iy
+            lons = lon0 + a[:, 0] * ix
+            return list(zip(lats.tolist(), lons.tolist()))
+        return [(lat0 + p[1] * iy, lon0 + p[0] * ix) for p in points]
+
+    def bearing_deg(self, lat1, lon1, lat2, lon2, min_dist_m=0.1):
+        """Compass bearing (0 = north, clockwise) from point 1 to point 2.
+
+        Returns None if either point is missing or they are closer than
+        min_dist_m, where GPS noise dominates the direction.
+        """
+        if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+            return None
+        dx = (lon2 - lon1) * self.m_per_deg_lon
+        dy = (lat2 - lat1) * self.m_per_deg_lat
+        if dx * dx + dy * dy < min_dist_m * min_dist_m:
+            return None
+        return math.degrees(math.atan2(dx, dy)) % 360.0
+
+
+def get_frame(lat0, lon0):
+    """Return a cached LocalFrame for this origin (rounded to ~1 cm)."""
+    key = (round(float(lat0), 7), round(float(lon0), 7))
+    frame = _frames.get(key)
+    if frame is None:
+        if len(_frames) >= _FRAME_CACHE_SIZE:
+            _frames.pop(next(iter(_frames)))
+        frame = LocalFrame(key[0], key[1])
+        _frames[key] = frame
+    return frame
+
+
+def frame_for_polygon(latlons):
+    """Mission frame for a (lat, lon) polygon, anchored at its vertex mean.
+
+    The same polygon always maps to the same cached frame, so re-polling
+    the backend does not shift the local coordinates under the vehicle.
+    """
+    if not latlons:
+        return None
+    n = len(latlons)
+    lat0 = sum(p[0] for p in latlons) / n
+    lon0 = sum(p[1] for p in latlons) / n
+    return get_frame(lat0, lon0)
+
+
+def _authalic_q(sin_phi, log=math.log):
+    """log is np.log when sin_phi is an array."""
+    e = WGS84_E
+    es = e * sin_phi
+    return (1.0 - WGS84_E2) * (
+        sin_phi / (1.0 - es * es)
+        - log((1.0 - es) / (1.0 + es)) / (2.0 * e)
+    )
+
+
+_Q_POLE = _authalic_q(1.0)
+# Radius of the sphere with the same surface area as the WGS84 ellipsoid.
+AUTHALIC_RADIUS_M = WGS84_A * math.sqrt(_Q_POLE / 2.0)
+
+
+def geodesic_area_m2(latlons):
+    """Area of a (lat, lon) polygon on the WGS84 ellipsoid, in m^2.
+
+    Latitudes are mapped to authalic latitudes, which is area preserving,
+    and the spherical-excess line integral is evaluated on the authalic
+    sphere. Unlike a planar shoelace this stays correct for large or
+    high-latitude polygons.
+    """
+    n = len(latlons) if latlons else 0
+    if n < 3:
+        return 0.0
+    rad = math.pi / 180.0
+    if np is not None:
+        a = np.asarray(latlons, dtype=float)
+        sin_beta = _authalic_q(np.sin(a[:, 0] * rad), np.log) / _Q_POLE
+        lon = a[:, 1]
+        total = float(np.sum(
+            (np.roll(lon, -1) - np.roll(lon, 1)) * rad * sin_beta
+        ))
+        return abs(total) * AUTHALIC_RADIUS_M * AUTHALIC_RADIUS_M * 0.5
+    # sin(authalic latitude) for every vertex
+    sin_beta = [_authalic_q(math.sin(p[0] * rad)) / _Q_POLE for p in latlons]
+    total = 0.0
+    for i in range(n):
+        lon_prev = latlons[i - 1][1]
+        lon_next = latlons[(i + 1) % n][1]
+        total += (lon_next - lon_prev) * rad * sin_beta[i]
+    return abs(total) * AUTHALIC_RADIUS_M * AUTHALIC_RADIUS_M * 0.5
@@ -0,0 +1,121 @@
+# rate_control.py
+# Adaptive intervals for the periodic backend traffic.
+#
+# The base intervals (backend poll, /update/ + state, STATUS forwarding to
+# /old/, upload attempts) are scaled by mission phase and link quality:
+#
+#   idle       on the dock: poll and telemetry slowly, upload normally
+#   survey     explore on: the base intervals
+#   emergency  leak or Seeeduino emergency: tight poll/telemetry/STATUS,
+#              uploads pushed back so they don't compete for the link
+#
+# Manual control (autonomous off) polls the backend faster since the
+# operator's commands arrive that way. A slow link (EWMA RTT above
+# GOOD_RTT_S) or a high recent error rate stretches every interval, by
+# at most LINK_MAX_SCALE. The result is always clamped into the
+# configured [min, max] bounds of each channel.
+
+import time
+
+POLL = "poll"
+UPDATE = "update"
+STATUS = "status"
+UPLOAD = "upload"
+CHANNELS = (POLL, UPDATE, STATUS, UPLOAD)
+
+IDLE = "idle"
+SURVEY = "survey"
+EMERGENCY = "emergency"
+
+PHASE_SCALE = {
+    IDLE: {POLL: 2.0, UPDATE: 3.0, STATUS: 5.0, UPLOAD: 1.0},
+    SURVEY: {POLL: 1.0, UPDATE: 1.0, STATUS: 1.0, UPLOAD: 1.0},
+    EMERGENCY: {POLL: 0.4, UPDATE: 0.2, STATUS: 0.2, UPLOAD: 6.0},
+}
+MANUAL_POLL_SCALE = 0.5
+
+GOOD_RTT_S = 0.8
+LINK_MAX_SCALE = 4.0
+
+
+class RateController:
+    def __init__(self, base_s, bounds_s, net=None):
+        """base_s: {channel: seconds}; bounds_s: {channel: (min_s, max_s)}.
+
+        net is an optional ConnectivityMonitor supplying RTT and error
+        counts.
+        """
+        self.base_s = dict(base_s)
+        self.bounds_s = dict(bounds_s)
+        self.net = net
+
+        self.phase = IDLE
+        self.intervals = {c: float(self.base_s[c]) for c in CHANNELS}
+        self.error_rate = 0.0  # EWMA over recent backend calls
+        self._last = {c: 0.0 for c in CHANNELS}
+        self._counts = {c: 0 for c in CHANNELS}
+        self._seen = (0, 0)
+        self._window_start = None
+
+    def link_scale(self):
+        scale = 1.0
+        net = self.net
+        if net is not None:
+            ok, bad = net.successes, net.failures
+            d_ok, d_bad = ok - self._seen[0], bad - self._seen[1]
+            self._seen = (ok, bad)
+            if d_ok + d_bad:
+                sample = d_bad / float(d_ok + d_bad)
+                self.error_rate += 0.3 * (sample - self.error_rate)
+            if net.rtt_s is not None and net.rtt_s > GOOD_RTT_S:
+                scale *= net.rtt_s / GOOD_RTT_S
+        scale *= 1.0 + 3.0 * self.error_rate
+        return min(scale, LINK_MAX_SCALE)
+
+    def update(self, explore, autonomous, emergency):
+        """Recompute the intervals; call once per loop iteration."""
+        if emergency:
+            phase = EMERGENCY
+        elif explore:
+            phase = SURVEY
+        else:
+            phase = IDLE
+        if phase != self.phase:
+            print("[RATE] Phase", self.phase, "->", phase)
+            self.phase = phase
+
+        link = self.link_scale()
+        for c in CHANNELS:
+            s = self.base_s[c] * PHASE_SCALE[phase][c] * link
+            if c == POLL and not autonomous:
+                s *= MANUAL_POLL_SCALE
+            lo, hi = self.bounds_s[c]
+            self.intervals[c] = min(max(s, lo), hi)
+        return self.intervals
+
+    def due(self, channel, now):
+        return now - self._last[channel] >= self.intervals[channel]
+
+    def mark(self, channel, now):
+        self._last[channel] = now
+        self._counts[channel] += 1
+        if self._window_start is None:
+            # The first window starts at the first call, on the caller's clock
+            self._window_start = now
+
+    def report(self, now=None):
+        """Configured and measured intervals since the last report."""
+        now = time.time() if now is None else now
+        elapsed = 0.0
+        if self._window_start is not None:
+            elapsed = now - self._window_start
+        out = {"phase": self.phase, "error_rate": round(self.error_rate, 3)}
+        for c in CHANNELS:
+            n = self._counts[c]
+            out[c] = {
+                "interval_s": round(self.intervals[c], 2),
+                "measured_hz": round(n / elapsed, 3) if elapsed > 0 else 0.0,
+            }
+            self._counts[c] = 0
+        self._window_start = now
+        return out
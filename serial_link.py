@@ -1,196 +1,596 @@
-import pigpio
+import threading
 import time
+from collections import deque
+
+from status_schema import StatusDecoder
+from structured_log import get_logger
+
+# pigpio is imported when the first link is opened so that importing this
+# module (and main.py) stays cheap until the link is actually needed.
+pigpio = None
 
 RX_GPIO = 20  # GPIO pin for RX (from Seeeduino TX)
 TX_GPIO = 21  # GPIO pin for TX (to Seeeduino RX)
 BAUD = 9600
 
-_pi = None
-_rx_buffer = bytearray()
-_last_rx_time = 0.0
-
-
-def init_serial():
-    global _pi, _rx_buffer, _last_rx_time
-    if _pi is not None:
-        return
-
-    _pi = pigpio.pi()
-    if not _pi.connected:
-        raise RuntimeError("pigpio daemon not running / not connected")
-
-    # Set up TX as output, RX as input
-    _pi.set_mode(TX_GPIO, pigpio.OUTPUT)
-    _pi.set_mode(RX_GPIO, pigpio.INPUT)
-
-    # Use pigpio serial read callback for RX
-    def _rx_callback(gpio, level, tick):
-        global _rx_buffer, _last_rx_time
-        if level != pigpio.FALLING_EDGE:
-            return
-        try:
-            b = _pi.serial_read_byte(RX_GPIO)  # may not be used depending on wiring
-            _rx_buffer.append(b)
-            _last_rx_time = time.time()
-        except Exception:
-            pass
-
-    # We don't actually attach the callback here – reading is done using
-    # the built-in serial read on a bit-banged UART. See read_seeeduino_status.
-    _rx_buffer = bytearray()
-    _last_rx_time = time.time()
-
-
-def close_serial():
-    global _pi
-    if _pi is not None:
-        _pi.stop()
-        _pi = None
-
+# One pigpio daemon connection is shared by every NanoLink in the process.
+_shared_pi = None
+_shared_refs = 0
+_shared_lock = threading.Lock()
+# pigpio waveforms are global to the daemon, so only one link may build
+# and send a TX waveform at a time.
+_wave_lock = threading.Lock()
+
+_log_rx = get_logger("serial.rx")
+_log_tx = get_logger("serial.tx")
+
+# Channel ids passed to NanoLink.tap(channel, data) for raw RX/TX bytes
+TAP_RX = 1
+TAP_TX = 2
+
+# TX priority classes, most urgent first
+TX_EMERGENCY = 0
+TX_GOTO = 1
+TX_STATE = 2
+TX_CLASS_NAMES = ("emergency", "goto", "state")
+
+# Share of the line's airtime that routine (state) traffic may use; the
+# rest is headroom so a GOTO or emergency line never waits behind it
+TX_STATE_BUDGET = 0.6
+
+# Link health (see LinkHealth)
+MAX_RX_BUFFER = 1024     # bytes without a newline before the buffer is dropped
+RATE_WINDOW_S = 5.0      # byte/frame rates are measured over this window
+STATUS_STALE_S = 3.0     # no STATUS for this long counts as degraded
+RX_SILENT_S = 2.0        # no bytes at all for this long counts as degraded
+GOTO_ACK_WARN_S = 2.0    # median GOTO->ack round trip considered slow
+PARSE_ERROR_WARN = 0.1   # share of bad lines in a window considered degraded
+RTT_BINS_MS = (100, 200, 500, 1000, 2000, 5000)  # histogram upper edges
+
+
+def _acquire_pi():
+    global _shared_pi, _shared_refs, pigpio
+    with _shared_lock:
+        if _shared_pi is None:
+            if pigpio is None:
+                import pigpio as _pigpio
+                pigpio = _pigpio
+            pi = pigpio.pi()
+            if not pi.connected:
+                raise RuntimeError("pigpio daemon not running / not connected")
+            _shared_pi = pi
+        _shared_refs += 1
+        return _shared_pi
+
+
+def _release_pi():
+    global _shared_pi, _shared_refs
+    with _shared_lock:
+        _shared_refs -= 1
+        if _shared_refs <= 0 and _shared_pi is not None:
+            _shared_pi.stop()
+            _shared_pi = None
+            _shared_refs = 0
 
-def _parse_status_line(line: str):
-    """
-    Parse a STATUS line from the Seeeduino into a dict.
 
-    Format is:
-      STATUS,key=value,key2=value2,...
-
-    Values are kept as strings unless they look like ints/floats.
-    """
-    line = line.strip()
-    if not line.startswith("STATUS,"):
-        return None
-
-    parts = line.split(",")[1:]
-    result = {}
-    for part in parts:
-        if "=" not in part:
-            continue
-        k, v = part.split("=", 1)
-        v = v.strip()
-        # Try to parse numbers
-        try:
-            if "." in v:
-                v_cast = float(v)
-            else:
-                v_cast = int(v)
-            result[k] = v_cast
-        except ValueError:
-            result[k] = v
-    return result
-
-
-def read_seeeduino_status(timeout_s: float = 0.01):
-    """
-    Read a STATUS line from the Seeeduino if available.
-
-    This assumes that the Seeeduino periodically sends newline-terminated
-    ASCII lines. We look for lines starting with 'STATUS,' and parse them.
-    """
-    global _pi, _rx_buffer, _last_rx_time
-
-    if _pi is None:
-        init_serial()
-
-    # Read available bytes from RX GPIO bit-banged serial
-    try:
-        count, data = _pi.bb_serial_read(RX_GPIO)
-        if count > 0:
-            _rx_buffer.extend(data)
-            _last_rx_time = time.time()
-    except pigpio.error:
-        # If bb_serial_read isn't initialised, just ignore
-        pass
-
-    # Look for newline in buffer
-    if b"\n" not in _rx_buffer:
-        return None
-
-    line_bytes, _, rest = _rx_buffer.partition(b"\n")
-    _rx_buffer = bytearray(rest)
-
-    try:
-        line = line_bytes.decode("ascii", errors="ignore")
-    except Exception:
-        return None
+# ---------------------------------------------------------------------------
+# Transmit scheduling
+# ---------------------------------------------------------------------------
 
-    status = _parse_status_line(line)
-    if status is not None:
-        print("[SERIAL] RX STATUS:", status)
-    return status
+class TxScheduler:
+    """Priority queue in front of a blocking line writer.
 
+    One sender thread puts lines on the wire, always the most urgent
+    class first (emergency > goto > state). A line queued with a key
+    replaces any line with the same key still waiting, so a newer state
+    supersedes an older one and a GOTO retransmit doesn't go out twice.
 
-def _send_line(line: str):
+    Airtime is accounted at baud/10 bytes/s (8N1). State lines draw from
+    a token bucket refilled at state_budget of that rate; emergency and
+    GOTO lines always go next but are charged to the same bucket, so a
+    GOTO burst pushes state traffic back instead of piling up behind it.
     """
-    Send a line of ASCII text to the Seeeduino using bit-banged serial.
-    """
-    global _pi
-    if _pi is None:
-        init_serial()
 
-    if not line.endswith("\n"):
-        line = line + "\n"
+    def __init__(self, write, baud, state_budget=TX_STATE_BUDGET,
+                 max_queue=32):
+        self.write = write
+        self.bytes_per_s = baud / 10.0
+        self.state_budget = float(state_budget)
+        self.max_queue = int(max_queue)
+
+        self._cond = threading.Condition()
+        self._queues = [deque() for _ in TX_CLASS_NAMES]
+        self._tokens = self.bytes_per_s * self.state_budget  # one second
+        self._refill_at = time.monotonic()
+        self._stop = False
+
+        self.sent = [0] * len(TX_CLASS_NAMES)
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self.airtime_s = 0.0
+        self.started_at = time.monotonic()
+        self.latencies = [deque(maxlen=100) for _ in TX_CLASS_NAMES]
+
+        self._thread = threading.Thread(
+            target=self._run, name="serial-tx", daemon=True
+        )
+        self._thread.start()
+
+    def airtime(self, nbytes):
+        return nbytes / self.bytes_per_s
+
+    def put(self, data, cls=TX_STATE, key=None):
+        with self._cond:
+            if key is not None:
+                for q in self._queues:
+                    for item in list(q):
+                        if item[2] == key:
+                            q.remove(item)
+                            self.coalesced += 1
+            q = self._queues[cls]
+            if len(q) >= self.max_queue:
+                q.popleft()  # oldest of this class is the most stale
+                self.dropped += 1
+            q.append((data, time.monotonic(), key))
+            self._cond.notify()
+
+    def depth(self):
+        with self._cond:
+            return [len(q) for q in self._queues]
+
+    def discard(self, cls):
+        """Drop every line of class cls still waiting to be sent."""
+        with self._cond:
+            self.dropped += len(self._queues[cls])
+            self._queues[cls].clear()
+
+    def close(self, timeout_s=2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout_s)
+
+    def _refill(self, now):
+        cap = self.bytes_per_s * self.state_budget
+        self._tokens = min(cap, self._tokens + (now - self._refill_at) * cap)
+        self._refill_at = now
+
+    def _next(self):
+        """Pop the next line to send, or return the seconds to wait."""
+        now = time.monotonic()
+        self._refill(now)
+        for cls, q in enumerate(self._queues):
+            if not q:
+                continue
+            if cls == TX_STATE and self._tokens < len(q[0][0]):
+                wait = (len(q[0][0]) - self._tokens) \
+                    / (self.bytes_per_s * self.state_budget)
+                return None, wait
+            data, queued_at, _ = q.popleft()
+            self._tokens -= len(data)
+            return (cls, data, queued_at), 0.0
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    item, wait = self._next()
+                    if item is not None or self._stop:
+                        break
+                    self._cond.wait(timeout=wait)
+            if item is None:
+                return
+            cls, data, queued_at = item
+            try:
+                self.write(data)
+            except Exception as e:
+                self.errors += 1
+                _log_tx.warning("write failed: %s", e)
+                continue
+            self.sent[cls] += 1
+            self.airtime_s += self.airtime(len(data))
+            self.latencies[cls].append(time.monotonic() - queued_at)
+
+    def stats(self):
+        """Queue depth, per-class latency and airtime use since start."""
+        depth = self.depth()
+        elapsed = max(1e-6, time.monotonic() - self.started_at)
+        out = {
+            "depth": dict(zip(TX_CLASS_NAMES, depth)),
+            "utilization": round(self.airtime_s / elapsed, 3),
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+        for cls, name in enumerate(TX_CLASS_NAMES):
+            xs = sorted(self.latencies[cls])
+            if xs:
+                out[name] = {
+                    "sent": self.sent[cls],
+                    "p50_ms": round(xs[len(xs) // 2] * 1000.0, 1),
+                    "max_ms": round(xs[-1] * 1000.0, 1),
+                }
+        return out
 
-    data = line.encode("ascii")
-    print("[SERIAL] TX RAW:", repr(line.strip()))
 
-    # Simple blocking write using bit-banged serial
-    _pi.bb_serial_write(TX_GPIO, data)
+# ---------------------------------------------------------------------------
+# Link health
+# ---------------------------------------------------------------------------
 
+class LinkHealth:
+    """Counters and timings of one link, fed by NanoLink.
 
-def send_goto_to_seeeduino(x_m: float, y_m: float, speed_ms: float):
+    RX/TX byte and frame rates over RATE_WINDOW_S, parse errors (lines
+    that aren't STATUS, malformed fields) and RX buffer overflows, STATUS
+    inter-arrival mean and jitter (smoothed like RFC 3550), and GOTO->ack
+    round trips from the echoed ids. Following Karn's rule, a GOTO that
+    was retransmitted before its ack yields no RTT sample.
     """
-    Send a high-level GOTO command to the Seeeduino.
 
-    Format:
-      GOTO,x=...,y=...,v=...
-    """
-    line = f"GOTO,x={x_m:.2f},y={y_m:.2f},v={speed_ms:.2f}"
-    _send_line(line)
+    def __init__(self):
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self.opened_at = now
+        self.rx_bytes = 0
+        self.rx_frames = 0
+        self.tx_bytes = 0
+        self.tx_frames = 0
+        self.parse_errors = 0
+        self.overflows = 0
+        self.status_count = 0
+        self.last_status_at = None
+        self.interval_s = None  # EWMA STATUS inter-arrival
+        self.jitter_s = 0.0
+        self.rtt_hist = [0] * (len(RTT_BINS_MS) + 1)
+        self.rtts = deque(maxlen=64)
+        self._gotos = {}  # seq -> (sent_at, retransmitted)
+        # Legacy firmware only reports nav_state, never ack=; GOTO round
+        # trips can't be measured then and nothing counts as unacked
+        self.acks_seen = False
+        self._window = (now, 0, 0, 0, 0, 0)
+        self.rates = {}
+        self._window_errors = 0.0
+
+    # --- events ----------------------------------------------------------------
+
+    def on_rx(self, nbytes):
+        self.rx_bytes += nbytes
+
+    def on_overflow(self, nbytes):
+        self.overflows += 1
+        _log_rx.warning("RX buffer overflow, %d bytes dropped", nbytes)
+
+    def on_line(self, status, bad_fields, now):
+        """One complete RX line; status is its decoded record or None."""
+        self.rx_frames += 1
+        if status is None:
+            self.parse_errors += 1
+            return
+        self.parse_errors += bad_fields
+        self.status_count += 1
+        if self.last_status_at is not None:
+            gap = now - self.last_status_at
+            if self.interval_s is None:
+                self.interval_s = gap
+            else:
+                self.jitter_s += (abs(gap - self.interval_s) - self.jitter_s) / 16.0
+                self.interval_s += (gap - self.interval_s) / 16.0
+        self.last_status_at = now
+        ack = status.get("ack")
+        if isinstance(ack, int):
+            self.acks_seen = True
+            self.on_ack(ack, now)
+        elif not self.acks_seen \
+                and status.get("nav_state") in ("arrived", "failed"):
+            with self._lock:
+                self._gotos.clear()
+
+    def on_tx(self, data, now):
+        """A line went out on the wire (called from the TX thread)."""
+        self.tx_bytes += len(data)
+        self.tx_frames += 1
+        if data.startswith(b"CLEAR,"):
+            # The Seeeduino drops its queue; those GOTOs will never be acked
+            with self._lock:
+                self._gotos.clear()
+            return
+        if data.startswith(b"GOTO,id="):
+            try:
+                seq = int(data[8:data.index(b",", 8)])
+            except ValueError:
+                return
+            with self._lock:
+                resent = seq in self._gotos
+                self._gotos[seq] = (now, resent)
+                while len(self._gotos) > 64:
+                    self._gotos.pop(next(iter(self._gotos)))
+
+    def on_ack(self, ack, now):
+        with self._lock:
+            # Same wrap-around rule as waypoint_dispatch (16-bit ids)
+            done = [s for s in self._gotos if ((ack - s) % 65536) < 32768]
+            for seq in done:
+                sent_at, resent = self._gotos.pop(seq)
+                if resent:
+                    continue
+                rtt_ms = (now - sent_at) * 1000.0
+                self.rtts.append(rtt_ms)
+                i = 0
+                while i < len(RTT_BINS_MS) and rtt_ms > RTT_BINS_MS[i]:
+                    i += 1
+                self.rtt_hist[i] += 1
+
+    # --- reporting -------------------------------------------------------------
+
+    def _roll(self, now):
+        t0, rxb, rxf, txb, txf, errs = self._window
+        dt = now - t0
+        if dt < RATE_WINDOW_S:
+            return
+        self.rates = {
+            "rx_Bps": round((self.rx_bytes - rxb) / dt, 1),
+            "rx_fps": round((self.rx_frames - rxf) / dt, 2),
+            "tx_Bps": round((self.tx_bytes - txb) / dt, 1),
+            "tx_fps": round((self.tx_frames - txf) / dt, 2),
+        }
+        frames = self.rx_frames - rxf
+        self._window_errors = (
+            (self.parse_errors - errs) / float(frames) if frames else 0.0
+        )
+        self._window = (now, self.rx_bytes, self.rx_frames, self.tx_bytes,
+                        self.tx_frames, self.parse_errors)
+
+    def rtt_p50_ms(self):
+        if not self.rtts:
+            return None
+        xs = sorted(self.rtts)
+        return xs[len(xs) // 2]
+
+    def status_age(self, now=None):
+        now = time.monotonic() if now is None else now
+        since = self.last_status_at if self.last_status_at is not None \
+            else self.opened_at
+        return now - since
+
+    def degraded(self, rx_idle_s, now=None):
+        """Reasons the link looks unhealthy right now (empty if fine).
+
+        rx_idle_s is the time since any byte was received.
+        """
+        now = time.monotonic() if now is None else now
+        self._roll(now)
+        reasons = []
+        if rx_idle_s > RX_SILENT_S:
+            reasons.append("rx_silent")
+        elif self.status_age(now) > STATUS_STALE_S:
+            reasons.append("status_stale")
+        if self._window_errors > PARSE_ERROR_WARN:
+            reasons.append("parse_errors")
+        if not self.acks_seen:
+            return reasons
+        p50 = self.rtt_p50_ms()
+        if p50 is not None and p50 > GOTO_ACK_WARN_S * 1000.0:
+            reasons.append("slow_ack")
+        with self._lock:
+            oldest = min((t for t, _ in self._gotos.values()), default=None)
+        if oldest is not None and now - oldest > 2.5 * GOTO_ACK_WARN_S:
+            reasons.append("unacked_goto")
+        return reasons
+
+    def snapshot(self, rx_idle_s, now=None):
+        now = time.monotonic() if now is None else now
+        self._roll(now)
+        p50 = self.rtt_p50_ms()
+        out = dict(self.rates)
+        out.update({
+            "status_age_s": round(self.status_age(now), 2),
+            "status_interval_ms": round(self.interval_s * 1000.0)
+            if self.interval_s is not None else None,
+            "status_jitter_ms": round(self.jitter_s * 1000.0),
+            "parse_errors": self.parse_errors,
+            "overflows": self.overflows,
+            "goto_rtt_p50_ms": round(p50) if p50 is not None else None,
+            "goto_rtt_hist": list(self.rtt_hist),
+            "rx_idle_s": round(rx_idle_s, 2),
+            "degraded": self.degraded(rx_idle_s, now),
+        })
+        return out
 
 
 # ---------------------------------------------------------------------------
-# Small OO wrapper used by main.py (NanoLink / SerialLinkConfig)
+# Per-controller driver
 # ---------------------------------------------------------------------------
 
 class SerialLinkConfig:
-    """Lightweight configuration for NanoLink.
+    """Pins and baud rate of one bit-banged link to a Seeeduino.
 
-    Currently the low-level implementation uses module-level constants
-    RX_GPIO / TX_GPIO / BAUD, but we keep this object so existing code
-    can pass a config without breaking.
+    port is kept for compatibility with existing callers; the link runs
+    on the rx_gpio / tx_gpio pins through pigpio, not on a tty.
     """
 
     def __init__(self, port="/dev/serial0", baud=BAUD,
-                 rx_gpio=RX_GPIO, tx_gpio=TX_GPIO):
+                 rx_gpio=RX_GPIO, tx_gpio=TX_GPIO, name=None,
+                 state_budget=TX_STATE_BUDGET):
         self.port = port
         self.baud = baud
         self.rx_gpio = rx_gpio
         self.tx_gpio = tx_gpio
+        self.name = name or f"gpio{rx_gpio}/{tx_gpio}"
+        self.state_budget = state_budget
 
 
 class NanoLink:
-    """Small wrapper around the existing module-level helpers.
+    """Bit-banged serial driver for one Seeeduino controller.
+
+    Each instance has its own pins, baud rate, RX buffer and STATUS
+    decoder, so several controllers can be driven from one process. All
+    instances share a single pigpio daemon connection.
 
     It provides the interface used in main.py:
       - read_status()
       - send_goto(x, y, speed)
       - send_state(...)
+
+    Lines are queued on a TxScheduler and written by its thread, so
+    sending never blocks the caller for the ~1 ms/byte airtime.
     """
 
     def __init__(self, config):
         self.config = config
-        # The current implementation uses pigpio bit-banged serial on the
-        # module-level RX/TX pins. We initialise it here.
-        init_serial()
+        self.name = getattr(config, "name", None) or "link"
+        self.rx_gpio = int(config.rx_gpio)
+        self.tx_gpio = int(config.tx_gpio)
+        self.baud = int(config.baud)
+
+        self._rx_buffer = bytearray()
+        self._last_rx_time = 0.0
+        self._decoder = StatusDecoder()
+        self.health = LinkHealth()
+        # Optional tap(channel, data) called with every raw chunk received
+        # or sent, e.g. dive_trace.TraceRecorder.tap
+        self.tap = None
+
+        self._pi = _acquire_pi()
+        try:
+            self._pi.set_mode(self.tx_gpio, pigpio.OUTPUT)
+            self._pi.write(self.tx_gpio, 1)  # UART idle level
+            self._pi.set_mode(self.rx_gpio, pigpio.INPUT)
+            try:
+                self._pi.bb_serial_read_open(self.rx_gpio, self.baud, 8)
+            except pigpio.error:
+                # Left open by a previous run; reopen cleanly
+                self._pi.bb_serial_read_close(self.rx_gpio)
+                self._pi.bb_serial_read_open(self.rx_gpio, self.baud, 8)
+        except Exception:
+            _release_pi()
+            raise
+        self._last_rx_time = time.time()
+        self._tx = TxScheduler(
+            self._write, self.baud,
+            state_budget=getattr(config, "state_budget", TX_STATE_BUDGET),
+        )
+
+    def close(self):
+        if self._pi is None:
+            return
+        self._tx.close()
+        try:
+            self._pi.bb_serial_read_close(self.rx_gpio)
+        except Exception:
+            pass
+        self._pi = None
+        _release_pi()
+
+    # --- low level -----------------------------------------------------------
+
+    def _read_line(self):
+        """Pull pending RX bytes and return one complete line, or None."""
+        try:
+            count, data = self._pi.bb_serial_read(self.rx_gpio)
+            if count > 0:
+                self._rx_buffer.extend(data)
+                self._last_rx_time = time.time()
+                self.health.on_rx(count)
+                if self.tap is not None:
+                    self.tap(TAP_RX, data)
+        except pigpio.error:
+            pass
+
+        if b"\n" not in self._rx_buffer:
+            if len(self._rx_buffer) > MAX_RX_BUFFER:
+                # Noise or a lost newline; resync on the next one
+                self.health.on_overflow(len(self._rx_buffer))
+                self._rx_buffer = bytearray()
+            return None
+
+        line_bytes, _, rest = self._rx_buffer.partition(b"\n")
+        self._rx_buffer = bytearray(rest)
+        return line_bytes.decode("ascii", errors="ignore")
+
+    def _write(self, data):
+        """Blocking bit-banged write of raw bytes on tx_gpio."""
+        pi = self._pi
+        if self.tap is not None:
+            self.tap(TAP_TX, data)
+        with _wave_lock:
+            pi.wave_clear()
+            pi.wave_add_serial(self.tx_gpio, self.baud, data)
+            wid = pi.wave_create()
+            try:
+                pi.wave_send_once(wid)
+                while pi.wave_tx_busy():
+                    time.sleep(0.001)
+            finally:
+                pi.wave_delete(wid)
+        self.health.on_tx(data, time.monotonic())
+
+    def send_line(self, line, cls=TX_STATE, key=None):
+        """Queue one line of ASCII text for the Seeeduino.
+
+        cls is the TX priority class; a key makes the line replace a
+        queued one with the same key (see TxScheduler).
+        """
+        if not line.endswith("\n"):
+            line = line + "\n"
+        _log_tx.debug("raw %r", line.strip())
+        self._tx.put(line.encode("ascii"), cls, key)
+
+    def tx_stats(self):
+        return self._tx.stats()
+
+    def link_health(self):
+        """LinkHealth snapshot for /update/ (includes degraded reasons)."""
+        return self.health.snapshot(time.time() - self._last_rx_time)
+
+    def link_degraded(self):
+        return self.health.degraded(time.time() - self._last_rx_time)
 
     # --- API used from main.py ------------------------------------------------
 
     def read_status(self):
-        return read_seeeduino_status()
-
-    def send_goto(self, x, y, speed):
-        send_goto_to_seeeduino(x, y, speed)
+        line = self._read_line()
+        if line is None:
+            return None
+        malformed = self._decoder.malformed_fields
+        status = self._decoder.decode(line)
+        if status is not None:
+            _log_rx.info("status", extra={"data": status})
+        elif line.strip():
+            _log_rx.debug("unparsed %r", line.strip())
+        if line.strip():
+            self.health.on_line(
+                status, self._decoder.malformed_fields - malformed,
+                time.monotonic(),
+            )
+        return status
+
+    def send_goto(self, x, y, speed, seq=None):
+        """
+        Send a high-level GOTO command to the Seeeduino.
+
+        Format:
+          GOTO,x=...,y=...,v=...
+          GOTO,id=...,x=...,y=...,v=...   (when a sequence id is given)
+        """
+        if seq is None:
+            line = f"GOTO,x={x:.2f},y={y:.2f},v={speed:.2f}"
+        else:
+            line = f"GOTO,id={seq},x={x:.2f},y={y:.2f},v={speed:.2f}"
+        self.send_line(line, TX_GOTO, None if seq is None else ("goto", seq))
+
+    def send_clear(self, seq):
+        """
+        Make the Seeeduino drop every queued GOTO before a new plan.
+
+        Format:
+          CLEAR,id=...   (id is the first sequence id of the new plan)
+
+        GOTO lines still waiting in the TX queue are dropped as well.
+        """
+        self._tx.discard(TX_GOTO)
+        self.send_line(f"CLEAR,id={seq}", TX_GOTO)
 
     def send_state(
         self,
@@ -203,7 +603,14 @@ class NanoLink:
         hum_pct,
         leakage,
         heading_deg=None,
+        x_m=None,
+        y_m=None,
+        emergency=False,
     ):
+        """Queue a PI state line; only the newest one waiting is sent.
+
+        A leak or emergency raises it to the emergency class.
+        """
         auto_flag = 1 if autonomous else 0
         parts = [
             "PI",
@@ -229,6 +636,67 @@ class NanoLink:
         if heading_deg is not None:
             parts.append(f"hdg={heading_deg:.2f}")
 
+        # Position in the mission frame, same metres as GOTO x/y
+        if x_m is not None and y_m is not None:
+            parts.append(f"x={x_m:.2f}")
+            parts.append(f"y={y_m:.2f}")
+
         line = ",".join(parts) + "\n"
-        print("[serial_link] TX:", line.strip())
-        _send_line(line)
+        _log_tx.info("state %s", line.strip())
+        urgent = emergency or bool(leakage)
+        self.send_line(line, TX_EMERGENCY if urgent else TX_STATE, "state")
+
+
+# ---------------------------------------------------------------------------
+# Module-level helpers kept for older scripts: they drive one default link
+# on the RX_GPIO / TX_GPIO pins.
+# ---------------------------------------------------------------------------
+
+_default_link = None
+
+
+def init_serial():
+    global _default_link
+    if _default_link is None:
+        _default_link = NanoLink(SerialLinkConfig())
+
+
+def close_serial():
+    global _default_link
+    if _default_link is not None:
+        _default_link.close()
+        _default_link = None
+
+
+def _parse_status_line(line: str):
+    """
+    Parse a STATUS line from the Seeeduino into a StatusRecord.
+
+    Format is:
+      STATUS,key=value,key2=value2,...
+
+    Field types come from status_schema.STATUS_SCHEMA; see there.
+    """
+    return StatusDecoder().decode(line)
+
+
+def read_seeeduino_status(timeout_s: float = 0.01):
+    """
+    Read a STATUS line from the Seeeduino if available.
+
+    This assumes that the Seeeduino periodically sends newline-terminated
+    ASCII lines. We look for lines starting with 'STATUS,' and parse them.
+    """
+    init_serial()
+    return _default_link.read_status()
+
+
+def _send_line(line: str):
+    init_serial()
+    _default_link.send_line(line)
+
+
+def send_goto_to_seeeduino(x_m: float, y_m: float, speed_ms: float,
+                           seq: int = None):
+    init_serial()
+    _default_link.send_goto(x_m, y_m, speed_ms, seq)
@@ -0,0 +1,77 @@
+# startup.py
+# Concurrent device bring-up with per-device timeouts and a timing report.
+#
+# Each device's constructor runs on its own daemon thread, so a slow GPS
+# open, a hung DHT or a backend that takes its full HTTP timeout no
+# longer delays everything queued behind it. A device that misses its
+# deadline is reported and left as None; its thread is abandoned (a
+# daemon thread does not keep the process alive).
+
+import threading
+import time
+
+_BOOT_T0 = time.monotonic()
+
+
+def since_boot_s():
+    """Seconds since this module (i.e. the application) was imported."""
+    return time.monotonic() - _BOOT_T0
+
+
+class InitTask:
+    def __init__(self, name, fn, timeout_s=5.0):
+        self.name = name
+        self.fn = fn
+        self.timeout_s = float(timeout_s)
+        self.value = None
+        self.error = None
+        self.elapsed_s = None
+        self.done = threading.Event()
+
+    def start(self):
+        """Run fn on its own daemon thread; done is set when it returns."""
+        threading.Thread(
+            target=self._run, name="init-" + self.name, daemon=True
+        ).start()
+        return self
+
+    def _run(self):
+        t0 = time.monotonic()
+        try:
+            self.value = self.fn()
+        except Exception as e:
+            self.error = e
+        self.elapsed_s = time.monotonic() - t0
+        self.done.set()
+
+
+def bring_up(tasks):
+    """Run every InitTask concurrently and wait for each up to its timeout.
+
+    Returns {name: value}; failed or timed-out devices map to None.
+    """
+    t0 = time.monotonic()
+    for task in tasks:
+        task.start()
+
+    results = {}
+    for task in tasks:
+        remaining = task.timeout_s - (time.monotonic() - t0)
+        if not task.done.wait(max(0.0, remaining)):
+            print("[STARTUP] %-10s timed out after %.2fs" % (task.name, task.timeout_s))
+            results[task.name] = None
+        elif task.error is not None:
+            print(
+                "[STARTUP] %-10s failed in %.3fs: %s"
+                % (task.name, task.elapsed_s, task.error)
+            )
+            results[task.name] = None
+        else:
+            print("[STARTUP] %-10s ok in %.3fs" % (task.name, task.elapsed_s))
+            results[task.name] = task.value
+
+    print(
+        "[STARTUP] Devices up in %.3fs (%.3fs since boot)"
+        % (time.monotonic() - t0, since_boot_s())
+    )
+    return results
@@ -0,0 +1,139 @@
+# status_schema.py
+# Declared schema and typed decoder for the Seeeduino STATUS line.
+#
+#   STATUS,key=value,key2=value2,...
+#
+# Every known key has a converter chosen up front, so decoding a line is
+# one dict lookup and one converter call per field, with no try/except
+# guessing. Values are validated with precompiled regexes; anything that
+# does not fit is counted as malformed and dropped. Keys that are not in
+# the schema are kept (numbers still typed) in the record's `extra` map,
+# so new firmware fields reach the backend before the schema knows them.
+
+import json
+import re
+
+_INT_RE = re.compile(r"[-+]?\d+\Z")
+_FLOAT_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\Z")
+_LIST_SPLIT_RE = re.compile(r"[|;]")
+
+# Returned by a converter when the value does not match its type
+_BAD = object()
+
+
+def _to_str(v):
+    return v
+
+
+def _to_int(v):
+    return int(v) if _INT_RE.match(v) else _BAD
+
+
+def _to_float(v):
+    return float(v) if _FLOAT_RE.match(v) else _BAD
+
+
+def _to_int_list(v):
+    """'1|0|1' or '1;0;1' -> [1, 0, 1]; a single number -> [n]."""
+    if not v:
+        return []
+    out = []
+    for item in _LIST_SPLIT_RE.split(v):
+        if not _INT_RE.match(item):
+            return _BAD
+        out.append(int(item))
+    return out
+
+
+def _guess(v):
+    """Typing for keys outside the schema, following the old parser: a
+    value with a "." is a float, other numbers are ints, so "1e5" stays a
+    string. (Schema fields differ on purpose: x=5 decodes as 5.0.)"""
+    if "." in v:
+        return float(v) if _FLOAT_RE.match(v) else v
+    return int(v) if _INT_RE.match(v) else v
+
+
+STATUS_SCHEMA = (
+    ("nav_state", _to_str),
+    ("x", _to_float),
+    ("y", _to_float),
+    ("ack", _to_int),
+    ("done", _to_int),
+    ("fail", _to_int),
+    ("emergency_active", _to_int),
+    ("emergency_reason_mask", _to_int),
+    ("ultrasonic_error_latched", _to_int_list),
+    # Added on the Pi before forwarding to /old/, never sent by the Nano
+    ("warning_types", _to_int_list),
+)
+
+_CONVERTERS = dict(STATUS_SCHEMA)
+FIELD_NAMES = tuple(name for name, _ in STATUS_SCHEMA)
+
+
+class StatusRecord:
+    """One decoded STATUS line. Missing schema fields are None."""
+
+    __slots__ = FIELD_NAMES + ("extra",)
+
+    def __init__(self):
+        for name in FIELD_NAMES:
+            setattr(self, name, None)
+        self.extra = {}
+
+    def get(self, key, default=None):
+        """dict-style access over both schema fields and extras."""
+        if key in _CONVERTERS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+    def to_dict(self):
+        out = {}
+        for name in FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        out.update(self.extra)
+        return out
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def __repr__(self):
+        return "StatusRecord(%r)" % self.to_dict()
+
+
+class StatusDecoder:
+    def __init__(self):
+        self.lines = 0
+        self.malformed_fields = 0
+        self.unknown_fields = 0
+
+    def decode(self, line):
+        """Decode one line. Returns a StatusRecord or None if not STATUS."""
+        line = line.strip()
+        if not line.startswith("STATUS,"):
+            return None
+
+        self.lines += 1
+        record = StatusRecord()
+        converters = _CONVERTERS
+        for part in line[7:].split(","):
+            key, sep, raw = part.partition("=")
+            if not sep or not key:
+                self.malformed_fields += 1
+                continue
+            raw = raw.strip()
+            conv = converters.get(key)
+            if conv is None:
+                self.unknown_fields += 1
+                record.extra[key] = _guess(raw)
+                continue
+            value = conv(raw)
+            if value is _BAD:
+                self.malformed_fields += 1
+                continue
+            setattr(record, key, value)
+        return record
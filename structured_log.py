@@ -0,0 +1,194 @@
+# structured_log.py
+# Non-blocking, rate-limited, structured logging for the hot paths.
+#
+# Loggers are named "sub.<category>" (e.g. sub.serial.rx, sub.old). A
+# record is rate-limited per category *before* it is queued, so a
+# suppressed line costs one dict lookup. What passes goes into a queue
+# and a background QueueListener writes it as one JSON line to a
+# size-capped RotatingFileHandler (and, above console_level, to stdout).
+# The caller never waits on the SD card.
+#
+# Structured fields go in extra={"data": ...}; anything with a to_dict()
+# (e.g. a StatusRecord) is serialised in the writer thread.
+#
+# Verbosity is switchable at runtime: SIGUSR1 toggles debug mode, which
+# enables DEBUG records (raw serial lines) and lifts the rate limits.
+#
+#   log = structured_log.get_logger("serial.rx")
+#   log.info("status", extra={"data": status})
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+ROOT = "sub"
+
+# category -> (records per second, burst); categories not listed here
+# are not limited
+DEFAULT_RATES = {
+    "serial.rx": (1.0, 5),
+    "serial.tx": (1.0, 5),
+    "old": (0.5, 3),
+}
+
+_listener = None
+_rate_filter = None
+_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per category. Counts what it drops and reports the
+    count on the next record of that category that gets through."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self.enabled = True
+        self._buckets = {}  # category -> [tokens, last_time, suppressed]
+
+    def filter(self, record):
+        if not self.enabled or record.levelno >= logging.WARNING:
+            return True
+        category = record.name[len(ROOT) + 1:]
+        rate = self.rates.get(category)
+        if rate is None:
+            return True
+        per_s, burst = rate
+        now = time.monotonic()
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [float(burst), now, 0]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_s)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1.0
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+def _jsonable(value):
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "t": round(record.created, 3),
+            "lvl": record.levelname[0],
+            "cat": record.name[len(ROOT) + 1:] or record.name,
+            "msg": record.getMessage(),
+        }
+        data = getattr(record, "data", None)
+        if data is not None:
+            out["data"] = _jsonable(data) if hasattr(data, "to_dict") else data
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            out["suppressed"] = suppressed
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, separators=(",", ":"), default=_jsonable)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Same look as the existing print() lines: [CATEGORY] message."""
+
+    def format(self, record):
+        category = record.name[len(ROOT) + 1:] or record.name
+        line = "[%s] %s" % (category.upper(), record.getMessage())
+        data = getattr(record, "data", None)
+        if data is not None:
+            line += " " + json.dumps(
+                _jsonable(data) if hasattr(data, "to_dict") else data,
+                default=_jsonable,
+            )
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            line += " (+%d suppressed)" % suppressed
+        return line
+
+
+def get_logger(category):
+    return logging.getLogger(ROOT + "." + category)
+
+
+def setup(path, max_bytes=1024 * 1024, backups=5,
+          console_level=logging.WARNING, rates=None, debug=False):
+    """Start the background writer. Safe to call more than once."""
+    global _listener, _rate_filter
+    with _lock:
+        if _listener is not None:
+            return
+        handlers = []
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            print("[LOG] File logging disabled:", e)
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setLevel(console_level)
+        console.setFormatter(ConsoleFormatter())
+        handlers.append(console)
+
+        q = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(q)
+        _rate_filter = RateLimitFilter(DEFAULT_RATES if rates is None else rates)
+        queue_handler.addFilter(_rate_filter)
+
+        root = logging.getLogger(ROOT)
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(
+            q, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown)
+        set_debug(debug)
+
+        if threading.current_thread() is threading.main_thread():
+            try:
+                signal.signal(signal.SIGUSR1, lambda *_: toggle_debug())
+            except (AttributeError, ValueError):
+                pass  # no SIGUSR1 on this platform
+
+
+def set_debug(on):
+    logging.getLogger(ROOT).setLevel(logging.DEBUG if on else logging.INFO)
+    if _rate_filter is not None:
+        _rate_filter.enabled = not on
+
+
+def debug_enabled():
+    return logging.getLogger(ROOT).isEnabledFor(logging.DEBUG)
+
+
+def toggle_debug():
+    on = not debug_enabled()
+    set_debug(on)
+    get_logger("log").warning("debug logging %s", "on" if on else "off")
+
+
+def shutdown():
+    """Flush the queue and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
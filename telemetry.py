@@ -0,0 +1,115 @@
+# telemetry.py
+# Delta encoding for the periodic /update/ payload.
+#
+# Most of the /update/ payload (polygon, mission settings) never changes
+# between updates. Each payload gets a telemetry version "tv". A server
+# that understands deltas answers with {"ack": <tv>}; from then on only
+# the fields that differ from that acknowledged baseline are sent:
+#
+#   {"tv": 17, "base": 12, "d": {"lat": ..., "temperature": ...}, "rm": []}
+#
+# gzip-compressed. Because deltas are always against the last *acked*
+# version, a lost request or reply only means a slightly larger next
+# delta. A full snapshot (the plain legacy payload plus "tv") is sent
+# until the first ack, every `full_every` updates, and whenever the
+# server asks for one with {"resync": true}. The live backend never
+# acks, so it keeps receiving exactly the legacy payload.
+
+import gzip
+import json
+
+
+class TelemetryEncoder:
+    def __init__(self, full_every=12, compress_min_bytes=128, max_unacked=8):
+        self.full_every = int(full_every)
+        self.compress_min_bytes = int(compress_min_bytes)
+        self.max_unacked = int(max_unacked)
+
+        self.version = 0
+        self.acked_version = None
+        self._baseline = None
+        self._sent = {}  # tv -> payload snapshot awaiting ack
+        self._since_full = 0
+
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.full_sent = 0
+        self.delta_sent = 0
+
+    def encode(self, payload):
+        """Returns (body_bytes, headers, tv) for one /update/ POST."""
+        self.version += 1
+        tv = self.version
+        snapshot = dict(payload)
+
+        full_json = json.dumps(dict(snapshot, tv=tv), separators=(",", ":"))
+        self.raw_bytes += len(full_json)
+
+        self._sent[tv] = snapshot
+        while len(self._sent) > self.max_unacked:
+            self._sent.pop(next(iter(self._sent)))
+
+        headers = {"Content-Type": "application/json"}
+
+        if self._baseline is None or self._since_full >= self.full_every:
+            self._since_full = 0
+            self.full_sent += 1
+            body = full_json.encode("utf-8")
+            headers["X-Telemetry"] = "full"
+            if self._baseline is not None:
+                body = self._compress(body, headers)
+            self.sent_bytes += len(body)
+            return body, headers, tv
+
+        base = self._baseline
+        delta = {k: v for k, v in snapshot.items() if base.get(k) != v}
+        removed = [k for k in base if k not in snapshot]
+        msg = {"tv": tv, "base": self.acked_version, "d": delta}
+        if removed:
+            msg["rm"] = removed
+
+        self._since_full += 1
+        self.delta_sent += 1
+        body = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+        headers["X-Telemetry"] = "delta"
+        body = self._compress(body, headers)
+        self.sent_bytes += len(body)
+        return body, headers, tv
+
+    def _compress(self, body, headers):
+        if len(body) < self.compress_min_bytes:
+            return body
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=6)
+
+    def on_response(self, tv, response):
+        """Feed the /update/ response back (requests.Response or dict)."""
+        data = response
+        if hasattr(response, "json"):
+            if getattr(response, "status_code", 200) != 200:
+                return
+            try:
+                data = response.json()
+            except ValueError:
+                return
+        if not isinstance(data, dict):
+            return
+
+        if data.get("resync"):
+            self._baseline = None
+            self.acked_version = None
+            return
+
+        ack = data.get("ack")
+        if isinstance(ack, int) and ack in self._sent:
+            self.acked_version = ack
+            self._baseline = self._sent[ack]
+            # Older snapshots can never become the baseline any more
+            for k in [k for k in self._sent if k <= ack]:
+                del self._sent[k]
+
+    def savings(self):
+        """Fraction of uplink bytes saved versus always sending full JSON."""
+        if not self.raw_bytes:
+            return 0.0
+        return 1.0 - self.sent_bytes / float(self.raw_bytes)
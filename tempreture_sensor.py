@@ -1,12 +1,18 @@
 # temperature_sensor.py
 import time
-import board
-import adafruit_dht
 
 
 class TemperatureSensor:
 
-    def __init__(self, pin=board.D4, sensor_type="DHT11", interval_s=3.0):
+    def __init__(self, pin=None, sensor_type="DHT11", interval_s=3.0):
+        # board / adafruit_dht are slow to import (Blinka probes the
+        # platform), so only pay for them when a sensor is created.
+        import adafruit_dht
+
+        if pin is None:
+            import board
+            pin = board.D4
+
         self.interval_s = float(interval_s)
         self.last_read = 0.0
         self.last_ok = None
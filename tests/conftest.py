@@ -0,0 +1,11 @@
+# tests/conftest.py
+# The modules live flat in the repository root, next to main.py.
+#
+# Run with `python -m pytest tests` from the root: the root also holds
+# the hardware check scripts (RGB_test.py, ...) that pytest would
+# otherwise collect.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+# tests/test_coverage_planner.py
+# Every leg of a plan must stay in the free space: inside the polygon,
+# out of the holes and never across a concavity.
+
+import pytest
+
+import coverage_planner as cp
+
+SQUARE = [(0, 0), (60, 0), (60, 60), (0, 60)]
+SHAPES = {
+    "diamond": ([(30, 0), (60, 30), (30, 60), (0, 30)], []),
+    "u": ([(0, 0), (60, 0), (60, 60), (40, 60), (40, 20), (20, 20),
+           (20, 60), (0, 60)], []),
+    "c": ([(0, 0), (60, 0), (60, 15), (15, 15), (15, 45), (60, 45),
+           (60, 60), (0, 60)], []),
+    "hole": (SQUARE, [[(20, 20), (40, 20), (40, 40), (20, 40)]]),
+    "piers": (
+        [(0, 0), (120, 0), (120, 90), (0, 90)],
+        [[(x, y), (x + 6, y), (x + 6, y + 25), (x, y + 25)]
+         for x, y in [(20, 10), (55, 30), (90, 15), (35, 55)]],
+    ),
+}
+
+
+def bad_legs(rings, waypoints):
+    return [
+        (a, b) for a, b in zip(waypoints, waypoints[1:])
+        if not cp.segment_free(rings, a, b)
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(SHAPES))
+@pytest.mark.parametrize("angle", [0.0, 30.0, 45.0, 90.0, 135.0])
+def test_plan_legs_stay_in_free_space(name, angle):
+    polygon, holes = SHAPES[name]
+    plan = cp.plan(polygon, 4.0, sweep_angle_deg=angle, holes=holes)
+    assert plan.waypoints
+    assert bad_legs([polygon] + holes, plan.waypoints) == []
+
+
+def test_best_angle_plan_legs_stay_in_free_space():
+    polygon, holes = SHAPES["piers"]
+    plan = cp.plan(polygon, 5.0, holes=holes)
+    assert bad_legs([polygon] + holes, plan.waypoints) == []
+    assert all(cp._point_free([polygon] + holes, x, y)
+               for x, y in plan.waypoints)
+
+
+def test_segment_free():
+    rings = [SQUARE, [(20, 20), (40, 20), (40, 40), (20, 40)]]
+    assert cp.segment_free(rings, (0, 10), (60, 10))
+    assert cp.segment_free(rings, (0, 20), (60, 20))  # along the hole edge
+    assert not cp.segment_free(rings, (0, 30), (60, 30))
+    assert not cp.segment_free(rings, (10, 10), (70, 10))
+
+
+def test_route_around_keeps_progress_and_avoids_detour_holes():
+    hazards = [[(26, 14), (34, 14), (34, 22), (26, 22)]]
+    base = cp.plan(SQUARE, 4.0, sweep_angle_deg=0.0)
+    routed = cp.plan_around(SQUARE, 4.0, sweep_angle_deg=0.0,
+                            detour_holes=hazards)
+    rings = [SQUARE] + hazards
+    assert bad_legs(rings, base.waypoints) != []
+    assert bad_legs(rings, routed.waypoints) == []
+    assert all(cp._point_free(rings, x, y) for x, y in routed.waypoints)
+
+    index = routed.route_index
+    assert len(index) == len(base.waypoints) + 1
+    assert index[-1] == len(routed.waypoints)
+    for i, wp in enumerate(base.waypoints):
+        if cp._point_free(rings, *wp):
+            # Kept waypoints sit at or after where their legs start
+            assert routed.waypoints.index(wp) >= index[i]
+
+
+def test_plan_around_without_detours_is_plan():
+    polygon, holes = SHAPES["hole"]
+    a = cp.plan(polygon, 4.0, holes=holes)
+    b = cp.plan_around(polygon, 4.0, holes=holes)
+    assert a.waypoints == b.waypoints
+    assert b.route_index is None
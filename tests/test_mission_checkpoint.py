@@ -0,0 +1,110 @@
+# tests/test_mission_checkpoint.py
+# Checkpoint save/restore and resuming a mission from it.
+
+import json
+import os
+
+import main
+from mission_checkpoint import MissionCheckpoint, plan_hash
+from photo_trigger import PhotoTrigger
+from waypoint_dispatch import WaypointDispatcher
+
+WPS = [(float(i), float(i % 2)) for i in range(10)]
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "ck" / "checkpoint.json")
+    ck = MissionCheckpoint(path)
+    ck.update(plan_hash=plan_hash(WPS), waypoint_index=4, photos_taken=7)
+    assert ck.flush(force=True)
+    assert not os.path.exists(path + ".tmp")
+
+    again = MissionCheckpoint(path)
+    record = again.load()
+    assert record["plan_hash"] == plan_hash(WPS)
+    assert record["waypoint_index"] == 4
+    assert record["photos_taken"] == 7
+
+
+def test_flush_is_batched(tmp_path):
+    ck = MissionCheckpoint(str(tmp_path / "c.json"), min_interval_s=10.0)
+    ck.update(waypoint_index=1)
+    assert ck.flush(now=100.0)
+    ck.update(waypoint_index=2)
+    assert not ck.flush(now=105.0)
+    assert ck.flush(now=110.0)
+    # Nothing changed: nothing to write
+    ck.update(waypoint_index=2)
+    assert not ck.flush(now=200.0)
+    assert ck.writes == 2
+
+
+def test_unreadable_or_old_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "c.json"
+    path.write_text("{not json")
+    assert MissionCheckpoint(str(path)).load() is None
+    path.write_text(json.dumps({"version": 0, "waypoint_index": 3}))
+    assert MissionCheckpoint(str(path)).load() is None
+    assert MissionCheckpoint(str(tmp_path / "missing.json")).load() is None
+
+
+def test_plan_hash_is_centimetre_stable():
+    assert plan_hash(WPS) == plan_hash([(x + 1e-4, y) for x, y in WPS])
+    assert plan_hash(WPS) != plan_hash(WPS[:-1])
+
+
+def new_state():
+    dispatcher = WaypointDispatcher(lambda *a: None)
+    trigger = PhotoTrigger(4.0)
+    return dispatcher, trigger
+
+
+def test_resume_same_plan(tmp_path):
+    path = str(tmp_path / "c.json")
+    ck = MissionCheckpoint(path)
+    dispatcher, trigger = new_state()
+    main.resume_mission(ck, WPS, dispatcher, trigger)
+    ck.update(waypoint_index=6, failed_waypoints=2, photos_taken=9,
+              last_photo_time=1000.0)
+    ck.flush(force=True)
+
+    # After a restart
+    ck = MissionCheckpoint(path)
+    ck.load()
+    dispatcher, trigger = new_state()
+    main.resume_mission(ck, list(WPS), dispatcher, trigger, speed_ms=0.5)
+    assert dispatcher.completed == 6
+    assert dispatcher.failed == 2
+    assert trigger.photos_taken == 9
+    assert trigger.last_shot_time == 1000.0
+
+
+def test_resume_other_plan_starts_over(tmp_path):
+    path = str(tmp_path / "c.json")
+    ck = MissionCheckpoint(path)
+    ck.update(plan_hash=plan_hash(WPS), waypoint_index=6,
+              failed_waypoints=2, last_photo_time=1000.0)
+    ck.flush(force=True)
+
+    ck = MissionCheckpoint(path)
+    ck.load()
+    dispatcher, trigger = new_state()
+    other = [(x + 5.0, y) for x, y in WPS]
+    main.resume_mission(ck, other, dispatcher, trigger)
+    assert dispatcher.completed == 0
+    assert dispatcher.failed == 0
+    assert "last_photo_time" not in ck.record
+    assert MissionCheckpoint(path).load()["plan_hash"] == plan_hash(other)
+
+
+def test_no_plan_keeps_checkpoint(tmp_path):
+    path = str(tmp_path / "c.json")
+    ck = MissionCheckpoint(path)
+    ck.update(plan_hash=plan_hash(WPS), waypoint_index=6)
+    ck.flush(force=True)
+    ck = MissionCheckpoint(path)
+    ck.load()
+    dispatcher, trigger = new_state()
+    main.resume_mission(ck, [], dispatcher, trigger)
+    assert ck.record["waypoint_index"] == 6
+    assert ck.record["plan_hash"] == plan_hash(WPS)
@@ -0,0 +1,101 @@
+# tests/test_telemetry.py
+# /update/ payloads from TelemetryEncoder decode back to what was sent,
+# using the mock backend's decoder.
+
+import gzip
+import json
+
+from mock_backend import LinkProfile, MockBackend
+from telemetry import TelemetryEncoder
+
+POLYGON = [[54.9130 + i * 1e-4, 9.7785 + (i % 3) * 1e-4] for i in range(12)]
+
+
+def payload(i, **extra):
+    p = {
+        "explore": True,
+        "autonomous": True,
+        "polygon": POLYGON,
+        "time": "0:05",
+        "lat": 54.9130 + i * 1e-5,
+        "lon": 9.7785,
+        "temperature": 12.0 + (i % 4) * 0.5,
+    }
+    p.update(extra)
+    return p
+
+
+def send(enc, backend, p):
+    body, headers, tv = enc.encode(p)
+    status, reply = backend.update(body, headers)
+    assert status == 200
+    return headers, tv, reply
+
+
+def test_round_trip_full_then_deltas():
+    enc = TelemetryEncoder(full_every=5)
+    backend = MockBackend(LinkProfile())
+    kinds = []
+    for i in range(12):
+        p = payload(i)
+        headers, tv, reply = send(enc, backend, p)
+        enc.on_response(tv, reply)
+        kinds.append(headers["X-Telemetry"])
+        assert backend.telemetry == p
+    assert kinds[0] == "full"
+    assert kinds[1:6] == ["delta"] * 5
+    assert kinds[6] == "full"
+    assert enc.savings() > 0.3
+
+
+def test_removed_and_added_keys():
+    enc = TelemetryEncoder()
+    backend = MockBackend(LinkProfile())
+    _, tv, reply = send(enc, backend, payload(0, leakage=0))
+    enc.on_response(tv, reply)
+    p = payload(1, estimate={"total_s": 60})
+    headers, tv, reply = send(enc, backend, p)
+    assert headers["X-Telemetry"] == "delta"
+    assert backend.telemetry == p
+
+
+def test_lost_replies_stay_against_last_ack():
+    enc = TelemetryEncoder()
+    backend = MockBackend(LinkProfile())
+    _, tv, reply = send(enc, backend, payload(0))
+    enc.on_response(tv, reply)
+    for i in range(1, 4):
+        p = payload(i)
+        send(enc, backend, p)  # reply lost
+        assert backend.telemetry == p
+    # The next delta is still based on version 1
+    body, headers, _ = enc.encode(payload(4))
+    if headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    assert json.loads(body)["base"] == 1
+
+
+def test_resync_sends_full_snapshot():
+    enc = TelemetryEncoder()
+    backend = MockBackend(LinkProfile())
+    _, tv, reply = send(enc, backend, payload(0))
+    enc.on_response(tv, reply)
+    # A restarted server has lost its snapshots
+    backend = MockBackend(LinkProfile())
+    headers, tv, reply = send(enc, backend, payload(1))
+    assert reply == {"resync": True}
+    enc.on_response(tv, reply)
+    p = payload(2)
+    headers, tv, reply = send(enc, backend, p)
+    assert headers["X-Telemetry"] == "full"
+    assert backend.telemetry == p
+
+
+def test_legacy_backend_gets_plain_payload():
+    enc = TelemetryEncoder()
+    for i in range(3):
+        p = payload(i)
+        body, headers, tv = enc.encode(p)
+        enc.on_response(tv, {"ok": True})  # never acks
+        assert "Content-Encoding" not in headers
+        assert json.loads(body) == dict(p, tv=tv)
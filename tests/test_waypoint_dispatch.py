@@ -0,0 +1,147 @@
+# tests/test_waypoint_dispatch.py
+# GOTO window, acks, retransmission and plan loading.
+
+from waypoint_dispatch import WaypointDispatcher
+
+WPS = [(float(i), 0.0) for i in range(6)]
+
+
+class Seeeduino:
+    """Records what the dispatcher sends."""
+
+    def __init__(self):
+        self.gotos = []   # (x, y, speed, seq)
+        self.clears = []  # seq
+
+    def goto(self, x, y, speed, seq):
+        self.gotos.append((x, y, speed, seq))
+
+    def clear(self, seq):
+        self.clears.append(seq)
+
+    def seqs(self):
+        return [g[3] for g in self.gotos]
+
+
+def make(**kwargs):
+    nano = Seeeduino()
+    d = WaypointDispatcher(nano.goto, send_clear=nano.clear, **kwargs)
+    return d, nano
+
+
+def test_window_fills_after_first_ack():
+    d, nano = make(window=3)
+    d.load(WPS)
+    d.pump(0.4, now=0.0)
+    # Until an ack shows the firmware pipelines, one at a time
+    assert nano.seqs() == [1]
+    d.on_status({"ack": 1})
+    d.pump(0.4, now=0.1)
+    assert nano.seqs() == [1, 2, 3]
+    assert d.in_flight == 3
+
+
+def test_done_and_fail_resolve_through():
+    failed_at = []
+    d, nano = make(window=3, on_fail=lambda x, y: failed_at.append((x, y)))
+    d.load(WPS)
+    d.pump(0.4, now=0.0)
+    d.on_status({"ack": 1})
+    d.pump(0.4, now=0.1)
+    d.on_status({"ack": 3, "done": 2})
+    assert d.completed == 2
+    d.on_status({"fail": 3})
+    assert d.completed == 3
+    assert d.failed == 1
+    assert failed_at == [WPS[2]]
+
+
+def test_unacked_goto_is_retransmitted_not_dropped():
+    d, nano = make(window=3, ack_timeout_s=1.0, max_retries=2)
+    d.load(WPS)
+    now = 0.0
+    for _ in range(40):
+        d.pump(0.4, now)
+        now += 0.5
+    # The same waypoint over and over: the plan holds, nothing failed
+    assert set(nano.seqs()) == {1}
+    assert len(nano.seqs()) > 3
+    assert d.completed == 0
+    assert d.failed == 0
+    assert d.stalled()
+    d.on_status({"ack": 1})
+    assert not d.stalled()
+    d.pump(0.4, now)
+    assert nano.seqs()[-2:] == [2, 3]
+
+
+def test_nothing_sent_while_link_down():
+    up = [False]
+    d, nano = make(ready=lambda: up[0])
+    d.load(WPS)
+    for t in range(10):
+        d.pump(0.4, float(t))
+    assert nano.gotos == []
+    up[0] = True
+    d.pump(0.4, 10.0)
+    assert nano.seqs() == [1]
+
+
+def test_skip_drops_blocked_waypoints():
+    d, nano = make(window=3, skip=lambda x, y: x in (1.0, 2.0))
+    d.load(WPS)
+    d.pump(0.4, 0.0)
+    d.on_status({"ack": 1})
+    d.pump(0.4, 0.1)
+    assert [g[0] for g in nano.gotos] == [0.0, 3.0, 4.0]
+    assert d.skipped == 2
+
+
+def test_load_clears_queue_and_ignores_old_ids():
+    d, nano = make(window=3)
+    d.load(WPS)
+    d.pump(0.4, 0.0)
+    d.on_status({"ack": 1})
+    d.pump(0.4, 0.1)
+    assert nano.clears == [1]
+
+    d.load(WPS[3:], start_index=1)
+    assert nano.clears == [1, 4]
+    assert d.completed == 1
+    # Late acks and arrivals for the old plan change nothing
+    d.on_status({"ack": 3, "done": 3})
+    assert d.completed == 1
+    d.on_status({"fail": 2})
+    assert d.failed == 0
+    sent = len(nano.gotos)
+    d.pump(0.4, 0.2)
+    assert [g[:2] for g in nano.gotos[sent:]] == WPS[4:]
+    assert nano.seqs()[sent:] == [4, 5]
+    d.on_status({"ack": 5, "done": 4})
+    assert d.completed == 2
+
+
+def test_failed_counts_across_loads():
+    d, nano = make(window=1)
+    d.load(WPS[:2])
+    d.pump(0.4, 0.0)
+    d.on_status({"ack": 1, "fail": 1})
+    assert d.failed == 1
+    d.load(WPS[2:4])
+    d.pump(0.4, 0.1)
+    d.on_status({"ack": d.plan_seq, "fail": d.plan_seq})
+    assert d.failed == 2
+
+
+def test_legacy_firmware_one_at_a_time():
+    d, nano = make(window=3)
+    d.load(WPS[:2])
+    d.pump(0.4, 0.0)
+    d.on_status({"nav_state": "busy"})
+    d.pump(0.4, 0.1)
+    assert nano.seqs() == [1]
+    d.on_status({"nav_state": "arrived"})
+    d.pump(0.4, 0.2)
+    assert nano.seqs() == [1, 2]
+    d.on_status({"nav_state": "arrived"})
+    assert d.finished()
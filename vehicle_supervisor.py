@@ -0,0 +1,106 @@
+# vehicle_supervisor.py
+# Drive several Seeeduino controllers (vehicles or bench rigs) from one
+# process on a shared asyncio event loop.
+#
+# Each Vehicle owns its own NanoLink (own pins, RX buffer and STATUS
+# decoder); all links share one pigpio connection. The supervisor polls
+# every link at its own period and hands each STATUS record to that
+# vehicle's callback, plus an optional periodic tick for sending
+# state/GOTOs. Reads are non-blocking; writes block only for the few ms
+# a line takes on the wire.
+#
+#   sup = Supervisor()
+#   sup.add(Vehicle(SerialLinkConfig(rx_gpio=20, tx_gpio=21, name="sub1"),
+#                   on_status=handle_sub1))
+#   sup.add(Vehicle(SerialLinkConfig(rx_gpio=23, tx_gpio=24, name="rig"),
+#                   on_status=handle_rig))
+#   sup.run()
+
+import asyncio
+import time
+
+from serial_link import NanoLink
+
+
+class Vehicle:
+    def __init__(self, config, on_status=None, on_tick=None,
+                 poll_period_s=0.02, tick_period_s=1.0):
+        self.config = config
+        self.name = getattr(config, "name", None) or "vehicle"
+        self.on_status = on_status
+        self.on_tick = on_tick
+        self.poll_period_s = float(poll_period_s)
+        self.tick_period_s = float(tick_period_s)
+        self.link = None
+
+        self.status_count = 0
+        self.last_status = None
+        self.errors = 0
+
+    def open(self):
+        self.link = NanoLink(self.config)
+
+    def close(self):
+        if self.link is not None:
+            self.link.close()
+            self.link = None
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                # Drain every complete line buffered since the last poll
+                while True:
+                    status = self.link.read_status()
+                    if status is None:
+                        break
+                    self.status_count += 1
+                    self.last_status = status
+                    if self.on_status is not None:
+                        self.on_status(self, status)
+            except Exception as e:
+                self.errors += 1
+                print("[SUPERVISOR]", self.name, "poll error:", e)
+            await asyncio.sleep(self.poll_period_s)
+
+    async def _tick_loop(self):
+        while True:
+            try:
+                self.on_tick(self, time.time())
+            except Exception as e:
+                self.errors += 1
+                print("[SUPERVISOR]", self.name, "tick error:", e)
+            await asyncio.sleep(self.tick_period_s)
+
+
+class Supervisor:
+    def __init__(self):
+        self.vehicles = []
+
+    def add(self, vehicle):
+        self.vehicles.append(vehicle)
+        return vehicle
+
+    async def run_async(self):
+        tasks = []
+        try:
+            # Inside the try: if one link fails to open, the ones already
+            # open are closed again before the error propagates
+            for v in self.vehicles:
+                v.open()
+                print("[SUPERVISOR] Opened", v.name, "on GPIO",
+                      v.config.rx_gpio, "/", v.config.tx_gpio)
+                tasks.append(asyncio.ensure_future(v._poll_loop()))
+                if v.on_tick is not None:
+                    tasks.append(asyncio.ensure_future(v._tick_loop()))
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            for v in self.vehicles:
+                v.close()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            pass
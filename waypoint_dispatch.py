@@ -0,0 +1,215 @@
+# waypoint_dispatch.py
+# Windowed GOTO dispatch to the Seeeduino.
+#
+# Every GOTO carries a sequence id (GOTO,id=N,x=...,y=...,v=...). The
+# Seeeduino queues a few upcoming waypoints and reports progress in its
+# STATUS line:
+#
+#   ack=N    GOTO N was received and queued
+#   done=N   waypoint N (and every earlier one) has been reached
+#   fail=N   waypoint N was given up on; the controller moves to the next
+#
+# Loading a new plan sends CLEAR,id=N (N: the plan's first id) so the
+# Seeeduino drops whatever it still had queued, and any ack/done/fail
+# for an id before N is ignored as belonging to the old plan.
+#
+# The Pi keeps up to `window` waypoints outstanding, refills the window as
+# acks and arrivals come in, and retransmits any GOTO that is not acked
+# within ack_timeout_s (less often after max_retries). A GOTO that is
+# never acked is never skipped: the window holds until it is, so a dead
+# link stalls the plan instead of running through it. Until the first
+# ack is seen we assume an older firmware that only reports nav_state,
+# and fall back to one waypoint at a time.
+
+SEQ_MOD = 65536
+
+
+def _seq_not_after(a, b):
+    """True if sequence id a is b or older (modulo wrap-around)."""
+    return ((b - a) % SEQ_MOD) < SEQ_MOD // 2
+
+
+class _Pending:
+    __slots__ = ("seq", "index", "x", "y", "sent_at", "retries", "acked")
+
+    def __init__(self, seq, index, x, y, sent_at):
+        self.seq = seq
+        self.index = index
+        self.x = x
+        self.y = y
+        self.sent_at = sent_at
+        self.retries = 0
+        self.acked = False
+
+
+class WaypointDispatcher:
+    """Keeps the Seeeduino's waypoint queue topped up.
+
+    send_goto is called as send_goto(x, y, speed, seq). Optional hooks:
+    on_fail(x, y) when the Seeeduino gives up on a waypoint, skip(x, y)
+    -> bool to drop upcoming waypoints (e.g. known obstacles), and
+    ready() -> bool, False while the link is down (nothing is sent).
+    send_clear(seq), if given, is called by load() (see the module comment).
+    """
+
+    def __init__(self, send_goto, window=3, ack_timeout_s=1.5, max_retries=5,
+                 on_fail=None, skip=None, ready=None, send_clear=None):
+        self.send_goto = send_goto
+        self.send_clear = send_clear
+        self.on_fail = on_fail
+        self.skip = skip
+        self.ready = ready
+        self.window = max(1, int(window))
+        self.ack_timeout_s = float(ack_timeout_s)
+        self.max_retries = int(max_retries)
+
+        self.waypoints = []
+        self.next_index = 0
+        self.next_seq = 1
+        self.plan_seq = 1  # first sequence id of the current plan
+        self.pending = []
+        self.failed = 0   # running total over every plan loaded
+        self.skipped = 0
+        self.retransmits = 0
+        self.pipelined = False
+
+    def load(self, waypoints, start_index=0):
+        """Start a new plan. Anything still outstanding is dropped, here
+        and (through send_clear) on the Seeeduino. failed keeps counting
+        across loads (e.g. gap passes); reset it for a new mission."""
+        self.waypoints = list(waypoints)
+        self.next_index = min(max(0, int(start_index)), len(self.waypoints))
+        self.pending = []
+        self.plan_seq = self.next_seq
+        if self.send_clear is not None:
+            self.send_clear(self.plan_seq)
+
+    # --- progress ------------------------------------------------------------
+
+    @property
+    def completed(self):
+        """Waypoints resolved (reached or failed), i.e. the resume index."""
+        if self.pending:
+            return self.pending[0].index
+        return self.next_index
+
+    @property
+    def in_flight(self):
+        return len(self.pending)
+
+    def finished(self):
+        return self.next_index >= len(self.waypoints) and not self.pending
+
+    def stalled(self):
+        """True while a GOTO has gone unacked for max_retries tries."""
+        return any(
+            not p.acked and p.retries >= self.max_retries for p in self.pending
+        )
+
+    # --- STATUS handling -----------------------------------------------------
+
+    def _resolve_through(self, seq, failed):
+        while self.pending and _seq_not_after(self.pending[0].seq, seq):
+            p = self.pending.pop(0)
+            if failed and p.seq == seq:
+                self._failed(p)
+
+    def _current(self, seq):
+        """False for ids sent before the current plan was loaded."""
+        return isinstance(seq, int) and not _seq_not_after(
+            seq, (self.plan_seq - 1) % SEQ_MOD
+        )
+
+    def on_status(self, status):
+        if not status:
+            return
+
+        ack = status.get("ack")
+        done = status.get("done")
+        fail = status.get("fail")
+        if isinstance(ack, int) or isinstance(done, int) \
+                or isinstance(fail, int):
+            self.pipelined = True
+        ack = ack if self._current(ack) else None
+        done = done if self._current(done) else None
+        fail = fail if self._current(fail) else None
+
+        if ack is not None:
+            for p in self.pending:
+                if _seq_not_after(p.seq, ack):
+                    p.acked = True
+        if done is not None:
+            self._resolve_through(done, failed=False)
+        if fail is not None:
+            self._resolve_through(fail, failed=True)
+
+        if self.pipelined or not self.pending:
+            return
+
+        # Legacy firmware: only nav_state for the single command in flight.
+        nav_state = status.get("nav_state")
+        if nav_state == "busy":
+            self.pending[0].acked = True
+        elif nav_state == "arrived":
+            self.pending.pop(0)
+        elif nav_state == "failed":
+            self._failed(self.pending.pop(0))
+
+    def _failed(self, p):
+        self.failed += 1
+        if self.on_fail is not None:
+            self.on_fail(p.x, p.y)
+
+    # --- sending -------------------------------------------------------------
+
+    def _send(self, p, speed):
+        print(
+            "[COVERAGE] Sending waypoint",
+            p.index,
+            "id",
+            p.seq,
+            "->",
+            (p.x, p.y),
+            "speed",
+            speed,
+        )
+        self.send_goto(p.x, p.y, speed, p.seq)
+
+    def pump(self, speed, now):
+        """Retransmit stale GOTOs and fill the window with new ones.
+
+        Nothing goes out while ready() is False, and no new waypoint is
+        sent while an earlier GOTO is still waiting for its ack.
+        """
+        if self.ready is not None and not self.ready():
+            return
+        for p in self.pending:
+            if p.acked:
+                continue
+            timeout = self.ack_timeout_s
+            if p.retries >= self.max_retries:
+                timeout *= self.max_retries
+            if now - p.sent_at < timeout:
+                continue
+            p.retries += 1
+            p.sent_at = now
+            self.retransmits += 1
+            if p.retries == self.max_retries:
+                print("[COVERAGE] Waypoint", p.index, "not acked after",
+                      p.retries, "tries; holding the plan")
+            self._send(p, speed)
+        if any(not p.acked and p.retries > 0 for p in self.pending):
+            return
+
+        window = self.window if self.pipelined else 1
+        while len(self.pending) < window and self.next_index < len(self.waypoints):
+            x, y = self.waypoints[self.next_index]
+            if self.skip is not None and self.skip(x, y):
+                self.next_index += 1
+                self.skipped += 1
+                continue
+            p = _Pending(self.next_seq, self.next_index, x, y, now)
+            self.next_seq = (self.next_seq + 1) % SEQ_MOD or 1
+            self.next_index += 1
+            self.pending.append(p)
+            self._send(p, speed)